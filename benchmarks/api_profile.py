@@ -0,0 +1,140 @@
+"""
+CPU cost per request of the default settings versus ``API_PROFILE``.
+
+Each profile is measured in its own process, because the middleware chain and
+installed apps are fixed once Django is set up. Requests go through the whole
+handler (middleware, DRF view, renderer); the token is pre-seeded in the
+validation cache so no network call is made. A second section compares
+rendering a constant body with DRF's ``JSONRenderer`` against the bytes
+pre-encoded at import time.
+
+Usage:
+    python -m benchmarks.api_profile [--iterations N]
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+
+PROFILES = {
+    "default": "False",
+    "API_PROFILE": "True",
+}
+
+
+def generate_key_pair(directory):
+    """Writes a fresh RSA public key to ``directory`` and returns the private key."""
+    private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    public_pem = private_key.public_key().public_bytes(
+        serialization.Encoding.PEM,
+        serialization.PublicFormat.SubjectPublicKeyInfo,
+    )
+    with open(os.path.join(directory, "public.key"), "wb") as key_file:
+        key_file.write(public_pem)
+    return private_key
+
+
+def cpu_per_call(func, iterations):
+    """Returns the process CPU time of one ``func`` call in microseconds."""
+    func()
+    started = time.process_time()
+    for _ in range(iterations):
+        func()
+    return (time.process_time() - started) / iterations * 1e6
+
+
+def measure(iterations):
+    """Measures the current profile; runs inside the child process."""
+    with tempfile.TemporaryDirectory() as directory:
+        private_key = generate_key_pair(directory)
+        os.environ["JWT_PUBLIC_KEY_PATH"] = os.path.join(directory, "public.key")
+        os.environ.setdefault("DJANGO_SETTINGS_MODULE", "notification_service.settings")
+
+        import django
+        import jwt
+
+        django.setup()
+        from django.http import HttpResponse
+        from django.test import Client
+        from rest_framework.renderers import JSONRenderer
+
+        from otp.views.send_otp import SUCCESS_RESPONSE, SUCCESS_RESPONSE_DATA
+        from utils import decode_token, token_validation_cache
+
+        token = jwt.encode(
+            {"type": "access", "exp": int(time.time()) + 3600, "jti": "benchmark"},
+            private_key,
+            algorithm="RS256",
+        )
+        token_validation_cache.local_cache.set(token_validation_cache.cache_key(token, decode_token(token)), True, 3600)
+
+        client = Client()
+        headers = {"Authorization": f"Bearer {token}"}
+
+        def rejected_request():
+            # Invalid phone number: middleware, DRF view, serializer and renderer, no Redis
+            response = client.post("/api/otp/send-otp/", {"phone_number": "x"}, headers=headers)
+            assert response.status_code == 400, response.status_code
+
+        def unauthorized_request():
+            response = client.post("/api/otp/send-otp/", {"phone_number": "x"})
+            assert response.status_code == 401, response.status_code
+
+        renderer = JSONRenderer()
+
+        def render_constant():
+            return HttpResponse(renderer.render(SUCCESS_RESPONSE_DATA), content_type="application/json")
+
+        return {
+            "requests": {
+                "validation error request": cpu_per_call(rejected_request, iterations),
+                "unauthorized request": cpu_per_call(unauthorized_request, iterations),
+            },
+            "responses": {
+                "JSONRenderer per request": cpu_per_call(render_constant, iterations * 10),
+                "pre-encoded at import": cpu_per_call(SUCCESS_RESPONSE.response, iterations * 10),
+            },
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--iterations", type=int, default=2000)
+    parser.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        print(json.dumps(measure(args.iterations)))
+        return
+
+    results = {}
+    for name, api_profile in PROFILES.items():
+        output = subprocess.run(
+            [sys.executable, "-m", "benchmarks.api_profile", "--worker", "--iterations", str(args.iterations)],
+            env={**os.environ, "API_PROFILE": api_profile},
+            capture_output=True,
+            check=True,
+            text=True,
+        ).stdout
+        results[name] = json.loads(output.strip().splitlines()[-1])
+
+    before, after = (result["requests"] for result in results.values())
+    print(f"{'CPU us/request':<28} {'default':>10} {'API_PROFILE':>12} {'saved':>8}")
+    for measurement in before:
+        saved = 1 - after[measurement] / before[measurement]
+        print(f"{measurement:<28} {before[measurement]:10.1f} {after[measurement]:12.1f} {saved:8.0%}")
+
+    print()
+    print(f"{'constant response':<28} {'us/response':>10}")
+    for measurement, elapsed in results["API_PROFILE"]["responses"].items():
+        print(f"{measurement:<28} {elapsed:10.1f}")
+
+
+if __name__ == "__main__":
+    main()
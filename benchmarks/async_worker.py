@@ -0,0 +1,120 @@
+"""
+Throughput benchmark of the asyncio SMS worker against the prefork pool.
+
+Sends ``--messages`` single SMS (worker-side batching disabled) through:
+
+- prefork: ``--processes`` processes, each blocked on one provider call at
+  a time like the processes of the ``celery worker`` prefork pool, running
+  ``send_notification_task``;
+- asyncio: one ``notifications.async_worker.AsyncWorker`` process consuming
+  the same tasks from an in-memory broker, up to ``--async-concurrency``
+  provider calls in flight.
+
+The provider is the stub provider, or with ``--provider http`` an
+``HTTPProvider`` posting to a local stub SMS API (``benchmarks.fake_sms``),
+which measures the pooled HTTP clients as well. Delivery statuses are
+written to the Redis of the settings when it is reachable (best effort
+otherwise, as in production).
+
+Usage:
+    python -m benchmarks.async_worker [--messages N] [--processes N] [--async-concurrency N] [--latency S] [--provider stub|http]
+"""
+import argparse
+import contextlib
+import io
+import multiprocessing
+import os
+import sys
+import threading
+import time
+
+from .fake_sms import FakeSMSServer
+
+
+def silence_stdout():
+    """Pool initializer: the stub provider prints every message."""
+    sys.stdout = io.StringIO()
+
+
+def send_one(message):
+    from notifications.tasks import send_notification_task
+
+    send_notification_task("sms", *message)
+
+
+def run_prefork(messages, processes):
+    """Sends the messages with a pool of processes, one provider call per process at a time."""
+    with multiprocessing.get_context("fork").Pool(processes, initializer=silence_stdout) as pool:
+        started = time.perf_counter()
+        pool.map(send_one, messages, chunksize=1)
+        return time.perf_counter() - started
+
+
+def run_asyncio(messages, channel):
+    """Publishes the messages to the in-memory broker and consumes them with an ``AsyncWorker``."""
+    from notifications.async_worker import AsyncWorker
+    from notifications.tasks import notify
+
+    for recipient, text in messages:
+        notify(channel.name, recipient, text).apply_async()
+
+    worker = AsyncWorker([channel])
+
+    def stop_when_done():
+        while worker.processed < len(messages):
+            time.sleep(0.005)
+        worker.stop()
+
+    threading.Thread(target=stop_when_done, daemon=True).start()
+    with contextlib.redirect_stdout(io.StringIO()):
+        started = time.perf_counter()
+        worker.run()
+        return time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--messages", type=int, default=2000)
+    parser.add_argument("--processes", type=int, default=8, help="Processes of the prefork pool.")
+    parser.add_argument("--async-concurrency", type=int, default=500, help="Provider calls in flight in the asyncio worker.")
+    parser.add_argument("--latency", type=float, default=0.2, help="Seconds per provider call.")
+    parser.add_argument("--provider", choices=("stub", "http"), default="stub")
+    args = parser.parse_args()
+
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "notification_service.settings")
+    os.environ["CELERY_BROKER_URL"] = "memory://"
+    os.environ["SMS_BATCH_ENABLED"] = "False"
+    os.environ["NOTIFICATION_SMS_ASYNC_CONCURRENCY"] = str(args.async_concurrency)
+
+    server = None
+    if args.provider == "http":
+        server = FakeSMSServer(latency=args.latency).start()
+
+    import django
+
+    django.setup()
+    from notifications.channels import get_channel
+    from notifications.providers import HTTPProvider, StubProvider
+    from otp.dispatcher import format_otp_message
+
+    channel = get_channel("sms")
+    if server is not None:
+        channel._provider = HTTPProvider(server.url, max_connections=max(args.async_concurrency, args.processes))
+    else:
+        channel._provider = StubProvider(latency=args.latency, per_message_latency=0)
+    messages = [(f"+98{index:010d}", format_otp_message("123456")) for index in range(args.messages)]
+
+    try:
+        prefork_elapsed = run_prefork(messages, args.processes)
+        asyncio_elapsed = run_asyncio(messages, channel)
+    finally:
+        if server is not None:
+            server.stop()
+
+    print(f"{'prefork':<10} {args.messages / prefork_elapsed:10.1f} msg/s  ({args.processes} processes)")
+    print(f"{'asyncio':<10} {args.messages / asyncio_elapsed:10.1f} msg/s  (1 process, {args.async_concurrency} in flight)")
+    print(f"{'speedup':<10} {prefork_elapsed / asyncio_elapsed:10.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""
+Microbenchmark for ``utils.decode_token``.
+
+Compares decoding with the raw PEM string (the previous implementation, which
+re-parsed the RSA key on every call) against the keyring-backed decoder.
+
+Usage:
+    python -m benchmarks.decode_token [--iterations N]
+"""
+import argparse
+import os
+import tempfile
+import time
+from timeit import timeit
+
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+
+
+def generate_key_pair(directory):
+    """Writes a fresh RSA public key to ``directory`` and returns (private_key, public_pem)."""
+    private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    public_pem = private_key.public_key().public_bytes(
+        serialization.Encoding.PEM,
+        serialization.PublicFormat.SubjectPublicKeyInfo,
+    )
+    with open(os.path.join(directory, "public.key"), "wb") as key_file:
+        key_file.write(public_pem)
+    return private_key, public_pem.decode("utf-8")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--iterations", type=int, default=5000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        private_key, public_pem = generate_key_pair(directory)
+        os.environ["JWT_PUBLIC_KEY_PATH"] = os.path.join(directory, "public.key")
+        os.environ.setdefault("DJANGO_SETTINGS_MODULE", "notification_service.settings")
+
+        import django
+        import jwt
+
+        django.setup()
+        from utils.decode_token import decode_token
+
+        token = jwt.encode(
+            {"type": "access", "exp": int(time.time()) + 3600},
+            private_key,
+            algorithm="RS256",
+        )
+
+        def decode_with_pem():
+            return jwt.decode(token, public_pem, algorithms=["RS256"])
+
+        def decode_with_keyring():
+            return decode_token(token)
+
+        assert decode_with_pem() == decode_with_keyring()
+
+        results = {
+            "raw PEM (before)": timeit(decode_with_pem, number=args.iterations),
+            "keyring (after)": timeit(decode_with_keyring, number=args.iterations),
+        }
+
+    for name, elapsed in results.items():
+        print(f"{name:<20} {elapsed / args.iterations * 1e6:10.1f} us/decode")
+    before, after = results.values()
+    print(f"{'speedup':<20} {before / after:10.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+"""
+Local stand-in for the authentication service behind ``TOKEN_VALIDATION_URL``.
+
+Every POST is answered like the real service's token validation endpoint,
+after a configurable latency; a configurable share of calls fail with a 500.
+
+Usage:
+    python -m benchmarks.fake_auth [--port N] [--latency S] [--error-rate R]
+"""
+import argparse
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+VALID_RESPONSE = json.dumps({"data": {"is_valid": True}}).encode("utf-8")
+ERROR_RESPONSE = json.dumps({"data": None, "error": "Internal error."}).encode("utf-8")
+
+
+class FakeAuthServer:
+    """Threaded HTTP server answering token validation requests."""
+
+    def __init__(self, host="127.0.0.1", port=0, latency=0.0, jitter=0.0, error_rate=0.0):
+        """
+        Args:
+            host (str): Interface to listen on.
+            port (int): Port to listen on, 0 picks a free one.
+            latency (float): Seconds spent on every call.
+            jitter (float): Extra random latency of up to this many seconds.
+            error_rate (float): Share of calls (0-1) answered with HTTP 500.
+        """
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.calls = 0
+        self.errors = 0
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), self._handler_class())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        """The URL to use as ``TOKEN_VALIDATION_URL``."""
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/api/auth/validate-token/"
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            # Keep-alive responses are small, do not let Nagle delay them
+            disable_nagle_algorithm = True
+
+            def log_message(self, format, *args):
+                pass
+
+            def do_POST(self):
+                self.rfile.read(int(self.headers.get("Content-Length", 0)))
+                failed = server.record_call()
+                time.sleep(server.latency + random.uniform(0, server.jitter))
+
+                body = ERROR_RESPONSE if failed else VALID_RESPONSE
+                self.send_response(500 if failed else 200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+        return Handler
+
+    def record_call(self):
+        """Counts a call and returns whether it must fail."""
+        failed = random.random() < self.error_rate
+        with self._lock:
+            self.calls += 1
+            self.errors += failed
+        return failed
+
+    def start(self):
+        """Serves requests from a background thread."""
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """Stops serving and closes the listening socket."""
+        self._server.shutdown()
+        self._server.server_close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8002)
+    parser.add_argument("--latency", type=float, default=0.005, help="Seconds per call.")
+    parser.add_argument("--jitter", type=float, default=0.0, help="Extra random seconds per call.")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Share of calls answered with HTTP 500.")
+    args = parser.parse_args()
+
+    server = FakeAuthServer(args.host, args.port, args.latency, args.jitter, args.error_rate).start()
+    print(f"TOKEN_VALIDATION_URL={server.url}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
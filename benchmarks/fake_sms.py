@@ -0,0 +1,112 @@
+"""
+Local stand-in for an SMS provider API, for ``notifications.providers.HTTPProvider``.
+
+Every POST is answered with ``{"id": ...}`` (``{"ids": [...]}`` for bulk
+sends) after a configurable latency. The server runs on an event loop, so
+thousands of concurrent keep-alive connections cost no thread each.
+
+Usage:
+    python -m benchmarks.fake_sms [--port N] [--latency S]
+"""
+import argparse
+import asyncio
+import json
+import threading
+import time
+import uuid
+
+
+class FakeSMSServer:
+    """HTTP/1.1 server answering SMS send requests from a background event loop."""
+
+    def __init__(self, host="127.0.0.1", port=0, latency=0.0):
+        """
+        Args:
+            host (str): Interface to listen on.
+            port (int): Port to listen on, 0 picks a free one.
+            latency (float): Seconds spent on every call.
+        """
+        self.host = host
+        self.port = port
+        self.latency = latency
+        self.calls = 0
+        self._loop = asyncio.new_event_loop()
+        self._server = None
+        self._thread = None
+
+    @property
+    def url(self):
+        """The URL of single sends."""
+        return f"http://{self.host}:{self.port}/send/"
+
+    @property
+    def bulk_url(self):
+        """The URL of bulk sends."""
+        return f"http://{self.host}:{self.port}/send-bulk/"
+
+    async def _handle(self, reader, writer):
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                content_length = 0
+                while (line := await reader.readline()) not in (b"\r\n", b""):
+                    name, _, value = line.decode("latin-1").partition(":")
+                    if name.strip().lower() == "content-length":
+                        content_length = int(value)
+                body = json.loads(await reader.readexactly(content_length) or b"{}")
+
+                self.calls += 1
+                await asyncio.sleep(self.latency)
+                if "messages" in body:
+                    payload = {"ids": [uuid.uuid4().hex for _ in body["messages"]]}
+                else:
+                    payload = {"id": uuid.uuid4().hex}
+                response = json.dumps(payload).encode("utf-8")
+                writer.write(
+                    b"HTTP/1.1 200 OK\r\nContent-Type: application/json\r\n"
+                    + f"Content-Length: {len(response)}\r\n\r\n".encode("latin-1")
+                    + response
+                )
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    def start(self):
+        """Serves requests from a background thread."""
+        self._server = self._loop.run_until_complete(
+            asyncio.start_server(self._handle, self.host, self.port, backlog=4096)
+        )
+        self.port = self._server.sockets[0].getsockname()[1]
+        self._thread = threading.Thread(target=self._loop.run_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """Stops serving and closes the listening socket."""
+        self._loop.call_soon_threadsafe(self._server.close)
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8003)
+    parser.add_argument("--latency", type=float, default=0.2, help="Seconds per call.")
+    args = parser.parse_args()
+
+    server = FakeSMSServer(args.host, args.port, args.latency).start()
+    print(f"url={server.url} bulk_url={server.bulk_url}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
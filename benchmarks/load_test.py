@@ -0,0 +1,323 @@
+"""
+Offline load test of ``/api/otp/send-otp/`` and ``/api/otp/verify-otp/``.
+
+Runs without the docker-compose stack: the API is served in-process by a
+threaded WSGI server, the authentication service is replaced by
+``benchmarks.fake_auth``, Redis by an in-process fakeredis server (or any
+Redis given with ``--redis-url``) and Celery by the in-memory broker (or
+eager execution). Concurrent clients send a mix of send and verify calls;
+throughput and p50/p95/p99 latency per endpoint are printed and saved as JSON.
+
+fakeredis (with lupa, for the Lua scripts) is only needed for the default
+in-process Redis: ``pip install "fakeredis[lua]"``.
+
+Usage:
+    python -m benchmarks.load_test [--duration S] [--concurrency N] [--verify-ratio R]
+        [--auth-latency S] [--auth-error-rate R] [--redis-url URL] [--celery {memory,eager}]
+        [--output PATH]
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import random
+import tempfile
+import threading
+import time
+from collections import Counter, deque
+from datetime import datetime, timezone
+from socketserver import ThreadingMixIn
+from statistics import mean, quantiles
+from urllib.parse import urlparse
+from wsgiref.simple_server import WSGIRequestHandler, WSGIServer, make_server
+
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+
+from .fake_auth import FakeAuthServer
+
+SEND_OTP_PATH = "/api/otp/send-otp/"
+VERIFY_OTP_PATH = "/api/otp/verify-otp/"
+
+
+class ThreadingWSGIServer(ThreadingMixIn, WSGIServer):
+    daemon_threads = True
+    # The default backlog of 5 drops connections under concurrent load
+    request_queue_size = 1024
+
+
+class QuietWSGIRequestHandler(WSGIRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+
+def generate_key_pair(directory):
+    """Writes a fresh RSA public key to ``directory`` and returns the private key."""
+    private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    public_pem = private_key.public_key().public_bytes(
+        serialization.Encoding.PEM,
+        serialization.PublicFormat.SubjectPublicKeyInfo,
+    )
+    with open(os.path.join(directory, "public.key"), "wb") as key_file:
+        key_file.write(public_pem)
+    return private_key
+
+
+def use_fake_redis():
+    """Points every Redis connection pool (sync and asyncio) at one in-process fakeredis server."""
+    import fakeredis
+    import fakeredis.aioredis
+    import redis
+    import redis.asyncio
+
+    server = fakeredis.FakeServer()
+
+    def fake_pool(pool_class, connection_class):
+        class FakeConnectionPool(pool_class):
+            def __init__(self, *args, **kwargs):
+                for option in ("host", "port", "password"):
+                    kwargs.pop(option, None)
+                super().__init__(*args, connection_class=connection_class, server=server, **kwargs)
+
+        return FakeConnectionPool
+
+    redis.ConnectionPool = fake_pool(redis.ConnectionPool, fakeredis.FakeConnection)
+    redis.asyncio.ConnectionPool = fake_pool(redis.asyncio.ConnectionPool, fakeredis.aioredis.FakeConnection)
+
+
+def configure_environment(args, auth_server, key_path):
+    """Sets the environment read by ``notification_service.settings``."""
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "notification_service.settings")
+    os.environ["TOKEN_VALIDATION_URL"] = auth_server.url
+    os.environ["JWT_PUBLIC_KEY_PATH"] = key_path
+    os.environ["CELERY_BROKER_URL"] = "memory://"
+    os.environ["CELERY_RESULT_BACKEND"] = "cache+memory://"
+    os.environ["SMS_STUB_LATENCY"] = str(args.sms_latency)
+    os.environ["SMS_STUB_PER_MESSAGE_LATENCY"] = "0"
+    # Random numbers and many callers would rarely hit the limits anyway;
+    # keep them out of the measured path unless asked for
+    os.environ["OTP_RATE_LIMIT_ENABLED"] = str(args.rate_limit)
+    # No worker drains the memory broker, the backlog would only grow
+    os.environ["ADMISSION_CONTROL_ENABLED"] = "False"
+
+    if args.redis_url:
+        redis_url = urlparse(args.redis_url)
+        os.environ["REDIS_HOST"] = redis_url.hostname or "127.0.0.1"
+        os.environ["REDIS_PORT"] = str(redis_url.port or 6379)
+        os.environ["REDIS_DB"] = redis_url.path.lstrip("/") or "0"
+        os.environ["REDIS_PASSWORD"] = redis_url.password or ""
+    else:
+        os.environ["REDIS_HOST"] = "127.0.0.1"
+        use_fake_redis()
+
+
+def summarize(latencies, statuses, elapsed):
+    """
+    Builds the statistics of one endpoint.
+
+    Args:
+        latencies (list): Request latencies in seconds.
+        statuses (Counter): Response status codes.
+        elapsed (float): Duration of the run in seconds.
+
+    Returns:
+        dict: Request count, throughput, latency percentiles in milliseconds and status counts.
+    """
+    if not latencies:
+        return {"requests": 0, "throughput": 0.0, "statuses": {}}
+
+    latencies_ms = [latency * 1000 for latency in latencies]
+    cut_points = quantiles(latencies_ms, n=100, method="inclusive") if len(latencies_ms) > 1 else latencies_ms * 99
+    return {
+        "requests": len(latencies_ms),
+        "throughput": round(len(latencies_ms) / elapsed, 1),
+        "mean_ms": round(mean(latencies_ms), 2),
+        "p50_ms": round(cut_points[49], 2),
+        "p95_ms": round(cut_points[94], 2),
+        "p99_ms": round(cut_points[98], 2),
+        "max_ms": round(max(latencies_ms), 2),
+        "statuses": {str(code): count for code, count in sorted(statuses.items())},
+    }
+
+
+class LoadTest:
+    """Drives concurrent send/verify traffic against the in-process API."""
+
+    def __init__(self, base_url, tokens, verify_ratio, redis_client):
+        self.base_url = base_url
+        self.tokens = tokens
+        self.verify_ratio = verify_ratio
+        self.redis_client = redis_client
+        # Numbers with a live OTP, waiting to be verified
+        self.sent = deque()
+        self.latencies = {SEND_OTP_PATH: [], VERIFY_OTP_PATH: []}
+        self.statuses = {SEND_OTP_PATH: Counter(), VERIFY_OTP_PATH: Counter()}
+        self.failures = Counter()
+        self._lock = threading.Lock()
+
+    def next_request(self):
+        """Picks the next call, returns (path, body)."""
+        if self.sent and random.random() < self.verify_ratio:
+            try:
+                phone_number = self.sent.popleft()
+            except IndexError:
+                pass
+            else:
+                otp = self.redis_client.get_otp(phone_number)
+                otp = otp.decode("utf-8") if otp else "000000"
+                return VERIFY_OTP_PATH, {"phone_number": phone_number, "otp": otp}
+
+        return SEND_OTP_PATH, {"phone_number": f"+989{random.randrange(10**9):09d}"}
+
+    def client_loop(self, deadline):
+        """One concurrent client: calls the API until ``deadline``."""
+        import requests
+
+        session = requests.Session()
+        token = random.choice(self.tokens)
+        headers = {"Authorization": f"Bearer {token}"}
+
+        while time.perf_counter() < deadline:
+            path, body = self.next_request()
+            started = time.perf_counter()
+            try:
+                response = session.post(self.base_url + path, json=body, headers=headers, timeout=30)
+            except requests.RequestException as exc:
+                with self._lock:
+                    self.failures[type(exc).__name__] += 1
+                continue
+            latency = time.perf_counter() - started
+
+            with self._lock:
+                self.latencies[path].append(latency)
+                self.statuses[path][response.status_code] += 1
+            if path == SEND_OTP_PATH and response.status_code == 200:
+                self.sent.append(body["phone_number"])
+
+    def run(self, concurrency, duration):
+        """
+        Runs ``concurrency`` clients for ``duration`` seconds.
+
+        Returns:
+            float: The measured wall-clock duration.
+        """
+        started = time.perf_counter()
+        deadline = started + duration
+        clients = [threading.Thread(target=self.client_loop, args=(deadline,)) for _ in range(concurrency)]
+        for client in clients:
+            client.start()
+        for client in clients:
+            client.join()
+        return time.perf_counter() - started
+
+    def report(self, elapsed):
+        """Returns the per-endpoint and total statistics."""
+        endpoints = {
+            path: summarize(self.latencies[path], self.statuses[path], elapsed)
+            for path in self.latencies
+        }
+        endpoints["total"] = summarize(
+            self.latencies[SEND_OTP_PATH] + self.latencies[VERIFY_OTP_PATH],
+            self.statuses[SEND_OTP_PATH] + self.statuses[VERIFY_OTP_PATH],
+            elapsed,
+        )
+        return {"endpoints": endpoints, "client_errors": dict(self.failures)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--duration", type=float, default=10.0, help="Seconds of measured traffic.")
+    parser.add_argument("--warmup", type=float, default=1.0, help="Seconds of unmeasured traffic first.")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--verify-ratio", type=float, default=0.5, help="Share of calls that verify a sent OTP.")
+    parser.add_argument("--tokens", type=int, default=50, help="Distinct callers (JWTs) in the traffic.")
+    parser.add_argument("--auth-latency", type=float, default=0.005, help="Seconds per auth service call.")
+    parser.add_argument("--auth-jitter", type=float, default=0.0)
+    parser.add_argument("--auth-error-rate", type=float, default=0.0, help="Share of auth calls failing with 500.")
+    parser.add_argument("--redis-url", help="Use this Redis instead of the in-process fakeredis server.")
+    parser.add_argument("--celery", choices=("memory", "eager"), default="memory",
+                        help="Publish to the in-memory broker, or run the SMS tasks eagerly in the API.")
+    parser.add_argument("--sms-latency", type=float, default=0.0, help="Stub SMS provider seconds per call (eager).")
+    parser.add_argument("--rate-limit", action="store_true", help="Keep send-otp rate limiting enabled.")
+    parser.add_argument("--output", default="load_test_results.json", help="Where to save the JSON results.")
+    args = parser.parse_args()
+
+    auth_server = FakeAuthServer(
+        latency=args.auth_latency,
+        jitter=args.auth_jitter,
+        error_rate=args.auth_error_rate,
+    ).start()
+
+    with tempfile.TemporaryDirectory() as directory:
+        private_key = generate_key_pair(directory)
+        configure_environment(args, auth_server, os.path.join(directory, "public.key"))
+
+        import django
+        import jwt
+
+        django.setup()
+        from django.core.wsgi import get_wsgi_application
+
+        from notification_service.celery import app as celery_app
+        from utils import redis_client_ins
+
+        if redis_client_ins is None:
+            parser.error("Redis is not reachable.")
+        celery_app.conf.task_always_eager = args.celery == "eager"
+
+        tokens = [
+            jwt.encode(
+                {"type": "access", "sub": f"load-test-{index}", "exp": int(time.time()) + 3600},
+                private_key,
+                algorithm="RS256",
+            )
+            for index in range(args.tokens)
+        ]
+
+        server = make_server(
+            "127.0.0.1", 0, get_wsgi_application(),
+            server_class=ThreadingWSGIServer,
+            handler_class=QuietWSGIRequestHandler,
+        )
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        base_url = f"http://127.0.0.1:{server.server_port}"
+
+        # The stub SMS provider prints every message
+        with contextlib.redirect_stdout(io.StringIO()):
+            if args.warmup > 0:
+                LoadTest(base_url, tokens, args.verify_ratio, redis_client_ins).run(args.concurrency, args.warmup)
+            auth_calls_before, auth_errors_before = auth_server.calls, auth_server.errors
+            load_test = LoadTest(base_url, tokens, args.verify_ratio, redis_client_ins)
+            elapsed = load_test.run(args.concurrency, args.duration)
+
+        server.shutdown()
+        auth_server.stop()
+
+    results = {
+        "started_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "config": {key: value for key, value in vars(args).items() if key != "output"},
+        "duration": round(elapsed, 3),
+        **load_test.report(elapsed),
+        "auth_service": {
+            "calls": auth_server.calls - auth_calls_before,
+            "errors": auth_server.errors - auth_errors_before,
+        },
+    }
+
+    with open(args.output, "w") as output_file:
+        json.dump(results, output_file, indent=2)
+
+    print(f"{'endpoint':<22} {'req/s':>9} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}  statuses")
+    for path, stats in results["endpoints"].items():
+        print(
+            f"{path:<22} {stats['throughput']:9.1f} {stats.get('p50_ms', 0):8.2f} "
+            f"{stats.get('p95_ms', 0):8.2f} {stats.get('p99_ms', 0):8.2f}  {stats['statuses']}"
+        )
+    if results["client_errors"]:
+        print(f"client errors: {results['client_errors']}")
+    print(f"auth service calls: {results['auth_service']['calls']}, results saved to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
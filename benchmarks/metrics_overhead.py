@@ -0,0 +1,47 @@
+"""
+Overhead of the per-stage metrics added to the OTP request path.
+
+Measures an empty ``metrics.timer`` block, a bare ``metrics.observe`` and
+``metrics.increment`` with metrics enabled, and the timer with metrics
+disabled.
+
+Usage:
+    python -m benchmarks.metrics_overhead [--iterations N]
+"""
+import argparse
+import os
+from timeit import timeit
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--iterations", type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "notification_service.settings")
+    import django
+
+    django.setup()
+    from utils.metrics import Metrics
+
+    enabled = Metrics(enabled=True, multiproc_dir="")
+    disabled = Metrics(enabled=False, multiproc_dir="")
+
+    def timed_block(metrics):
+        with metrics.timer("benchmark"):
+            pass
+
+    results = {
+        "timer (enabled)": timeit(lambda: timed_block(enabled), number=args.iterations),
+        "observe (enabled)": timeit(lambda: enabled.observe("benchmark", 0.001), number=args.iterations),
+        "increment (enabled)": timeit(lambda: enabled.increment("benchmark"), number=args.iterations),
+        "timer (disabled)": timeit(lambda: timed_block(disabled), number=args.iterations),
+        "empty call": timeit(lambda: None, number=args.iterations),
+    }
+
+    for name, elapsed in results.items():
+        print(f"{name:<20} {elapsed / args.iterations * 1e9:8.0f} ns/call")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""
+Redis memory used per live OTP by the legacy and the compact storage formats.
+
+Writes N codes in each format to an empty Redis database (it is flushed
+before every run) and reports the growth of ``used_memory``, the bytes per
+code and the encoding of the compact buckets. Needs a real Redis server
+with room for the largest run (roughly 1 GB for 10M legacy keys).
+
+Usage:
+    python -m benchmarks.otp_memory [--redis-url URL] [--counts 1000000,10000000] [--batch-size N]
+"""
+import argparse
+import os
+from time import perf_counter, time
+
+# Consecutive test numbers are spread over the national range with a stride
+# coprime to its size, so they are distinct and look like random numbers
+NUMBER_BASE = 9_000_000_000
+NUMBER_RANGE = 1_000_000_000
+NUMBER_STRIDE = 7919
+
+
+def phone_numbers(start, stop):
+    return [f"+98{NUMBER_BASE + index * NUMBER_STRIDE % NUMBER_RANGE}" for index in range(start, stop)]
+
+
+def write_legacy(client, count, batch_size, ttl):
+    from utils.redis_client import legacy_otp_key
+
+    for start in range(0, count, batch_size):
+        pipe = client.pipeline(transaction=False)
+        for phone_number in phone_numbers(start, min(start + batch_size, count)):
+            pipe.set(legacy_otp_key(phone_number), "123456", ex=ttl)
+        pipe.execute()
+
+
+def write_compact(client, count, batch_size, ttl):
+    from utils.redis_client import pack_otp
+
+    packed_otp = pack_otp("123456", int(time()) + ttl)
+    for start in range(0, count, batch_size):
+        client.store_packed_otps(dict.fromkeys(phone_numbers(start, min(start + batch_size, count)), packed_otp))
+
+
+def measure(client, name, writer, count, batch_size, ttl):
+    client.flushdb()
+    before = client.info("memory")["used_memory"]
+    started = perf_counter()
+    writer(client, count, batch_size, ttl)
+    elapsed = perf_counter() - started
+    used = client.info("memory")["used_memory"] - before
+    print(
+        f"{name:<8} {count:>11,} codes {client.dbsize():>11,} keys "
+        f"{used / 2**20:10.1f} MiB {used / count:8.1f} B/code {count / elapsed:10.0f} codes/s"
+    )
+    return used
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--redis-url", default="redis://localhost:6379/15")
+    parser.add_argument("--counts", default="1000000,10000000", help="Comma separated numbers of codes.")
+    parser.add_argument("--batch-size", type=int, default=10_000)
+    args = parser.parse_args()
+
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "notification_service.settings")
+    import django
+
+    django.setup()
+    from django.conf import settings
+
+    from utils.redis_client import Redis, otp_key
+
+    client = Redis.from_url(args.redis_url)
+    ttl = settings.OTP_TTL_SECONDS
+    listpack_entries = client.config_get("hash-max-listpack-entries").get("hash-max-listpack-entries")
+    print(f"{settings.OTP_STORAGE_BUCKETS} buckets, hash-max-listpack-entries {listpack_entries}")
+
+    for count in (int(value) for value in args.counts.split(",")):
+        legacy = measure(client, "legacy", write_legacy, count, args.batch_size, ttl)
+        compact = measure(client, "compact", write_compact, count, args.batch_size, ttl)
+        bucket_key = otp_key(phone_numbers(0, 1)[0])[0]
+        print(
+            f"compact uses {compact / legacy:.0%} of the legacy memory, "
+            f"sample bucket: {client.hlen(bucket_key)} fields, {client.object('encoding', bucket_key).decode()}"
+        )
+    client.flushdb()
+
+
+if __name__ == "__main__":
+    main()
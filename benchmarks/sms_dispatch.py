@@ -0,0 +1,54 @@
+"""
+Throughput benchmark for SMS delivery with the stub provider.
+
+Compares one provider call per message (the previous ``send_otp_task``
+behaviour) against bulk provider calls made by ``notifications.dispatcher.send_batch``.
+
+Usage:
+    python -m benchmarks.sms_dispatch [--messages N] [--batch-size N] [--latency S]
+"""
+import argparse
+import contextlib
+import io
+import os
+import time
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--messages", type=int, default=200)
+    parser.add_argument("--batch-size", type=int, default=100)
+    parser.add_argument("--latency", type=float, default=0.05, help="Seconds per provider call.")
+    parser.add_argument("--per-message-latency", type=float, default=0.0005)
+    args = parser.parse_args()
+
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "notification_service.settings")
+    import django
+
+    django.setup()
+    from notifications.channels import get_channel
+    from notifications.dispatcher import send_batch
+    from notifications.providers import StubProvider
+    from otp.dispatcher import format_otp_message
+
+    provider = StubProvider(latency=args.latency, per_message_latency=args.per_message_latency)
+    messages = [(f"+98{index:010d}", format_otp_message("123456")) for index in range(args.messages)]
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        started = time.perf_counter()
+        for phone_number, text in messages:
+            provider.send(phone_number, text)
+        single_elapsed = time.perf_counter() - started
+
+        started = time.perf_counter()
+        for offset in range(0, len(messages), args.batch_size):
+            send_batch(get_channel("sms"), messages[offset:offset + args.batch_size], provider=provider)
+        batched_elapsed = time.perf_counter() - started
+
+    print(f"{'single sends':<16} {args.messages / single_elapsed:10.1f} msg/s")
+    print(f"{'batched sends':<16} {args.messages / batched_elapsed:10.1f} msg/s")
+    print(f"{'speedup':<16} {single_elapsed / batched_elapsed:10.1f}x")
+
+
+if __name__ == "__main__":
+    main()
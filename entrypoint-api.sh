@@ -18,5 +18,8 @@ echo "Redis is up and running!"
 echo "Collecting static files..."
 python manage.py collectstatic --noinput
 
+echo "Generating the OpenAPI schema..."
+python manage.py generate_schema
+
 echo "Starting Gunicorn..."
-exec gunicorn notification_service.wsgi:application --bind 0.0.0.0:8001
\ No newline at end of file
+exec gunicorn -c python:notification_service.gunicorn_conf
\ No newline at end of file
@@ -9,5 +9,5 @@ while ! nc -z rabbitmq 5672; do
 done
 echo "Rabbitmq is up and running!"
 
-echo "Starting Gunicorn..."
-exec celery -A notification_service worker --loglevel=info
\ No newline at end of file
+echo "Starting the ${NOTIFICATION_WORKER_POOL:-prefork} worker for channels: ${NOTIFICATION_WORKER_CHANNELS:-all}..."
+exec python -m notifications.worker --channels "${NOTIFICATION_WORKER_CHANNELS:-}" --pool "${NOTIFICATION_WORKER_POOL:-prefork}" --loglevel=info
\ No newline at end of file
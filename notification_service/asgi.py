@@ -2,6 +2,8 @@
 ASGI config for notification_service project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
+Set ``OTP_ASYNC_VIEWS=True`` when serving through ASGI, so the OTP endpoints
+run fully on the event loop instead of through sync adapters.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/4.2/howto/deployment/asgi/
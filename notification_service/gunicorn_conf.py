@@ -0,0 +1,113 @@
+"""
+Gunicorn configuration of the API service.
+
+The application is preloaded in the master: settings, middleware, URLconf,
+views and the parsed JWT public keys are imported once and shared
+copy-on-write by the workers. Everything that holds connections or threads
+(Redis pools, the authentication service HTTP clients, Celery producers,
+the revocation listener, the task publisher) is created lazily, in each
+worker after the fork.
+
+Usage:
+    gunicorn -c python:notification_service.gunicorn_conf
+"""
+import gc
+import os
+from math import ceil
+from pathlib import Path
+
+import environ
+
+env = environ.Env()
+environ.Env.read_env(os.path.join(Path(__file__).resolve().parent.parent, ".env"))
+
+# Values of GUNICORN_WORKER_CLASS and the gunicorn worker classes they select
+WORKER_CLASSES = {
+    "gthread": "gthread",
+    "gevent": "gevent",
+    "uvicorn": "uvicorn.workers.UvicornWorker",
+}
+
+# cgroup v2 CPU quota of the container, "max" or "<quota> <period>"
+CGROUP_CPU_MAX = "/sys/fs/cgroup/cpu.max"
+
+
+def usable_cpus():
+    """
+    Counts the CPUs this process may use.
+
+    Returns:
+        int: The container CPU quota rounded up when there is one, otherwise the CPU affinity.
+    """
+    cpus = len(os.sched_getaffinity(0))
+    try:
+        with open(CGROUP_CPU_MAX) as cpu_max:
+            quota, period = cpu_max.read().split()
+        if quota != "max":
+            cpus = min(cpus, ceil(int(quota) / int(period)))
+    except (OSError, ValueError):
+        pass
+    return max(cpus, 1)
+
+
+worker_type = env("GUNICORN_WORKER_CLASS", default="gthread")
+if worker_type not in WORKER_CLASSES:
+    raise ValueError(f"GUNICORN_WORKER_CLASS must be one of {', '.join(WORKER_CLASSES)}.")
+
+if worker_type == "gevent":
+    # Before the application is preloaded, so it only ever sees patched modules
+    from gevent import monkey
+
+    monkey.patch_all()
+
+if worker_type == "uvicorn":
+    os.environ.setdefault("OTP_ASYNC_VIEWS", "True")
+    wsgi_app = "notification_service.asgi:application"
+else:
+    wsgi_app = "notification_service.wsgi:application"
+
+bind = env("GUNICORN_BIND", default="0.0.0.0:8001")
+worker_class = WORKER_CLASSES[worker_type]
+preload_app = True
+
+# One worker per usable CPU; concurrency within a worker comes from threads
+# (gthread) or greenlets (gevent), so that together the workers serve
+# GUNICORN_TARGET_CONCURRENCY requests at once
+workers = env.int("GUNICORN_WORKERS", default=usable_cpus())
+if worker_type in ("gthread", "gevent"):
+    target_concurrency = env.int("GUNICORN_TARGET_CONCURRENCY", default=64)
+    worker_concurrency = ceil(target_concurrency / workers)
+    if worker_type == "gthread":
+        threads = worker_concurrency
+    else:
+        worker_connections = worker_concurrency
+
+    # Requests beyond the threads or greenlets of a worker wait in gunicorn and
+    # never reach the concurrency limiter, which therefore only sheds load while
+    # its limit is below them; a higher limit would merely delay its reaction.
+    # The uvicorn worker ignores worker_connections and takes every connection
+    # on its event loop, so there the limiter alone caps the requests in flight
+    os.environ.setdefault("CONCURRENCY_LIMIT_MAX", str(worker_concurrency))
+
+timeout = env.int("GUNICORN_TIMEOUT", default=30)
+# Leaves the task publisher time to flush its buffer on shutdown
+graceful_timeout = env.int("GUNICORN_GRACEFUL_TIMEOUT", default=30)
+keepalive = env.int("GUNICORN_KEEPALIVE", default=5)
+
+
+def when_ready(server):
+    # Django imports the URLconf and the views on the first request, import
+    # them in the master instead so the workers share them too
+    from django.urls import get_resolver
+
+    get_resolver().url_patterns
+    # Keep the collector of the workers away from the preloaded objects: a
+    # collection writes to every object it visits, copying its memory page
+    gc.freeze()
+
+
+def worker_exit(server, worker):
+    # Publish the tasks still buffered before the worker goes away
+    from otp.publisher import task_publisher
+
+    task_publisher.close()
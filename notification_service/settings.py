@@ -16,6 +16,10 @@ DEBUG = env("DEBUG")
 
 ALLOWED_HOSTS = ['*']
 
+# Lean API-only profile: no admin, sessions, messages, CSRF or clickjacking
+# machinery, none of which is used by this JWT-authenticated API
+API_PROFILE = env.bool("API_PROFILE", default=False)
+
 # Application definition
 INSTALLED_APPS = [
     "django.contrib.admin",
@@ -26,6 +30,7 @@ INSTALLED_APPS = [
     "django.contrib.staticfiles",
     "rest_framework",
     "otp",
+    "notifications",
     "drf_yasg",
 ]
 
@@ -40,6 +45,22 @@ MIDDLEWARE = [
     "otp.middleware.TokenValidationMiddleware",
 ]
 
+if API_PROFILE:
+    INSTALLED_APPS = [
+        "django.contrib.auth",
+        "django.contrib.contenttypes",
+        "django.contrib.staticfiles",
+        "rest_framework",
+        "otp",
+        "notifications",
+        "drf_yasg",
+    ]
+    MIDDLEWARE = [
+        "django.middleware.security.SecurityMiddleware",
+        "django.middleware.common.CommonMiddleware",
+        "otp.middleware.TokenValidationMiddleware",
+    ]
+
 ROOT_URLCONF = "notification_service.urls"
 
 TEMPLATES = [
@@ -52,37 +73,285 @@ TEMPLATES = [
                 "django.template.context_processors.debug",
                 "django.template.context_processors.request",
                 "django.contrib.auth.context_processors.auth",
+            ] + ([] if API_PROFILE else [
                 "django.contrib.messages.context_processors.messages",
-            ],
+            ]),
         },
     },
 ]
 
 WSGI_APPLICATION = "notification_service.wsgi.application"
 
+# Serve the OTP endpoints with the async views (enable when running under ASGI)
+OTP_ASYNC_VIEWS = env.bool("OTP_ASYNC_VIEWS", default=False)
+
 # Redis Configuration for OTP storage and caching token validation
 REDIS_HOST = env("REDIS_HOST")
 REDIS_PORT = env("REDIS_PORT")
 REDIS_DB = env.int("REDIS_DB")
 REDIS_PASSWORD = env("REDIS_PASSWORD")
+# Redis Cluster startup nodes ("host:port,host:port"); when set the OTP keyspace
+# is sharded over the cluster and REDIS_HOST/REDIS_PORT/REDIS_DB are ignored
+REDIS_CLUSTER_NODES = env.list("REDIS_CLUSTER_NODES", default=[])
+# Retries of a command after connection errors while the slot map is refreshed (failover)
+REDIS_CLUSTER_RETRY_ATTEMPTS = env.int("REDIS_CLUSTER_RETRY_ATTEMPTS", default=3)
 
 # JWT Configuration
-with open(env("JWT_PUBLIC_KEY_PATH"), "r") as key_file:
-    JWT_PUBLIC_KEY = key_file.read()
+# A single PEM file, or a directory of PEM files named after their ``kid``
+JWT_PUBLIC_KEY_PATH = env("JWT_PUBLIC_KEY_PATH")
+# Seconds between checks for rotated key files
+JWT_KEYRING_RELOAD_INTERVAL = env.int("JWT_KEYRING_RELOAD_INTERVAL", default=30)
+# Key used for tokens without a ``kid`` header when several keys are loaded
+JWT_DEFAULT_KID = env("JWT_DEFAULT_KID", default=None)
+# Claim identifying the caller, used e.g. for per-caller rate limits
+JWT_SUBJECT_CLAIM = env("JWT_SUBJECT_CLAIM", default="sub")
 
 # OTP TTL Configuration
 OTP_TTL_SECONDS = env.int("OTP_TTL_SECONDS", default=300)  # Default 5 minutes
 
+# Failed verifications allowed per number before it is locked, and lock duration
+OTP_MAX_VERIFY_ATTEMPTS = env.int("OTP_MAX_VERIFY_ATTEMPTS", default=5)
+OTP_VERIFY_LOCK_SECONDS = env.int("OTP_VERIFY_LOCK_SECONDS", default=OTP_TTL_SECONDS)
+
+# Number of Redis hashes the OTPs are spread over, see ``utils.redis_client.otp_location``.
+# Keep live codes per bucket under ``hash-max-listpack-entries`` (128) so buckets stay
+# listpack-encoded; changing it orphans the live codes
+OTP_STORAGE_BUCKETS = env.int("OTP_STORAGE_BUCKETS", default=131072)
+# Also read and delete codes of the one-key-per-number format (single node only);
+# disable once ``manage.py migrate_otp_storage`` has run
+OTP_STORAGE_LEGACY_FALLBACK = env.bool("OTP_STORAGE_LEGACY_FALLBACK", default=True)
+
+# Bulk OTP sending: max numbers per request and numbers per Celery message
+OTP_BULK_MAX_SIZE = env.int("OTP_BULK_MAX_SIZE", default=1000)
+OTP_BULK_CHUNK_SIZE = env.int("OTP_BULK_CHUNK_SIZE", default=50)
+
+# OTP campaigns streamed from CSV/JSONL files (``manage.py run_campaign`` or
+# POST /api/otp/campaigns/): every CAMPAIGN_CHUNK_SIZE rows are written to Redis
+# in one pipeline, published as one bulk send and checkpointed
+CAMPAIGN_CHUNK_SIZE = env.int("CAMPAIGN_CHUNK_SIZE", default=1000)
+# Chunks processed by one Celery task before it hands the campaign to the next one
+CAMPAIGN_CHUNKS_PER_TASK = env.int("CAMPAIGN_CHUNKS_PER_TASK", default=100)
+CAMPAIGN_QUEUE = env("CAMPAIGN_QUEUE", default="campaigns")
+# Uploaded files must be readable by the workers (shared volume)
+CAMPAIGN_UPLOAD_DIR = env("CAMPAIGN_UPLOAD_DIR", default=f"{BASE_DIR}/campaigns")
+CAMPAIGN_UPLOAD_MAX_SIZE = env.int("CAMPAIGN_UPLOAD_MAX_SIZE", default=100 * 1024 * 1024)
+# Seconds the progress and the numbers seen by a campaign are kept, and
+# seconds a runner keeps the campaign lock without checkpointing
+CAMPAIGN_TTL = env.int("CAMPAIGN_TTL", default=7 * 24 * 3600)
+CAMPAIGN_LOCK_TTL = env.int("CAMPAIGN_LOCK_TTL", default=300)
+
 # Token Validation Cache TTL
 TOKEN_VALIDATION_CACHE_TTL = env.int(
     "TOKEN_VALIDATION_CACHE_TTL", default=300
 )  # 5 minutes
+# Short TTL for tokens the auth service rejected, so retries with a bad token
+# do not hammer the auth service.
+TOKEN_VALIDATION_NEGATIVE_CACHE_TTL = env.int(
+    "TOKEN_VALIDATION_NEGATIVE_CACHE_TTL", default=10
+)
+# Max number of validation results kept in each worker's in-process LRU
+TOKEN_VALIDATION_LOCAL_CACHE_SIZE = env.int(
+    "TOKEN_VALIDATION_LOCAL_CACHE_SIZE", default=10000
+)
+
+# Local-only token verification: trust the RS256 signature check and consult
+# the revoked-jti list pushed by the auth service, calling the auth service
+# only for tokens without ``jti`` or while the list is not in sync
+TOKEN_LOCAL_VERIFICATION = env.bool("TOKEN_LOCAL_VERIFICATION", default=False)
+# Redis sorted set (jti scored by token expiry) and stream the auth service publishes revocations to
+# (both share a hash tag, so they live on one Redis Cluster slot)
+REVOCATION_SET_KEY = env("REVOCATION_SET_KEY", default="auth:{revocations}:jtis")
+REVOCATION_STREAM_KEY = env("REVOCATION_STREAM_KEY", default="auth:{revocations}:stream")
+REVOCATION_STREAM_MAXLEN = env.int("REVOCATION_STREAM_MAXLEN", default=100000)
+# In-process Bloom filter sizing
+REVOCATION_FILTER_CAPACITY = env.int("REVOCATION_FILTER_CAPACITY", default=1000000)
+REVOCATION_FILTER_ERROR_RATE = env.float("REVOCATION_FILTER_ERROR_RATE", default=0.001)
+# Seconds the listener blocks on the stream, seconds without news from Redis
+# after which local verification is suspended, and seconds between rebuilds
+REVOCATION_STREAM_BLOCK_SECONDS = env.float("REVOCATION_STREAM_BLOCK_SECONDS", default=5.0)
+REVOCATION_MAX_STALENESS = env.float("REVOCATION_MAX_STALENESS", default=15.0)
+REVOCATION_REBUILD_INTERVAL = env.int("REVOCATION_REBUILD_INTERVAL", default=3600)
 
 # Celery Configuration
 CELERY_BROKER_URL = env("CELERY_BROKER_URL")  # e.g., 'amqp://localhost'
-CELERY_RESULT_BACKEND = env(
-    "CELERY_RESULT_BACKEND", default="rpc://"
-)  # Or 'redis://localhost:6379/0'
+# Notifications are fire-and-forget: nobody waits for task results, delivery
+# is tracked by the status records of ``notifications.status`` instead. Set a
+# backend (e.g. 'redis://localhost:6379/0') only for tasks that opt back in
+# with ``ignore_result=False``
+CELERY_RESULT_BACKEND = env("CELERY_RESULT_BACKEND", default="") or None
+CELERY_TASK_IGNORE_RESULT = True
+# Task messages are smaller with msgpack than with JSON; workers accept both
+CELERY_TASK_SERIALIZER = env("CELERY_TASK_SERIALIZER", default="msgpack")
+CELERY_ACCEPT_CONTENT = ["json", "msgpack"]
+# Compression of the bulk send chunks (one message per BULK_CHUNK_SIZE recipients
+# of a channel); single messages are too small to gain from it
+NOTIFICATION_BULK_COMPRESSION = env("NOTIFICATION_BULK_COMPRESSION", default="zlib") or None
+
+# Tasks published from the API go through a bounded in-process buffer that a
+# background thread flushes over a pooled producer connection (see ``otp.publisher``)
+PUBLISHER_ENABLED = env.bool("PUBLISHER_ENABLED", default=True)
+PUBLISHER_BUFFER_SIZE = env.int("PUBLISHER_BUFFER_SIZE", default=10000)
+PUBLISHER_BATCH_SIZE = env.int("PUBLISHER_BATCH_SIZE", default=100)
+# What a full buffer does: "block" waits up to PUBLISHER_BLOCK_TIMEOUT seconds,
+# "fail" rejects the request with 503, "spill" appends to PUBLISHER_SPILL_STREAM in Redis
+PUBLISHER_OVERFLOW = env("PUBLISHER_OVERFLOW", default="block")
+PUBLISHER_BLOCK_TIMEOUT = env.float("PUBLISHER_BLOCK_TIMEOUT", default=1.0)
+PUBLISHER_SPILL_STREAM = env("PUBLISHER_SPILL_STREAM", default="celery:spill")
+PUBLISHER_SPILL_MAXLEN = env.int("PUBLISHER_SPILL_MAXLEN", default=1000000)
+# Seconds between checks of the spill stream while idle, and seconds a stopping
+# process waits for the buffer to be flushed
+PUBLISHER_POLL_INTERVAL = env.float("PUBLISHER_POLL_INTERVAL", default=1.0)
+PUBLISHER_SHUTDOWN_TIMEOUT = env.float("PUBLISHER_SHUTDOWN_TIMEOUT", default=10.0)
+
+# send-otp rate limiting (token buckets: CAPACITY sends refilled over PERIOD seconds)
+OTP_RATE_LIMIT_ENABLED = env.bool("OTP_RATE_LIMIT_ENABLED", default=True)
+OTP_RATE_LIMIT_PHONE_CAPACITY = env.int("OTP_RATE_LIMIT_PHONE_CAPACITY", default=3)
+OTP_RATE_LIMIT_PHONE_PERIOD = env.int("OTP_RATE_LIMIT_PHONE_PERIOD", default=300)
+OTP_RATE_LIMIT_SUBJECT_CAPACITY = env.int("OTP_RATE_LIMIT_SUBJECT_CAPACITY", default=100)
+OTP_RATE_LIMIT_SUBJECT_PERIOD = env.int("OTP_RATE_LIMIT_SUBJECT_PERIOD", default=60)
+
+# send-otp admission control: a thread of each process samples the backlog of
+# the sms channel (broker queue and worker buffer) and the rate the workers
+# send at every ADMISSION_SAMPLE_INTERVAL seconds. Sends get a 503 while the
+# estimated wait exceeds ADMISSION_MAX_WAIT_RATIO of OTP_TTL_SECONDS
+ADMISSION_CONTROL_ENABLED = env.bool("ADMISSION_CONTROL_ENABLED", default=True)
+ADMISSION_SAMPLE_INTERVAL = env.float("ADMISSION_SAMPLE_INTERVAL", default=2.0)
+ADMISSION_MAX_WAIT_RATIO = env.float("ADMISSION_MAX_WAIT_RATIO", default=0.5)
+# Smaller backlogs are always admitted, e.g. before any drain rate was measured
+ADMISSION_MIN_BACKLOG = env.int("ADMISSION_MIN_BACKLOG", default=100)
+# Samples whose best drain rate is taken as the capacity of the workers
+ADMISSION_RATE_WINDOW = env.int("ADMISSION_RATE_WINDOW", default=30)
+# Seconds after which a sample is too old to reject with (sampling failing)
+ADMISSION_MAX_SAMPLE_AGE = env.float("ADMISSION_MAX_SAMPLE_AGE", default=30.0)
+
+# Adaptive limit of the requests each process serves at once on the API paths
+# (see ``utils.concurrency_limit``); requests over it get a 503. It only acts
+# below the threads (gthread) or greenlets (gevent) of a gunicorn worker, so
+# gunicorn_conf defaults the maximum to them; uvicorn workers take every
+# connection, so there the maximum keeps the default below
+CONCURRENCY_LIMIT_ENABLED = env.bool("CONCURRENCY_LIMIT_ENABLED", default=True)
+CONCURRENCY_LIMIT_INITIAL = env.int("CONCURRENCY_LIMIT_INITIAL", default=20)
+CONCURRENCY_LIMIT_MIN = env.int("CONCURRENCY_LIMIT_MIN", default=4)
+CONCURRENCY_LIMIT_MAX = env.int("CONCURRENCY_LIMIT_MAX", default=500)
+CONCURRENCY_LIMIT_SMOOTHING = env.float("CONCURRENCY_LIMIT_SMOOTHING", default=0.2)
+# Latency increase over the long-term average tolerated before the limit shrinks
+CONCURRENCY_LIMIT_TOLERANCE = env.float("CONCURRENCY_LIMIT_TOLERANCE", default=1.5)
+CONCURRENCY_LIMIT_LONG_WINDOW = env.int("CONCURRENCY_LIMIT_LONG_WINDOW", default=600)
+
+# Repeat sends to a number (or with the same Idempotency-Key header) within
+# this many seconds reuse the live OTP instead of sending a new SMS; 0 disables
+OTP_IDEMPOTENCY_WINDOW = env.int("OTP_IDEMPOTENCY_WINDOW", default=60)
+
+# SMS provider adapter and its constructor keyword arguments
+SMS_PROVIDER_CLASS = env("SMS_PROVIDER_CLASS", default="notifications.providers.StubProvider")
+SMS_PROVIDER_OPTIONS = {
+    "label": "SMS",
+    "recipient_name": "phone number",
+    "latency": env.float("SMS_STUB_LATENCY", default=2.0),
+    "per_message_latency": env.float("SMS_STUB_PER_MESSAGE_LATENCY", default=0.01),
+    "failure_rate": env.float("SMS_STUB_FAILURE_RATE", default=0.0),
+}
+
+# Worker-side SMS batching: flush when the buffer reaches SMS_BATCH_MAX_SIZE
+# messages or SMS_BATCH_MAX_WAIT seconds after the first buffered message
+SMS_BATCH_ENABLED = env.bool("SMS_BATCH_ENABLED", default=True)
+SMS_BATCH_MAX_SIZE = env.int("SMS_BATCH_MAX_SIZE", default=100)
+SMS_BATCH_MAX_WAIT = env.float("SMS_BATCH_MAX_WAIT", default=1.0)
+
+# Notification channels. Each has its own Celery queue, consumed by workers
+# started with ``python -m notifications.worker --channels <name>`` running
+# CONCURRENCY processes, so a slow provider only holds up its own channel.
+# Asyncio workers (``--pool asyncio``) run up to ASYNC_CONCURRENCY provider
+# calls of the channel at once in each process instead.
+# Single messages are buffered in Redis and sent with bulk provider calls of
+# BATCH_MAX_SIZE messages; bulk sends are split into tasks of BULK_CHUNK_SIZE.
+NOTIFICATION_CHANNELS = {
+    "sms": {
+        "QUEUE": env("NOTIFICATION_SMS_QUEUE", default="notifications.sms"),
+        # OTP tasks published to the default queue before the channel queues
+        # existed, and the campaigns feeding the channel
+        "EXTRA_QUEUES": ["celery", CAMPAIGN_QUEUE],
+        "CONCURRENCY": env.int("NOTIFICATION_SMS_CONCURRENCY", default=8),
+        "ASYNC_CONCURRENCY": env.int("NOTIFICATION_SMS_ASYNC_CONCURRENCY", default=500),
+        "PROVIDER_CLASS": SMS_PROVIDER_CLASS,
+        "PROVIDER_OPTIONS": SMS_PROVIDER_OPTIONS,
+        "RECIPIENT_VALIDATOR": "otp.serializers.phone_number_validator",
+        "BATCH_ENABLED": SMS_BATCH_ENABLED,
+        "BATCH_MAX_SIZE": SMS_BATCH_MAX_SIZE,
+        "BATCH_MAX_WAIT": SMS_BATCH_MAX_WAIT,
+        "BULK_CHUNK_SIZE": OTP_BULK_CHUNK_SIZE,
+    },
+    "email": {
+        "QUEUE": env("NOTIFICATION_EMAIL_QUEUE", default="notifications.email"),
+        "CONCURRENCY": env.int("NOTIFICATION_EMAIL_CONCURRENCY", default=4),
+        "ASYNC_CONCURRENCY": env.int("NOTIFICATION_EMAIL_ASYNC_CONCURRENCY", default=100),
+        "PROVIDER_CLASS": env("EMAIL_PROVIDER_CLASS", default="notifications.providers.StubProvider"),
+        "PROVIDER_OPTIONS": {
+            "label": "email",
+            "latency": env.float("EMAIL_STUB_LATENCY", default=2.0),
+            "per_message_latency": env.float("EMAIL_STUB_PER_MESSAGE_LATENCY", default=0.01),
+        },
+        "RECIPIENT_VALIDATOR": "django.core.validators.validate_email",
+        "BATCH_ENABLED": env.bool("EMAIL_BATCH_ENABLED", default=True),
+        "BATCH_MAX_SIZE": env.int("EMAIL_BATCH_MAX_SIZE", default=50),
+        "BATCH_MAX_WAIT": env.float("EMAIL_BATCH_MAX_WAIT", default=2.0),
+        "BULK_CHUNK_SIZE": env.int("EMAIL_BULK_CHUNK_SIZE", default=50),
+    },
+    "push": {
+        "QUEUE": env("NOTIFICATION_PUSH_QUEUE", default="notifications.push"),
+        "CONCURRENCY": env.int("NOTIFICATION_PUSH_CONCURRENCY", default=4),
+        "ASYNC_CONCURRENCY": env.int("NOTIFICATION_PUSH_ASYNC_CONCURRENCY", default=500),
+        "PROVIDER_CLASS": env("PUSH_PROVIDER_CLASS", default="notifications.providers.StubProvider"),
+        "PROVIDER_OPTIONS": {
+            "label": "push notification",
+            "latency": env.float("PUSH_STUB_LATENCY", default=0.5),
+            "per_message_latency": env.float("PUSH_STUB_PER_MESSAGE_LATENCY", default=0.001),
+        },
+        "BATCH_ENABLED": env.bool("PUSH_BATCH_ENABLED", default=True),
+        "BATCH_MAX_SIZE": env.int("PUSH_BATCH_MAX_SIZE", default=500),
+        "BATCH_MAX_WAIT": env.float("PUSH_BATCH_MAX_WAIT", default=1.0),
+        "BULK_CHUNK_SIZE": env.int("PUSH_BULK_CHUNK_SIZE", default=500),
+    },
+}
+# Seconds in-flight sends of an asyncio worker (``--pool asyncio``) get to
+# finish on shutdown before their messages are requeued
+NOTIFICATION_WORKER_SHUTDOWN_TIMEOUT = env.float("NOTIFICATION_WORKER_SHUTDOWN_TIMEOUT", default=30.0)
+# Upper bound of recipients of one notification send (or status) request
+NOTIFICATION_BULK_MAX_SIZE = env.int("NOTIFICATION_BULK_MAX_SIZE", default=1000)
+# Seconds the delivery status of the last message to a recipient is kept
+DELIVERY_STATUS_TTL = env.int("DELIVERY_STATUS_TTL", default=24 * 3600)
+
+CELERY_TASK_ROUTES = {
+    "otp.tasks.send_otp_task": {"queue": NOTIFICATION_CHANNELS["sms"]["QUEUE"]},
+    "otp.tasks.flush_sms_batch_task": {"queue": NOTIFICATION_CHANNELS["sms"]["QUEUE"]},
+    "otp.tasks.run_campaign_task": {"queue": CAMPAIGN_QUEUE},
+}
+
+# Per-stage latency metrics of the OTP request path, scraped from /metrics/
+METRICS_ENABLED = env.bool("METRICS_ENABLED", default=True)
+# Directory shared by the gunicorn workers of a host (cleared on every start);
+# empty keeps the metrics of each process separate
+METRICS_MULTIPROC_DIR = env("METRICS_MULTIPROC_DIR", default="")
+# Seconds between two writes of a worker's metrics to METRICS_MULTIPROC_DIR
+METRICS_FLUSH_INTERVAL = env.float("METRICS_FLUSH_INTERVAL", default=5.0)
+
+# Sampled request profiling: PROFILER_SAMPLE_RATE of the OTP requests, and any
+# request with a signed X-Debug-Profile header (see ``manage.py profile_header``),
+# are profiled into PROFILER_OUTPUT_DIR; merge with ``manage.py profile_report``
+PROFILER_ENABLED = env.bool("PROFILER_ENABLED", default=False)
+PROFILER_SAMPLE_RATE = env.float("PROFILER_SAMPLE_RATE", default=0.001)
+PROFILER_OUTPUT_DIR = env("PROFILER_OUTPUT_DIR", default=os.path.join(BASE_DIR, "profiles"))
+# Seconds a signed debug header stays valid
+PROFILER_HEADER_MAX_AGE = env.int("PROFILER_HEADER_MAX_AGE", default=300)
+# Stop profiling once this many profiles wait in PROFILER_OUTPUT_DIR
+PROFILER_MAX_FILES = env.int("PROFILER_MAX_FILES", default=1000)
+# Also record the top allocations of profiled requests with tracemalloc
+PROFILER_TRACEMALLOC = env.bool("PROFILER_TRACEMALLOC", default=False)
+PROFILER_TRACEMALLOC_FRAMES = env.int("PROFILER_TRACEMALLOC_FRAMES", default=1)
+PROFILER_TRACEMALLOC_TOP = env.int("PROFILER_TRACEMALLOC_TOP", default=25)
+
+if PROFILER_ENABLED:
+    MIDDLEWARE = ["otp.profiling.ProfilingMiddleware"] + MIDDLEWARE
 
 # Password validation
 AUTH_PASSWORD_VALIDATORS = [
@@ -120,9 +389,44 @@ REST_FRAMEWORK = {
     ),
 }
 
+if API_PROFILE:
+    # Callers are authenticated by TokenValidationMiddleware, and responses are
+    # always JSON, rendered with orjson
+    REST_FRAMEWORK = {
+        "DEFAULT_AUTHENTICATION_CLASSES": (),
+        "DEFAULT_RENDERER_CLASSES": ("utils.json_response.FastJSONRenderer",),
+        "UNAUTHENTICATED_USER": None,
+    }
+
 # Token validation
 TOKEN_VALIDATION_URL = env('TOKEN_VALIDATION_URL')
 
+# Authentication service HTTP client (timeouts in seconds)
+AUTH_SERVICE_CONNECT_TIMEOUT = env.float("AUTH_SERVICE_CONNECT_TIMEOUT", default=0.5)
+AUTH_SERVICE_READ_TIMEOUT = env.float("AUTH_SERVICE_READ_TIMEOUT", default=2.0)
+AUTH_SERVICE_POOL_MAXSIZE = env.int("AUTH_SERVICE_POOL_MAXSIZE", default=20)
+# Upper bound of concurrent connections opened by the asyncio client (ASGI)
+AUTH_SERVICE_ASYNC_MAX_CONNECTIONS = env.int("AUTH_SERVICE_ASYNC_MAX_CONNECTIONS", default=100)
+# Send a second request when the first one is slower than this latency percentile
+AUTH_SERVICE_HEDGE_ENABLED = env.bool("AUTH_SERVICE_HEDGE_ENABLED", default=False)
+AUTH_SERVICE_HEDGE_PERCENTILE = env.float("AUTH_SERVICE_HEDGE_PERCENTILE", default=95)
+AUTH_SERVICE_HEDGE_MIN_DELAY = env.float("AUTH_SERVICE_HEDGE_MIN_DELAY", default=0.05)
+
+# Circuit breaker guarding the authentication service, shared by all processes
+# through Redis (durations in seconds)
+CIRCUIT_BREAKER_FAIL_MAX = env.int("CIRCUIT_BREAKER_FAIL_MAX", default=5)
+# Trip only when failures are also at least this share of the calls of the window
+CIRCUIT_BREAKER_FAILURE_RATIO = env.float("CIRCUIT_BREAKER_FAILURE_RATIO", default=0.5)
+CIRCUIT_BREAKER_WINDOW = env.float("CIRCUIT_BREAKER_WINDOW", default=30)
+CIRCUIT_BREAKER_RESET_TIMEOUT = env.float("CIRCUIT_BREAKER_RESET_TIMEOUT", default=60)
+# Concurrent trial calls let through while half-open, and successes closing the breaker
+CIRCUIT_BREAKER_HALF_OPEN_PROBES = env.int("CIRCUIT_BREAKER_HALF_OPEN_PROBES", default=1)
+CIRCUIT_BREAKER_SUCCESS_THRESHOLD = env.int("CIRCUIT_BREAKER_SUCCESS_THRESHOLD", default=1)
+# Calls slower than this count as failures
+CIRCUIT_BREAKER_SLOW_CALL_SECONDS = env.float("CIRCUIT_BREAKER_SLOW_CALL_SECONDS", default=1.0)
+# How long a process trusts its last view of a closed breaker
+CIRCUIT_BREAKER_STATE_TTL = env.float("CIRCUIT_BREAKER_STATE_TTL", default=1.0)
+
 
 # Swagger Configuration
 SWAGGER_SETTINGS = {
@@ -133,4 +437,14 @@ SWAGGER_SETTINGS = {
             'in': 'header'
         }
     },
-}
\ No newline at end of file
+    # The UIs load the precomputed schema instead of generating it per page view
+    'SPEC_URL': ('schema-json', {'format': '.json'}),
+}
+REDOC_SETTINGS = {
+    'SPEC_URL': ('schema-json', {'format': '.json'}),
+}
+
+# Directory of the schema files written by ``manage.py generate_schema``
+OPENAPI_SCHEMA_DIR = env("OPENAPI_SCHEMA_DIR", default=f"{BASE_DIR}/schema")
+# Seconds clients may use their copy of the schema before revalidating it
+OPENAPI_SCHEMA_MAX_AGE = env.int("OPENAPI_SCHEMA_MAX_AGE", default=300)
\ No newline at end of file
@@ -2,32 +2,24 @@ from django.urls import path, re_path, include
 from django.conf import settings
 from django.conf.urls.static import static
 
-from rest_framework import permissions
-from drf_yasg.views import get_schema_view
-from drf_yasg import openapi
-
-schema_view = get_schema_view(
-    openapi.Info(
-        title="Tehran Payment - Code Challenge - Notification Service",
-        default_version='v1',
-        description="API documentation for 'Tehran Payment - Code Challenge - Notification Service' - Prepared By Reza Aghamohammadi",
-        contact=openapi.Contact(email="hacknitive@gmail.com"),
-        license=openapi.License(name="MIT License"),
-    ),
-    public=True,
-    permission_classes=(permissions.AllowAny,),
-)
+from otp.views import MetricsView, OpenAPISchemaView, schema_ui_view
 
 urlpatterns = [
     path('api/otp/', include('otp.urls')),
+    path('api/notifications/', include('notifications.urls')),
+
+    # Prometheus scrape endpoint (keep it on the internal network)
+    path('metrics/', MetricsView.as_view(), name='metrics'),
+
+    # Precomputed schema, see ``manage.py generate_schema``
+    re_path(r'^swagger(?P<format>\.json|\.yaml)$', OpenAPISchemaView.as_view(), name='schema-json'),
 
         # Swagger UI:
-    re_path(r'^swagger(?P<format>\.json|\.yaml)$', schema_view.without_ui(cache_timeout=0), name='schema-json'),
-    path('swagger/', schema_view.with_ui('swagger', cache_timeout=0), name='schema-swagger-ui'),
+    path('swagger/', schema_ui_view('swagger'), name='schema-swagger-ui'),
 
     # ReDoc UI:
-    path('redoc/', schema_view.with_ui('redoc', cache_timeout=0), name='schema-redoc'),
+    path('redoc/', schema_ui_view('redoc'), name='schema-redoc'),
 ]
 
 # Serve static files
-urlpatterns += static(settings.STATIC_URL, document_root=settings.STATIC_ROOT)
\ No newline at end of file
+urlpatterns += static(settings.STATIC_URL, document_root=settings.STATIC_ROOT)
@@ -0,0 +1,301 @@
+import asyncio
+import signal
+import socket
+from datetime import datetime, timezone
+from queue import Empty, SimpleQueue
+from threading import Event, Thread
+from time import time
+
+from celery.exceptions import Reject, Retry
+from django.conf import settings
+
+from .channels import consumed_queues
+from notification_service.celery import app as celery_app
+
+# Seconds the consumer thread waits for a message before settling finished ones
+DRAIN_TIMEOUT = 0.05
+# Seconds between attempts to reconnect to the broker
+RECONNECT_DELAY = 1.0
+
+# Settlements of a message, applied by the consumer thread
+ACK = "ack"
+REJECT = "reject"
+REQUEUE = "requeue"
+
+# Celery task name -> coroutine function run in its place, see ``async_task``
+_async_tasks = {}
+
+
+def async_task(task):
+    """
+    Registers a coroutine function as the variant of a Celery task run by the asyncio worker.
+
+    Tasks without a variant run in a thread of the worker, see ``call_task``.
+
+    Args:
+        task (Task): The Celery task.
+    """
+    def register(coroutine_function):
+        _async_tasks[task.name] = coroutine_function
+        return coroutine_function
+    return register
+
+
+class AsyncWorker:
+    """
+    Worker process consuming the queues of notification channels with an event loop.
+
+    Under the prefork pool a process is held by a task for the whole provider
+    call, so in-flight sends are capped by the number of processes. Here a
+    consumer thread owns the broker connection and hands every task message
+    to the event loop, which runs the coroutine variant of the task (see
+    ``async_task``): hundreds of provider calls of a process are in flight
+    at once, each channel capped by its ``async_concurrency`` (see
+    ``Channel.async_limit``). Messages are acknowledged once their task has
+    finished, sent or failed, so the sends of a worker that dies are
+    redelivered; the broker prefetch is the summed cap of the channels.
+    Tasks without a coroutine variant run in threads with the request of
+    their message, so that ``Task.retry`` republishes them as under Celery.
+
+    On SIGTERM or SIGINT the worker stops consuming, lets in-flight sends
+    finish for ``shutdown_timeout`` seconds and requeues the others.
+    """
+
+    def __init__(self, channels, app=celery_app, shutdown_timeout=settings.NOTIFICATION_WORKER_SHUTDOWN_TIMEOUT):
+        """
+        Args:
+            channels (list): The ``Channel`` objects served by the worker.
+            app (Celery): The Celery app, for its broker connection and task registry.
+            shutdown_timeout (float): Seconds in-flight tasks get to finish on shutdown.
+        """
+        self.channels = channels
+        self.app = app
+        self.shutdown_timeout = shutdown_timeout
+        self.queues = consumed_queues(channels)
+        self.prefetch_count = sum(channel.async_concurrency for channel in channels)
+
+        self.processed = 0
+        self.failed = 0
+        self._settlements = SimpleQueue()
+        self._stopping = Event()
+        self._finished = Event()
+        self._tasks = set()
+        self._loop = None
+        self._stop_requested = None
+
+    def run(self):
+        """Consumes messages until ``stop`` is called or a termination signal is received."""
+        asyncio.run(self._serve())
+
+    def stop(self):
+        """Asks the worker to shut down, from any thread."""
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self._stop_requested.set)
+
+    async def _serve(self):
+        self._loop = asyncio.get_running_loop()
+        self._stop_requested = asyncio.Event()
+        for signum in (signal.SIGTERM, signal.SIGINT):
+            try:
+                self._loop.add_signal_handler(signum, self._stop_requested.set)
+            except (NotImplementedError, RuntimeError, ValueError):
+                # Not the main thread, e.g. embedded in a benchmark
+                pass
+
+        consumer = Thread(target=self._consume, name="async-worker-consumer", daemon=True)
+        consumer.start()
+        await self._stop_requested.wait()
+
+        # Stop taking messages, then give the in-flight ones time to finish
+        self._stopping.set()
+        if self._tasks:
+            await asyncio.wait(set(self._tasks), timeout=self.shutdown_timeout)
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+
+        self._finished.set()
+        await asyncio.to_thread(consumer.join)
+        for channel in self.channels:
+            await channel.get_provider().aclose()
+
+    def _consume(self):
+        while not self._stopping.is_set():
+            try:
+                self._consume_connection()
+            except Exception:
+                # TODO: Logging
+                # Unsettled messages of the lost connection are redelivered by the broker
+                self._stopping.wait(RECONNECT_DELAY)
+
+        # Settle the messages finished during the shutdown
+        while not self._finished.wait(DRAIN_TIMEOUT):
+            self._settle()
+        self._settle()
+
+    def _consume_connection(self):
+        with self.app.connection_for_read() as connection:
+            connection.ensure_connection()
+            consumer = connection.Consumer(
+                [self.app.amqp.queues[queue] for queue in self.queues],
+                callbacks=[self._on_message],
+                accept=self.app.conf.accept_content,
+                prefetch_count=self.prefetch_count,
+            )
+            with consumer:
+                while not self._stopping.is_set():
+                    self._settle()
+                    try:
+                        connection.drain_events(timeout=DRAIN_TIMEOUT)
+                    except socket.timeout:
+                        pass
+                consumer.cancel()
+                while not self._finished.wait(DRAIN_TIMEOUT):
+                    self._settle()
+                self._settle()
+
+    def _on_message(self, body, message):
+        # Runs in the consumer thread
+        if self._stopping.is_set():
+            message.requeue()
+            return
+        self._loop.call_soon_threadsafe(self._start_task, body, message)
+
+    def _settle(self):
+        # Runs in the consumer thread, which owns the broker channel
+        while True:
+            try:
+                message, settlement = self._settlements.get_nowait()
+            except Empty:
+                return
+            try:
+                if settlement == ACK:
+                    message.ack()
+                elif settlement == REQUEUE:
+                    message.requeue()
+                else:
+                    message.reject()
+            except Exception:
+                # TODO: Logging
+                pass
+
+    def _start_task(self, body, message):
+        if self._stopping.is_set():
+            self._settlements.put((message, REQUEUE))
+            return
+        task = self._loop.create_task(self._handle(body, message))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _handle(self, body, message):
+        try:
+            name, args, kwargs, eta, expires = self.parse_message(body, message)
+            request = self.task_request(body, message)
+        except Exception:
+            # TODO: Logging
+            self._settlements.put((message, REJECT))
+            return
+
+        try:
+            if expires is None or expires > time():
+                if eta is not None and eta > time():
+                    await asyncio.sleep(eta - time())
+                await self.run_task(name, args, kwargs, request)
+        except asyncio.CancelledError:
+            self._settlements.put((message, REQUEUE))
+            raise
+        except Retry:
+            # Republished by Task.retry, this message is done with
+            pass
+        except Reject as exc:
+            # E.g. the retry could not be published
+            self.failed += 1
+            self.processed += 1
+            self._settlements.put((message, REQUEUE if exc.requeue else REJECT))
+            return
+        except Exception:
+            # TODO: Logging
+            self.failed += 1
+        self.processed += 1
+        self._settlements.put((message, ACK))
+
+    @staticmethod
+    def parse_message(body, message):
+        """
+        Reads a Celery task message (protocol 2).
+
+        Returns:
+            tuple: The task name, args, kwargs, and the ETA and expiry as Unix times (None when unset).
+
+        Raises:
+            ValueError: If the message is not a Celery task message.
+        """
+        headers = message.headers or {}
+        if "task" not in headers:
+            raise ValueError("Not a Celery protocol 2 task message.")
+        args, kwargs, _ = body
+        return headers["task"], args, kwargs, parse_time(headers.get("eta")), parse_time(headers.get("expires"))
+
+    @staticmethod
+    def task_request(body, message):
+        """
+        Builds the request context of a task message (protocol 2), as the Celery worker does.
+
+        Returns:
+            dict: The ``Task.request`` attributes: the message headers, args, kwargs,
+            callbacks and delivery info.
+        """
+        args, kwargs, embed = body
+        delivery_info = message.delivery_info or {}
+        return {
+            **(message.headers or {}),
+            **(embed or {}),
+            "args": args,
+            "kwargs": kwargs,
+            "delivery_info": {
+                key: delivery_info.get(key) for key in ("exchange", "routing_key", "priority", "redelivered")
+            },
+            "called_directly": False,
+        }
+
+    async def run_task(self, name, args, kwargs, request):
+        """
+        Runs a task: its coroutine variant if one is registered, otherwise the task itself in a thread.
+
+        Args:
+            request (dict): The request context of the message, see ``task_request``.
+
+        Raises:
+            KeyError: If the task is unknown.
+            Retry: If the task was republished by ``Task.retry``.
+        """
+        coroutine_function = _async_tasks.get(name)
+        if coroutine_function is not None:
+            await coroutine_function(*args, **kwargs)
+        else:
+            await asyncio.to_thread(call_task, self.app.tasks[name], args, kwargs, request)
+
+
+def call_task(task, args, kwargs, request):
+    """
+    Runs a Celery task in the current thread with the request context of its message.
+
+    Calling the task instead would run it as called directly: ``Task.retry``
+    then re-raises the exception and the message, acknowledged once the task
+    has finished, would be lost instead of republished with its countdown.
+    """
+    task.push_request(**request)
+    try:
+        return task.run(*args, **kwargs)
+    finally:
+        task.pop_request()
+
+
+def parse_time(value):
+    """Converts the ISO 8601 ``eta`` or ``expires`` header of a task message to a Unix time."""
+    if not value:
+        return None
+    moment = datetime.fromisoformat(value)
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+    return moment.timestamp()
@@ -0,0 +1,157 @@
+import asyncio
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+# Channel name -> Channel, filled from NOTIFICATION_CHANNELS on first use
+_channels = {}
+
+
+class UnknownChannel(KeyError):
+    """Raised when a notification channel is not registered."""
+
+
+class Channel:
+    """
+    A delivery channel (SMS, email, push) and the way its messages are sent.
+
+    Every channel has its own Celery queue, consumed by workers started for
+    that channel only (see ``notifications.worker``), so a slow provider can
+    only hold up its own messages.
+    """
+
+    def __init__(
+        self,
+        name,
+        queue,
+        provider_class,
+        provider_options=None,
+        concurrency=1,
+        extra_queues=(),
+        recipient_validator=None,
+        batch_enabled=True,
+        batch_max_size=100,
+        batch_max_wait=1.0,
+        bulk_chunk_size=50,
+        async_concurrency=100,
+    ):
+        """
+        Args:
+            name (str): The channel name, e.g. ``sms``.
+            queue (str): The Celery queue of the channel tasks.
+            provider_class (str): Dotted path of the ``NotificationProvider`` subclass.
+            provider_options (dict, optional): Keyword arguments of the provider constructor.
+            concurrency (int): Worker processes consuming the queue.
+            extra_queues (iterable): Other queues the channel workers consume.
+            recipient_validator (str, optional): Dotted path of a Django validator of the recipients.
+            batch_enabled (bool): Buffer single messages in Redis and send them with bulk provider calls.
+            batch_max_size (int): Messages per bulk provider call.
+            batch_max_wait (float): Seconds a buffered message waits for its batch to fill.
+            bulk_chunk_size (int): Messages per task of a bulk send.
+            async_concurrency (int): Provider calls in flight at once in an asyncio worker process.
+        """
+        self.name = name
+        self.queue = queue
+        self.provider_class = provider_class
+        self.provider_options = provider_options or {}
+        self.concurrency = concurrency
+        self.extra_queues = tuple(extra_queues)
+        self.recipient_validator = import_string(recipient_validator) if recipient_validator else None
+        self.batch_enabled = batch_enabled
+        self.batch_max_size = batch_max_size
+        self.batch_max_wait = batch_max_wait
+        self.bulk_chunk_size = bulk_chunk_size
+        self.async_concurrency = async_concurrency
+        self._provider = None
+        self._semaphore = None
+        self._loop = None
+
+    @classmethod
+    def from_settings(cls, name, options):
+        """Builds a channel from its ``NOTIFICATION_CHANNELS`` entry."""
+        return cls(name, **{key.lower(): value for key, value in options.items()})
+
+    @property
+    def buffer_key(self):
+        """Redis list buffering the messages of the channel until their batch is sent."""
+        return f"{self.name}:pending"
+
+    def get_provider(self):
+        """
+        Returns the process-wide provider of the channel, created on first use.
+
+        Returns:
+            NotificationProvider: The provider instance.
+        """
+        if self._provider is None:
+            self._provider = import_string(self.provider_class)(**self.provider_options)
+        return self._provider
+
+    def async_limit(self):
+        """
+        Returns the semaphore capping the provider calls in flight in the running event loop.
+
+        Returns:
+            asyncio.Semaphore: ``async_concurrency`` slots.
+        """
+        loop = asyncio.get_running_loop()
+        if self._semaphore is None or self._loop is not loop:
+            self._semaphore = asyncio.Semaphore(self.async_concurrency)
+            self._loop = loop
+        return self._semaphore
+
+    def validate_recipient(self, recipient):
+        """
+        Checks a recipient address.
+
+        Raises:
+            django.core.exceptions.ValidationError: If the address is invalid for the channel.
+        """
+        if self.recipient_validator is not None:
+            self.recipient_validator(recipient)
+
+
+def consumed_queues(channels):
+    """
+    Lists the queues consumed by the workers of ``channels``, without duplicates.
+
+    Returns:
+        list: Queue names.
+    """
+    queues = []
+    for channel in channels:
+        for queue in (channel.queue, *channel.extra_queues):
+            if queue not in queues:
+                queues.append(queue)
+    return queues
+
+
+def register_channel(channel):
+    """Adds a channel to the registry, replacing any channel of the same name."""
+    get_channels()[channel.name] = channel
+
+
+def get_channels():
+    """
+    Returns the registered channels.
+
+    Returns:
+        dict: Channel name -> ``Channel``.
+    """
+    if not _channels:
+        for name, options in settings.NOTIFICATION_CHANNELS.items():
+            _channels[name] = Channel.from_settings(name, options)
+    return _channels
+
+
+def get_channel(name):
+    """
+    Returns a registered channel.
+
+    Raises:
+        UnknownChannel: If no channel is registered under ``name``.
+    """
+    try:
+        return get_channels()[name]
+    except KeyError:
+        raise UnknownChannel(name) from None
@@ -0,0 +1,154 @@
+import asyncio
+import json
+
+from .status import STATUS_FAILED, STATUS_QUEUED, STATUS_SENT, arecord_statuses, encode_status, record_statuses
+from utils import redis_client_ins
+from utils.redis_client import delivery_key
+
+
+def send_batch(channel, messages, provider=None):
+    """
+    Sends messages with a single bulk provider call.
+
+    If the bulk call fails, every message is retried individually so one bad
+    recipient cannot drop the whole batch. Providers without transactional
+    bulk APIs may deliver some messages twice in that case. The delivery
+    status of every message is recorded afterwards.
+
+    Args:
+        channel (Channel): The channel of the messages.
+        messages (list): ``(recipient, text)`` tuples.
+        provider (NotificationProvider, optional): Defaults to the channel provider.
+
+    Returns:
+        tuple: Number of sent and failed messages.
+    """
+    provider = provider or channel.get_provider()
+    try:
+        provider_ids = provider.send_bulk(messages) or [None] * len(messages)
+    except Exception:
+        # TODO: Logging
+        pass
+    else:
+        record_statuses(channel, [
+            (recipient, STATUS_SENT, provider_id)
+            for (recipient, _), provider_id in zip(messages, provider_ids)
+        ])
+        return len(messages), 0
+
+    outcomes = []
+    for recipient, text in messages:
+        try:
+            outcomes.append((recipient, STATUS_SENT, provider.send(recipient, text)))
+        except Exception:
+            # TODO: Logging
+            outcomes.append((recipient, STATUS_FAILED, None))
+    record_statuses(channel, outcomes)
+    failed = sum(1 for _, state, _ in outcomes if state == STATUS_FAILED)
+    return len(messages) - failed, failed
+
+
+async def asend_one(channel, recipient, text, provider=None):
+    """
+    Sends one message from the asyncio worker and records its delivery status.
+
+    The call waits for a slot of the channel ``async_limit``.
+
+    Raises:
+        Exception: The provider error, once the failure is recorded.
+    """
+    provider = provider or channel.get_provider()
+    try:
+        async with channel.async_limit():
+            provider_id = await provider.asend(recipient, text)
+    except Exception:
+        await arecord_statuses(channel, [(recipient, STATUS_FAILED, None)])
+        raise
+    await arecord_statuses(channel, [(recipient, STATUS_SENT, provider_id)])
+    return provider_id
+
+
+async def asend_batch(channel, messages, provider=None):
+    """
+    Coroutine variant of ``send_batch``: when the bulk call fails, the
+    messages are retried individually and concurrently, within the channel
+    ``async_limit``.
+    """
+    provider = provider or channel.get_provider()
+    try:
+        async with channel.async_limit():
+            provider_ids = await provider.asend_bulk(messages) or [None] * len(messages)
+    except Exception:
+        # TODO: Logging
+        pass
+    else:
+        await arecord_statuses(channel, [
+            (recipient, STATUS_SENT, provider_id)
+            for (recipient, _), provider_id in zip(messages, provider_ids)
+        ])
+        return len(messages), 0
+
+    async def send_one(recipient, text):
+        try:
+            async with channel.async_limit():
+                return recipient, STATUS_SENT, await provider.asend(recipient, text)
+        except Exception:
+            # TODO: Logging
+            return recipient, STATUS_FAILED, None
+
+    outcomes = await asyncio.gather(*(send_one(recipient, text) for recipient, text in messages))
+    await arecord_statuses(channel, outcomes)
+    failed = sum(1 for _, state, _ in outcomes if state == STATUS_FAILED)
+    return len(messages) - failed, failed
+
+
+def buffer_message(channel, recipient, text):
+    """
+    Appends a message to the batch buffer of its channel and marks it queued.
+
+    Args:
+        channel (Channel): The channel of the message.
+        recipient (str): The recipient address.
+        text (str): The message body.
+
+    Returns:
+        int: Number of messages in the buffer after the append.
+    """
+    return redis_client_ins.push_pending(
+        channel.buffer_key,
+        json.dumps([recipient, text]),
+        status_key=delivery_key(channel.name, recipient),
+        status=encode_status(STATUS_QUEUED),
+    )
+
+
+def flush_buffered_messages(channel, max_size=None, provider=None):
+    """
+    Drains the batch buffer of a channel, sending at most ``max_size`` messages per provider call.
+
+    Args:
+        channel (Channel): The channel to flush.
+        max_size (int, optional): Batch size, defaults to the channel ``batch_max_size``.
+        provider (NotificationProvider, optional): Defaults to the channel provider.
+
+    Returns:
+        tuple: Number of sent and failed messages.
+    """
+    max_size = max_size or channel.batch_max_size
+    sent = failed = 0
+    while True:
+        raw_messages = redis_client_ins.pop_pending(channel.buffer_key, max_size) or []
+        if not raw_messages:
+            break
+
+        batch_sent, batch_failed = send_batch(
+            channel,
+            [tuple(json.loads(raw_message)) for raw_message in raw_messages],
+            provider=provider,
+        )
+        sent += batch_sent
+        failed += batch_failed
+
+        if len(raw_messages) < max_size:
+            break
+    return sent, failed
@@ -0,0 +1,3 @@
+from .base import NotificationProvider, ProviderError
+from .http import HTTPProvider
+from .stub import StubProvider
@@ -0,0 +1,59 @@
+import asyncio
+
+
+class ProviderError(Exception):
+    """Raised by providers when a notification (or a whole batch) could not be sent."""
+
+
+class NotificationProvider:
+    """
+    Base class for the provider adapters of a notification channel.
+
+    Subclasses must implement ``send``; providers with a bulk API should also
+    override ``send_bulk``, which otherwise falls back to one call per message.
+    The coroutine variants ``asend`` and ``asend_bulk``, used by the asyncio
+    worker (see ``notifications.async_worker``), run the blocking calls in a
+    thread; providers with a non-blocking client should override them.
+    """
+
+    def send(self, recipient, text):
+        """
+        Sends a single notification.
+
+        Args:
+            recipient (str): The recipient address (phone number, email, device token).
+            text (str): The message body.
+
+        Returns:
+            str: The message id assigned by the provider, None if it assigns none.
+
+        Raises:
+            ProviderError: If the provider rejected the message.
+        """
+        raise NotImplementedError
+
+    def send_bulk(self, messages):
+        """
+        Sends many notifications with as few provider calls as possible.
+
+        Args:
+            messages (list): ``(recipient, text)`` tuples.
+
+        Returns:
+            list: The provider message ids, in the order of ``messages``.
+
+        Raises:
+            ProviderError: If the provider rejected the batch.
+        """
+        return [self.send(recipient, text) for recipient, text in messages]
+
+    async def asend(self, recipient, text):
+        """Coroutine variant of ``send``."""
+        return await asyncio.to_thread(self.send, recipient, text)
+
+    async def asend_bulk(self, messages):
+        """Coroutine variant of ``send_bulk``."""
+        return await asyncio.to_thread(self.send_bulk, messages)
+
+    async def aclose(self):
+        """Releases the resources (connections) held by the coroutine variants."""
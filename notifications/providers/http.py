@@ -0,0 +1,136 @@
+import asyncio
+from itertools import cycle
+from math import ceil
+
+from httpx import AsyncClient, Client, HTTPError, Limits, Timeout
+
+from .base import NotificationProvider, ProviderError
+
+
+class HTTPProvider(NotificationProvider):
+    """
+    Provider posting notifications as JSON to an HTTP API.
+
+    ``send`` posts ``{"recipient": ..., "text": ...}`` to ``url`` and expects
+    ``{"id": ...}`` back; ``send_bulk`` posts ``{"messages": [...]}`` to
+    ``bulk_url`` and expects ``{"ids": [...]}``. Adapters of real providers
+    override ``build_request``, ``build_bulk_request`` and ``parse_response``.
+
+    The blocking client is kept per process and the non-blocking ones per
+    event loop, so keep-alive connections are shared by every send of the
+    worker; ``max_connections`` should be at least the ``ASYNC_CONCURRENCY``
+    of the channel. The non-blocking connections are split among clients of
+    ``pool_shard_size`` connections used in turn: finding an idle connection
+    in an httpx pool takes time proportional to its size, and with hundreds
+    of connections that dominates the event loop.
+    """
+
+    def __init__(
+        self,
+        url,
+        bulk_url=None,
+        headers=None,
+        timeout=10.0,
+        connect_timeout=2.0,
+        max_connections=100,
+        pool_shard_size=16,
+    ):
+        """
+        Args:
+            url (str): Endpoint of single sends.
+            bulk_url (str, optional): Endpoint of bulk sends, without one ``send_bulk`` posts every message to ``url``.
+            headers (dict, optional): Headers of every request, e.g. the API key.
+            timeout (float): Seconds to wait for a response.
+            connect_timeout (float): Seconds to wait for a connection.
+            max_connections (int): Connections of the blocking client, and of the non-blocking ones together.
+            pool_shard_size (int): Connections per non-blocking client.
+        """
+        self.url = url
+        self.bulk_url = bulk_url
+        self.headers = headers or {}
+        self.timeout = Timeout(timeout, connect=connect_timeout)
+        self.limits = Limits(max_connections=max_connections, max_keepalive_connections=max_connections)
+        self.shard_limits = Limits(max_connections=pool_shard_size, max_keepalive_connections=pool_shard_size)
+        self.shard_count = ceil(max_connections / pool_shard_size)
+        self._client = None
+        self._async_clients = []
+        self._async_client_cycle = None
+        self._loop = None
+
+    def get_client(self):
+        """Returns the blocking HTTP client of the process."""
+        if self._client is None:
+            self._client = Client(headers=self.headers, timeout=self.timeout, limits=self.limits)
+        return self._client
+
+    def get_async_client(self):
+        """
+        Returns the next of the HTTP clients bound to the running event loop.
+
+        Returns:
+            httpx.AsyncClient: A pooled client.
+        """
+        loop = asyncio.get_running_loop()
+        if self._async_client_cycle is None or self._loop is not loop:
+            self._async_clients = [
+                AsyncClient(headers=self.headers, timeout=self.timeout, limits=self.shard_limits)
+                for _ in range(self.shard_count)
+            ]
+            self._async_client_cycle = cycle(self._async_clients)
+            self._loop = loop
+        return next(self._async_client_cycle)
+
+    def build_request(self, recipient, text):
+        """Returns the JSON body of a single send."""
+        return {"recipient": recipient, "text": text}
+
+    def build_bulk_request(self, messages):
+        """Returns the JSON body of a bulk send of ``(recipient, text)`` tuples."""
+        return {"messages": [self.build_request(recipient, text) for recipient, text in messages]}
+
+    def parse_response(self, response):
+        """
+        Reads the JSON body of a response.
+
+        Raises:
+            ProviderError: If the provider rejected the request.
+        """
+        if response.is_error:
+            raise ProviderError(f"Provider answered HTTP {response.status_code}.")
+        return response.json()
+
+    def send(self, recipient, text):
+        return self._post(self.url, self.build_request(recipient, text)).get("id")
+
+    def send_bulk(self, messages):
+        if not self.bulk_url:
+            return super().send_bulk(messages)
+        return self._post(self.bulk_url, self.build_bulk_request(messages)).get("ids") or [None] * len(messages)
+
+    def _post(self, url, body):
+        try:
+            response = self.get_client().post(url, json=body)
+        except HTTPError as exc:
+            raise ProviderError(str(exc)) from exc
+        return self.parse_response(response)
+
+    async def asend(self, recipient, text):
+        return (await self._apost(self.url, self.build_request(recipient, text))).get("id")
+
+    async def asend_bulk(self, messages):
+        if not self.bulk_url:
+            return list(await asyncio.gather(*(self.asend(recipient, text) for recipient, text in messages)))
+        return (await self._apost(self.bulk_url, self.build_bulk_request(messages))).get("ids") or [None] * len(messages)
+
+    async def _apost(self, url, body):
+        try:
+            response = await self.get_async_client().post(url, json=body)
+        except HTTPError as exc:
+            raise ProviderError(str(exc)) from exc
+        return self.parse_response(response)
+
+    async def aclose(self):
+        for client in self._async_clients:
+            await client.aclose()
+        self._async_clients = []
+        self._async_client_cycle = None
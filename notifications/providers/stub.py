@@ -0,0 +1,77 @@
+import asyncio
+import random
+import time
+import uuid
+
+from .base import NotificationProvider, ProviderError
+
+
+class StubProvider(NotificationProvider):
+    """
+    Local stand-in for a real notification provider.
+
+    Simulates network latency (and optionally failures) so worker throughput
+    can be measured offline; the coroutine variants wait without blocking the
+    event loop. Messages are printed to stdout.
+    """
+
+    label = "notification"
+    recipient_name = "recipient"
+
+    def __init__(self, latency=2.0, per_message_latency=0.0, failure_rate=0.0, label=None, recipient_name=None):
+        """
+        Args:
+            latency (float): Seconds spent on every provider call.
+            per_message_latency (float): Extra seconds per message of a bulk call.
+            failure_rate (float): Probability (0..1) that a call fails.
+            label (str, optional): Name of the message kind in the printed lines.
+            recipient_name (str, optional): Name of the recipient kind in the printed lines.
+        """
+        self.latency = latency
+        self.per_message_latency = per_message_latency
+        self.failure_rate = failure_rate
+        self.label = label or self.label
+        self.recipient_name = recipient_name or self.recipient_name
+
+    def _call_latency(self, message_count):
+        return self.latency + self.per_message_latency * message_count
+
+    def _maybe_fail(self):
+        if self.failure_rate and random.random() < self.failure_rate:
+            raise ProviderError("Simulated provider failure.")
+
+    def _simulate_call(self, message_count):
+        time.sleep(self._call_latency(message_count))
+        self._maybe_fail()
+
+    async def _asimulate_call(self, message_count):
+        await asyncio.sleep(self._call_latency(message_count))
+        self._maybe_fail()
+
+    def _print(self, recipient, text):
+        print(f"<<<<<<<<<<<<<<<<<Sending {self.label} '{text}' to {self.recipient_name} {recipient}>>>>>>>>>>>>>>>>>")
+
+    def send(self, recipient, text):
+        self._simulate_call(1)
+        self._print(recipient, text)
+        return uuid.uuid4().hex
+
+    def send_bulk(self, messages):
+        self._simulate_call(len(messages))
+        return self._print_bulk(messages)
+
+    def _print_bulk(self, messages):
+        provider_ids = []
+        for recipient, text in messages:
+            self._print(recipient, text)
+            provider_ids.append(uuid.uuid4().hex)
+        return provider_ids
+
+    async def asend(self, recipient, text):
+        await self._asimulate_call(1)
+        self._print(recipient, text)
+        return uuid.uuid4().hex
+
+    async def asend_bulk(self, messages):
+        await self._asimulate_call(len(messages))
+        return self._print_bulk(messages)
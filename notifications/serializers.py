@@ -0,0 +1,36 @@
+from django.conf import settings
+from rest_framework import serializers
+
+# Upper bound of the message body length, in characters
+MESSAGE_MAX_LENGTH = 4096
+
+
+class SendNotificationSerializer(serializers.Serializer):
+    """
+    Serializer for sending one message to many recipients of a channel.
+
+    Only the shape of the payload is validated here; each recipient is
+    validated by its channel so results can be reported per recipient.
+    """
+
+    recipients = serializers.ListField(
+        child=serializers.CharField(),
+        allow_empty=False,
+        max_length=settings.NOTIFICATION_BULK_MAX_SIZE,
+        help_text="Recipient addresses: phone numbers, emails or device tokens, depending on the channel.",
+    )
+    message = serializers.CharField(
+        max_length=MESSAGE_MAX_LENGTH,
+        help_text="The message body.",
+    )
+
+
+class DeliveryStatusQuerySerializer(serializers.Serializer):
+    """Serializer for fetching the delivery status of many recipients of a channel."""
+
+    recipients = serializers.ListField(
+        child=serializers.CharField(),
+        allow_empty=False,
+        max_length=settings.NOTIFICATION_BULK_MAX_SIZE,
+        help_text="Recipients whose last message status is requested.",
+    )
@@ -0,0 +1,106 @@
+from time import time
+
+from redis import RedisError
+
+from utils import async_redis_client_ins, redis_client_ins
+
+# Delivery states, as reported by the status endpoint
+STATUS_QUEUED = "queued"
+STATUS_SENT = "sent"
+STATUS_FAILED = "failed"
+STATUS_UNKNOWN = "unknown"
+
+# Records are "<state>|<unix time>|<provider id>", a few dozen bytes each
+STATUS_SEPARATOR = "|"
+
+
+def encode_status(state, provider_id=None, updated_at=None):
+    """
+    Builds the delivery status record of a message.
+
+    Args:
+        state (str): ``STATUS_QUEUED``, ``STATUS_SENT`` or ``STATUS_FAILED``.
+        provider_id (str, optional): The message id assigned by the provider.
+        updated_at (int, optional): Unix time of the state change, defaults to now.
+
+    Returns:
+        str: The record.
+    """
+    updated_at = int(time()) if updated_at is None else updated_at
+    return STATUS_SEPARATOR.join((state, str(updated_at), provider_id or ""))
+
+
+def decode_status(recipient, record):
+    """
+    Reads a delivery status record.
+
+    Args:
+        recipient (str): The recipient the record belongs to.
+        record (bytes): The record, None if there is none.
+
+    Returns:
+        dict: The recipient, state, provider id and update time.
+    """
+    if record is None:
+        return {"recipient": recipient, "status": STATUS_UNKNOWN, "provider_id": None, "updated_at": None}
+    state, updated_at, provider_id = record.decode("utf-8").split(STATUS_SEPARATOR, 2)
+    return {
+        "recipient": recipient,
+        "status": state,
+        "provider_id": provider_id or None,
+        "updated_at": int(updated_at),
+    }
+
+
+def record_statuses(channel, outcomes):
+    """
+    Saves the delivery status of many messages of a channel with one round trip.
+
+    Status records are best effort: a Redis failure must not make the
+    worker send the messages again.
+
+    Args:
+        channel (Channel): The channel of the messages.
+        outcomes (list): ``(recipient, state, provider_id)`` tuples.
+    """
+    if not outcomes:
+        return
+    updated_at = int(time())
+    try:
+        redis_client_ins.set_delivery_statuses(channel.name, {
+            recipient: encode_status(state, provider_id, updated_at)
+            for recipient, state, provider_id in outcomes
+        })
+    except RedisError:
+        # TODO: Logging
+        pass
+
+
+async def arecord_statuses(channel, outcomes):
+    """Coroutine variant of ``record_statuses``, for the asyncio worker."""
+    if not outcomes:
+        return
+    updated_at = int(time())
+    try:
+        await async_redis_client_ins.set_delivery_statuses(channel.name, {
+            recipient: encode_status(state, provider_id, updated_at)
+            for recipient, state, provider_id in outcomes
+        })
+    except RedisError:
+        # TODO: Logging
+        pass
+
+
+def get_statuses(channel, recipients):
+    """
+    Fetches the delivery status of the last message to each recipient with one MGET.
+
+    Args:
+        channel (Channel): The channel of the messages.
+        recipients (list): The recipients.
+
+    Returns:
+        list: ``decode_status`` dicts, in the order of ``recipients``.
+    """
+    records = redis_client_ins.get_delivery_statuses(channel.name, recipients)
+    return [decode_status(recipient, record) for recipient, record in zip(recipients, records)]
@@ -0,0 +1,119 @@
+from celery import group, shared_task
+from django.conf import settings
+
+from .async_worker import async_task
+from .channels import get_channel
+from .dispatcher import asend_batch, asend_one, buffer_message, flush_buffered_messages, send_batch
+from .status import STATUS_FAILED, STATUS_SENT, record_statuses
+
+
+@shared_task
+def send_notification_task(channel_name, recipient, text):
+    """
+    Queues a notification for batched delivery on its channel.
+
+    The message is appended to the batch buffer of the channel; the first
+    message of a batch schedules a flush after the channel ``batch_max_wait``
+    seconds and a full buffer is flushed right away. Without batching (or
+    Redis) the message is sent immediately. Either way the worker records
+    the delivery status of the message (see ``notifications.status``); the
+    task itself returns nothing.
+
+    Args:
+        channel_name (str): The channel, e.g. ``sms``.
+        recipient (str): The recipient address.
+        text (str): The message body.
+    """
+    channel = get_channel(channel_name)
+
+    if not channel.batch_enabled:
+        try:
+            provider_id = channel.get_provider().send(recipient, text)
+        except Exception:
+            record_statuses(channel, [(recipient, STATUS_FAILED, None)])
+            raise
+        record_statuses(channel, [(recipient, STATUS_SENT, provider_id)])
+        return
+
+    buffered = buffer_message(channel, recipient, text)
+    if buffered >= channel.batch_max_size:
+        flush_buffered_messages(channel)
+    elif buffered == 1:
+        flush_notifications_task.apply_async(
+            (channel_name,), countdown=channel.batch_max_wait, queue=channel.queue,
+        )
+
+
+@shared_task
+def send_notification_batch_task(channel_name, messages):
+    """
+    Sends a chunk of a bulk send with one provider call.
+
+    Args:
+        channel_name (str): The channel of the messages.
+        messages (list): ``(recipient, text)`` pairs.
+    """
+    send_batch(get_channel(channel_name), [tuple(message) for message in messages])
+
+
+@async_task(send_notification_task)
+async def asend_notification(channel_name, recipient, text):
+    """
+    Variant of ``send_notification_task`` run by the asyncio worker.
+
+    The message is sent right away rather than buffered: concurrent sends,
+    not bulk calls, keep the provider latency from holding up the queue.
+    """
+    await asend_one(get_channel(channel_name), recipient, text)
+
+
+@async_task(send_notification_batch_task)
+async def asend_notification_batch(channel_name, messages):
+    """Variant of ``send_notification_batch_task`` run by the asyncio worker."""
+    await asend_batch(get_channel(channel_name), [tuple(message) for message in messages])
+
+
+@shared_task
+def flush_notifications_task(channel_name):
+    """Sends every buffered message of a channel using bulk provider calls."""
+    flush_buffered_messages(get_channel(channel_name))
+
+
+def notify(channel_name, recipient, text):
+    """
+    Builds the task sending one notification, routed to the queue of its channel.
+
+    Returns:
+        Signature: The task, to be published with ``task_publisher.publish``.
+
+    Raises:
+        UnknownChannel: If the channel is not registered.
+    """
+    channel = get_channel(channel_name)
+    return send_notification_task.s(channel_name, recipient, text).set(queue=channel.queue)
+
+
+def notify_bulk(channel_name, messages):
+    """
+    Builds the tasks of a bulk send: one task per ``bulk_chunk_size`` messages,
+    each sent with a single bulk provider call.
+
+    Args:
+        channel_name (str): The channel of the messages.
+        messages (list): ``(recipient, text)`` pairs.
+
+    Returns:
+        group: The chunk tasks, to be published with ``task_publisher.publish``.
+
+    Raises:
+        UnknownChannel: If the channel is not registered.
+    """
+    channel = get_channel(channel_name)
+    size = channel.bulk_chunk_size
+    return group(
+        send_notification_batch_task.s(channel_name, messages[offset:offset + size]).set(
+            queue=channel.queue,
+            compression=settings.NOTIFICATION_BULK_COMPRESSION,
+        )
+        for offset in range(0, len(messages), size)
+    )
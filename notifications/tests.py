@@ -0,0 +1,174 @@
+import asyncio
+from unittest import mock
+
+from celery.app.task import Task
+from django.conf import settings
+from django.test import SimpleTestCase
+
+from .async_worker import ACK, AsyncWorker
+from .channels import Channel, UnknownChannel, consumed_queues, get_channel
+from .dispatcher import asend_batch, buffer_message, flush_buffered_messages, send_batch
+from .providers import NotificationProvider, ProviderError, StubProvider
+from .status import STATUS_FAILED, STATUS_QUEUED, STATUS_SENT, STATUS_UNKNOWN, get_statuses
+from otp.campaigns import CampaignLocked
+from otp.middleware import TokenValidationMiddleware
+from otp.tasks import run_campaign_task
+from utils.testing import FakeRedisMixin
+
+RECIPIENTS = ["+989121234567", "+989121234568", "+989121234569"]
+
+
+class RecordingProvider(NotificationProvider):
+    """Provider recording its calls, failing bulk calls and sends to ``failing`` recipients."""
+
+    def __init__(self, bulk_fails=False, failing=()):
+        self.bulk_fails = bulk_fails
+        self.failing = set(failing)
+        self.sent = []
+        self.bulk_calls = 0
+
+    def send(self, recipient, text):
+        if recipient in self.failing:
+            raise ProviderError(f"{recipient} rejected.")
+        self.sent.append(recipient)
+        return f"id-{recipient}"
+
+    def send_bulk(self, messages):
+        self.bulk_calls += 1
+        if self.bulk_fails:
+            raise ProviderError("Bulk send rejected.")
+        return super().send_bulk(messages)
+
+
+class ChannelTests(SimpleTestCase):
+    def test_configured_channels(self):
+        sms = get_channel("sms")
+
+        self.assertIsInstance(sms.get_provider(), StubProvider)
+        self.assertEqual(sms.get_provider().label, "SMS")
+        with self.assertRaises(UnknownChannel):
+            get_channel("fax")
+
+    def test_consumed_queues_are_listed_once(self):
+        channels = [
+            Channel("sms", "notifications.sms", "notifications.providers.StubProvider", extra_queues=["celery"]),
+            Channel("push", "notifications.push", "notifications.providers.StubProvider", extra_queues=["celery"]),
+        ]
+
+        self.assertEqual(consumed_queues(channels), ["notifications.sms", "celery", "notifications.push"])
+
+
+class DispatcherTests(FakeRedisMixin, SimpleTestCase):
+    def setUp(self):
+        super().setUp()
+        self.channel = Channel("sms", "sms", "notifications.tests.RecordingProvider")
+        self.messages = [(recipient, "code 123456") for recipient in RECIPIENTS]
+
+    def test_batch_is_sent_with_one_bulk_call(self):
+        provider = RecordingProvider()
+
+        self.assertEqual(send_batch(self.channel, self.messages, provider=provider), (3, 0))
+        self.assertEqual(provider.bulk_calls, 1)
+        self.assertEqual(provider.sent, RECIPIENTS)
+
+    def test_failed_bulk_send_retries_messages_one_by_one(self):
+        provider = RecordingProvider(bulk_fails=True, failing=RECIPIENTS[1:2])
+
+        self.assertEqual(send_batch(self.channel, self.messages, provider=provider), (2, 1))
+        self.assertEqual(provider.sent, [RECIPIENTS[0], RECIPIENTS[2]])
+
+    def test_async_batch_retries_messages_one_by_one(self):
+        provider = RecordingProvider(bulk_fails=True, failing=RECIPIENTS[1:2])
+
+        self.assertEqual(asyncio.run(asend_batch(self.channel, self.messages, provider=provider)), (2, 1))
+        self.assertEqual(sorted(provider.sent), [RECIPIENTS[0], RECIPIENTS[2]])
+
+    def test_buffered_messages_are_flushed_in_batches(self):
+        provider = RecordingProvider()
+        for recipient, text in self.messages:
+            buffer_message(self.channel, recipient, text)
+
+        self.assertEqual(flush_buffered_messages(self.channel, max_size=2, provider=provider), (3, 0))
+        self.assertEqual(provider.bulk_calls, 2)
+        self.assertEqual(provider.sent, RECIPIENTS)
+        self.assertEqual(flush_buffered_messages(self.channel, max_size=2, provider=provider), (0, 0))
+
+
+class DeliveryStatusTests(FakeRedisMixin, SimpleTestCase):
+    def setUp(self):
+        super().setUp()
+        self.channel = Channel("sms", "sms", "notifications.tests.RecordingProvider")
+        self.messages = [(recipient, "code 123456") for recipient in RECIPIENTS]
+
+    def statuses(self):
+        return [status["status"] for status in get_statuses(self.channel, RECIPIENTS)]
+
+    def test_unknown_without_a_record(self):
+        self.assertEqual(self.statuses(), [STATUS_UNKNOWN] * 3)
+
+    def test_sent_messages_keep_their_provider_id(self):
+        send_batch(self.channel, self.messages, provider=RecordingProvider())
+
+        self.assertEqual(self.statuses(), [STATUS_SENT] * 3)
+        self.assertEqual(get_statuses(self.channel, RECIPIENTS[:1])[0]["provider_id"], f"id-{RECIPIENTS[0]}")
+
+    def test_failed_messages_are_recorded(self):
+        provider = RecordingProvider(bulk_fails=True, failing=RECIPIENTS[1:2])
+        send_batch(self.channel, self.messages, provider=provider)
+        self.assertEqual(self.statuses(), [STATUS_SENT, STATUS_FAILED, STATUS_SENT])
+
+        asyncio.run(asend_batch(self.channel, self.messages, provider=RecordingProvider(failing=RECIPIENTS[:1])))
+        self.assertEqual(self.statuses(), [STATUS_FAILED, STATUS_SENT, STATUS_SENT])
+
+    def test_buffered_messages_are_queued_until_sent(self):
+        for recipient, text in self.messages:
+            buffer_message(self.channel, recipient, text)
+        self.assertEqual(self.statuses(), [STATUS_QUEUED] * 3)
+
+        flush_buffered_messages(self.channel, provider=RecordingProvider())
+        self.assertEqual(self.statuses(), [STATUS_SENT] * 3)
+
+    def test_status_endpoint(self):
+        send_batch(get_channel("sms"), self.messages[:1], provider=RecordingProvider())
+
+        with mock.patch.object(TokenValidationMiddleware, "parse_token", return_value=("token", {"type": "access"})), \
+                mock.patch.object(TokenValidationMiddleware, "check_token", return_value=True):
+            response = self.client.post(
+                "/api/notifications/sms/status/",
+                {"recipients": RECIPIENTS[:2]},
+                content_type="application/json",
+                HTTP_AUTHORIZATION="Bearer token",
+            )
+
+        self.assertEqual(response.status_code, 200)
+        statuses = response.json()["data"]["statuses"]
+        self.assertEqual([status["status"] for status in statuses], [STATUS_SENT, STATUS_UNKNOWN])
+        self.assertEqual(statuses[0]["provider_id"], f"id-{RECIPIENTS[0]}")
+
+
+class AsyncWorkerTests(SimpleTestCase):
+    def setUp(self):
+        self.worker = AsyncWorker([get_channel("sms")])
+
+    def handle(self, name, args):
+        message = mock.Mock(
+            headers={"task": name, "id": "task-1", "retries": 0},
+            delivery_info={"exchange": "", "routing_key": settings.CAMPAIGN_QUEUE},
+        )
+        asyncio.run(self.worker._handle((args, {}, {}), message))
+        return self.worker._settlements.get_nowait()[1]
+
+    def test_threaded_tasks_retry_through_the_broker(self):
+        with mock.patch("otp.tasks.run_campaign", side_effect=CampaignLocked("Campaign is locked.")), \
+                mock.patch.object(Task, "apply_async") as apply_async:
+            settlement = self.handle(run_campaign_task.name, ["campaign-1"])
+
+        self.assertEqual(settlement, ACK)
+        self.assertEqual(self.worker.failed, 0)
+        apply_async.assert_called_once()
+        args, kwargs = apply_async.call_args
+        self.assertEqual(list(args[0]), ["campaign-1"])
+        self.assertEqual(kwargs["task_id"], "task-1")
+        self.assertEqual(kwargs["retries"], 1)
+        self.assertEqual(kwargs["countdown"], settings.CAMPAIGN_LOCK_TTL)
+        self.assertEqual(kwargs["queue"], settings.CAMPAIGN_QUEUE)
@@ -0,0 +1,9 @@
+# notifications/urls.py
+
+from django.urls import path
+from .views import DeliveryStatusView, SendNotificationView
+
+urlpatterns = [
+    path('<slug:channel>/send/', SendNotificationView.as_view(), name='send-notification'),
+    path('<slug:channel>/status/', DeliveryStatusView.as_view(), name='delivery-status'),
+]
@@ -0,0 +1,161 @@
+from django.core.exceptions import ValidationError
+from django.http import Http404
+from rest_framework import generics, status
+from rest_framework.response import Response
+
+from .channels import UnknownChannel, get_channel
+from .serializers import DeliveryStatusQuerySerializer, SendNotificationSerializer
+from .status import get_statuses
+from .tasks import notify_bulk
+from otp.publisher import PublisherFull, task_publisher
+from otp.views.send_otp import publisher_full_response
+from utils import metrics
+
+# Per-recipient result statuses
+RESULT_QUEUED = "queued"
+RESULT_INVALID = "invalid"
+RESULT_DUPLICATE = "duplicate"
+
+STATUS_CODE_SUCCESS = status.HTTP_200_OK
+STATUS_CODE_BAD_REQUEST = status.HTTP_400_BAD_REQUEST
+
+MESSAGE_PROCESSED = "Notifications processed."
+MESSAGE_STATUSES = "Delivery statuses."
+MESSAGE_OPERATION_FAILED = "Operation failed."
+MESSAGE_NO_VALID_RECIPIENTS = "No valid recipients."
+
+
+def get_channel_or_404(name):
+    """Returns a registered channel, raising ``Http404`` for unknown names."""
+    try:
+        return get_channel(name)
+    except UnknownChannel:
+        raise Http404
+
+
+class SendNotificationView(generics.GenericAPIView):
+    """
+    API view to send a message to many recipients of one channel.
+
+    The messages are published as a bulk send on the queue of the channel,
+    one task per ``BULK_CHUNK_SIZE`` recipients.
+    """
+
+    serializer_class = SendNotificationSerializer
+
+    def post(self, request, channel):
+        """
+        Handles POST requests to send a notification.
+
+        Args:
+            request (HttpRequest): The incoming HTTP request containing the recipients and the message.
+            channel (str): The channel name from the URL.
+
+        Returns:
+            Response: A JSON response with the outcome for every recipient.
+        """
+        channel = get_channel_or_404(channel)
+
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        recipients, results = self.validate_recipients(channel, serializer.validated_data["recipients"])
+
+        if not recipients:
+            return Response(
+                {
+                    "statusCode": STATUS_CODE_BAD_REQUEST,
+                    "message": MESSAGE_OPERATION_FAILED,
+                    "error": MESSAGE_NO_VALID_RECIPIENTS,
+                    "data": {"results": results},
+                },
+                status=STATUS_CODE_BAD_REQUEST,
+            )
+
+        text = serializer.validated_data["message"]
+        try:
+            with metrics.timer("celery_publish"):
+                task_publisher.publish(notify_bulk(channel.name, [(recipient, text) for recipient in recipients]))
+        except PublisherFull:
+            return publisher_full_response()
+
+        return Response(
+            {
+                "statusCode": STATUS_CODE_SUCCESS,
+                "message": MESSAGE_PROCESSED,
+                "error": None,
+                "data": {"results": results},
+            },
+            status=STATUS_CODE_SUCCESS,
+        )
+
+    @staticmethod
+    def validate_recipients(channel, raw_recipients):
+        """
+        Validates every recipient with the channel validator and drops duplicates.
+
+        Args:
+            channel (Channel): The channel of the notification.
+            raw_recipients (list): The recipients from the request.
+
+        Returns:
+            tuple: The valid recipients and the per-recipient results, in request order.
+        """
+        recipients = {}
+        results = []
+
+        for recipient in raw_recipients:
+            try:
+                channel.validate_recipient(recipient)
+            except ValidationError as exc:
+                results.append({"recipient": recipient, "status": RESULT_INVALID, "error": exc.messages[0]})
+                continue
+
+            if recipient in recipients:
+                results.append({"recipient": recipient, "status": RESULT_DUPLICATE, "error": None})
+                continue
+
+            recipients[recipient] = None
+            results.append({"recipient": recipient, "status": RESULT_QUEUED, "error": None})
+
+        return list(recipients), results
+
+
+class DeliveryStatusView(generics.GenericAPIView):
+    """
+    API view returning the delivery status of the last message to many recipients.
+
+    Statuses are written by the workers (queued, sent or failed, with the
+    provider message id) and read back with a single MGET.
+    """
+
+    serializer_class = DeliveryStatusQuerySerializer
+
+    def post(self, request, channel):
+        """
+        Handles POST requests for delivery statuses.
+
+        Args:
+            request (HttpRequest): The incoming HTTP request containing the recipients.
+            channel (str): The channel name from the URL.
+
+        Returns:
+            Response: The status of every recipient, ``unknown`` when none is recorded.
+        """
+        channel = get_channel_or_404(channel)
+
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        with metrics.timer("redis_delivery_statuses"):
+            statuses = get_statuses(channel, serializer.validated_data["recipients"])
+
+        return Response(
+            {
+                "statusCode": STATUS_CODE_SUCCESS,
+                "message": MESSAGE_STATUSES,
+                "error": None,
+                "data": {"statuses": statuses},
+            },
+            status=STATUS_CODE_SUCCESS,
+        )
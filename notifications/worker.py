@@ -0,0 +1,70 @@
+"""
+Starts a Celery worker consuming the queues of some notification channels.
+
+The worker runs the summed CONCURRENCY of its channels. Run one worker per
+channel so a slow provider cannot take the processes of another channel;
+without ``--channels`` a single worker consumes every channel queue.
+Options that are not listed below are passed on to ``celery worker``.
+
+With ``--pool asyncio`` the worker is a single process running the
+provider calls as coroutines, up to ASYNC_CONCURRENCY per channel (see
+``notifications.async_worker``); ``celery worker`` options do not apply.
+Run more worker processes to use more cores.
+
+Usage:
+    python -m notifications.worker [--channels sms,email] [--pool asyncio] [--loglevel=info ...]
+"""
+import argparse
+import os
+
+# Value of ``--pool`` running the notifications asyncio worker instead of ``celery worker``
+ASYNCIO_POOL = "asyncio"
+
+
+def worker_argv(channels, extra_args):
+    """
+    Builds the ``celery worker`` arguments consuming the queues of ``channels``.
+
+    Args:
+        channels (list): The ``Channel`` objects served by the worker.
+        extra_args (list): Other ``celery worker`` arguments.
+
+    Returns:
+        list: The worker arguments.
+    """
+    from notifications.channels import consumed_queues
+
+    return [
+        "worker",
+        "--queues", ",".join(consumed_queues(channels)),
+        "--concurrency", str(sum(channel.concurrency for channel in channels)),
+        "--hostname", f"{'+'.join(channel.name for channel in channels)}@%h",
+        *extra_args,
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--channels", default="", help="Comma-separated channel names, all channels when empty.")
+    parser.add_argument("--pool", default="prefork", help="asyncio, or a pool of celery worker (prefork, threads...).")
+    args, extra_args = parser.parse_known_args()
+
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "notification_service.settings")
+    import django
+
+    django.setup()
+    from notification_service.celery import app
+    from notifications.channels import get_channel, get_channels
+
+    names = [name.strip() for name in args.channels.split(",") if name.strip()]
+    channels = [get_channel(name) for name in names] if names else list(get_channels().values())
+    if args.pool == ASYNCIO_POOL:
+        from notifications.async_worker import AsyncWorker
+
+        AsyncWorker(channels).run()
+    else:
+        app.worker_main(worker_argv(channels, ["--pool", args.pool, *extra_args]))
+
+
+if __name__ == "__main__":
+    main()
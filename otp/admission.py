@@ -0,0 +1,155 @@
+import os
+from collections import deque
+from math import ceil
+from threading import Event, Lock, Thread
+from time import monotonic
+
+from django.conf import settings
+
+from .dispatcher import OTP_CHANNEL
+from notification_service.celery import app as celery_app
+from notifications.channels import get_channel
+from utils import metrics, redis_client_ins
+
+
+class AdmissionController:
+    """
+    Rejects sends whose message could not be delivered while the OTP is still valid.
+
+    A daemon thread of each process samples the channel every ``interval``
+    seconds, so requests only read the last sample:
+
+    - the backlog: messages waiting in the broker queue of the channel
+      (a passive queue declare) plus messages buffered by the workers;
+    - the drain rate: how fast the delivered counter kept by the workers
+      (see ``Redis.set_delivery_statuses``) grows, the best rate of the last
+      ``rate_window`` samples.
+
+    The estimated wait is the backlog divided by the drain rate, plus the
+    batching delay of the channel. A task of a bulk send counts as one
+    message, so the estimate is optimistic while bulk sends are queued.
+    Without a recent sample (broker or Redis unreachable) every send is
+    admitted.
+    """
+
+    def __init__(
+        self,
+        channel_name,
+        app=celery_app,
+        redis_client=redis_client_ins,
+        enabled=settings.ADMISSION_CONTROL_ENABLED,
+        interval=settings.ADMISSION_SAMPLE_INTERVAL,
+        max_wait=settings.OTP_TTL_SECONDS * settings.ADMISSION_MAX_WAIT_RATIO,
+        min_backlog=settings.ADMISSION_MIN_BACKLOG,
+        rate_window=settings.ADMISSION_RATE_WINDOW,
+        max_sample_age=settings.ADMISSION_MAX_SAMPLE_AGE,
+    ):
+        self.channel_name = channel_name
+        self.app = app
+        self.redis_client = redis_client
+        self.enabled = enabled
+        self.interval = interval
+        self.max_wait = max_wait
+        self.min_backlog = min_backlog
+        self.rate_window = rate_window
+        self.max_sample_age = max_sample_age
+
+        self._reset()
+        os.register_at_fork(after_in_child=self._reset)
+
+    def _reset(self):
+        # A forked worker samples with its own thread and broker connection
+        self._thread = None
+        self._lock = Lock()
+        self._stopping = Event()
+        self._connection = None
+        self._previous = None
+        self._rates = deque(maxlen=self.rate_window)
+        self.estimated_wait = 0.0
+        self.sampled_at = float("-inf")
+
+    def start(self):
+        """Starts the sampling thread of this process."""
+        with self._lock:
+            if self._thread is None:
+                self._thread = Thread(target=self._run, name="admission-sampler", daemon=True)
+                self._thread.start()
+
+    def queue_depth(self, queue):
+        """Returns the number of messages ready in a broker queue, over a connection kept by the thread."""
+        if self._connection is None:
+            self._connection = self.app.connection_for_read()
+        try:
+            _, message_count, _ = self._connection.default_channel.queue_declare(queue=queue, passive=True)
+        except Exception:
+            self._connection.release()
+            self._connection = None
+            raise
+        return message_count
+
+    def sample(self):
+        """
+        Measures the backlog and the drain rate of the channel and updates ``estimated_wait``.
+
+        Returns:
+            float: The estimated seconds until a message queued now is sent.
+        """
+        channel = get_channel(self.channel_name)
+        depth = self.queue_depth(channel.queue)
+        buffered, delivered = self.redis_client.delivery_backlog(channel.name, channel.buffer_key)
+        now = monotonic()
+
+        if self._previous is not None:
+            previous_at, previous_delivered = self._previous
+            self._rates.append(max(delivered - previous_delivered, 0) / (now - previous_at))
+        self._previous = (now, delivered)
+
+        backlog = depth + buffered
+        drain_rate = max(self._rates, default=0.0)
+        if backlog < self.min_backlog:
+            estimated_wait = 0.0
+        elif drain_rate > 0:
+            estimated_wait = backlog / drain_rate + channel.batch_max_wait
+        else:
+            estimated_wait = float("inf")
+
+        self.estimated_wait = estimated_wait
+        self.sampled_at = now
+        return estimated_wait
+
+    def _run(self):
+        while not self._stopping.is_set():
+            try:
+                self.sample()
+            except Exception:
+                # TODO: Logging
+                pass
+            self._stopping.wait(self.interval)
+
+    def retry_after(self):
+        """
+        Decides whether a send is admitted, from the last sample.
+
+        Returns:
+            int: 0 to admit the send, otherwise the seconds the caller should wait before retrying.
+        """
+        if not self.enabled:
+            return 0
+        if self._thread is None:
+            self.start()
+
+        estimated_wait = self.estimated_wait
+        if estimated_wait <= self.max_wait or monotonic() - self.sampled_at > self.max_sample_age:
+            return 0
+
+        metrics.increment("admission_rejected")
+        if estimated_wait == float("inf"):
+            return settings.OTP_TTL_SECONDS
+        return min(max(ceil(estimated_wait - self.max_wait), 1), settings.OTP_TTL_SECONDS)
+
+    def close(self):
+        """Stops the sampling thread."""
+        self._stopping.set()
+
+
+otp_admission = AdmissionController(OTP_CHANNEL)
@@ -0,0 +1,347 @@
+import csv
+import json
+import os
+import uuid
+from itertools import islice
+from time import time
+
+from django.conf import settings
+
+from .admission import otp_admission
+from .dispatcher import OTP_CHANNEL, format_otp_message, generate_otp
+from .idempotency import coalescing_key
+from .rate_limit import send_otp_limits
+from .serializers import PHONE_REGEX
+from notifications.tasks import notify_bulk
+from utils import redis_client_ins
+from utils.redis_client import OTP_SEND_CREATED, OTP_SEND_RATE_LIMITED
+
+# File extensions and the formats they are read as
+CAMPAIGN_FORMATS = {
+    "csv": "csv",
+    "txt": "csv",
+    "jsonl": "jsonl",
+    "ndjson": "jsonl",
+}
+# CSV header and JSONL key of the phone numbers
+PHONE_NUMBER_FIELD = "phone_number"
+
+STATUS_PENDING = "pending"
+STATUS_RUNNING = "running"
+STATUS_COMPLETED = "completed"
+STATUS_FAILED = "failed"
+
+PROGRESS_COUNTERS = ("rows", "queued", "invalid", "duplicate", "rate_limited")
+
+
+class CampaignError(Exception):
+    """Raised when a campaign cannot be created or run."""
+
+
+class CampaignLocked(CampaignError):
+    """Raised when another runner holds (or took over) the lock of a campaign."""
+
+
+class CampaignOverloaded(CampaignError):
+    """Raised when admission control rejects new sends; the campaign is resumed ``retry_after`` seconds later."""
+
+    def __init__(self, message, retry_after):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+def detect_format(filename):
+    """
+    Picks the format of a campaign file from its extension.
+
+    Raises:
+        CampaignError: If the extension is not one of ``CAMPAIGN_FORMATS``.
+    """
+    extension = os.path.splitext(filename)[1].lstrip(".").lower()
+    try:
+        return CAMPAIGN_FORMATS[extension]
+    except KeyError:
+        raise CampaignError(f"Unsupported campaign file {filename!r}, expected one of {', '.join(CAMPAIGN_FORMATS)}.") from None
+
+
+def read_lines(path, offset=0):
+    """
+    Yields the lines of a file from ``offset`` on, one at a time.
+
+    Yields:
+        tuple: The offset right after the line and the line (bytes).
+    """
+    with open(path, "rb") as campaign_file:
+        campaign_file.seek(offset)
+        for line in campaign_file:
+            offset += len(line)
+            yield offset, line
+
+
+def csv_layout(path):
+    """
+    Finds where the phone numbers are in a CSV file.
+
+    Returns:
+        tuple: The index of the ``phone_number`` column (the first column
+        without a header) and the offset of the first data row.
+    """
+    for offset, line in read_lines(path):
+        row = next(csv.reader([line.decode("utf-8-sig")]), [])
+        headers = [cell.strip().lower() for cell in row]
+        if PHONE_NUMBER_FIELD in headers:
+            return headers.index(PHONE_NUMBER_FIELD), offset
+        break
+    return 0, 0
+
+
+def parse_csv(lines, column):
+    """Yields ``(offset, value)`` for every non-blank CSV line, ``value`` being its ``column`` cell."""
+    for offset, line in lines:
+        row = next(csv.reader([line.decode("utf-8-sig")]), [])
+        if not any(cell.strip() for cell in row):
+            continue
+        yield offset, row[column].strip() if column < len(row) else ""
+
+
+def parse_jsonl(lines):
+    """Yields ``(offset, value)`` for every non-blank JSONL line: a string, or an object with a ``phone_number``."""
+    for offset, line in lines:
+        if not line.strip():
+            continue
+        try:
+            value = json.loads(line)
+        except ValueError:
+            value = None
+        if isinstance(value, dict):
+            value = value.get(PHONE_NUMBER_FIELD)
+        yield offset, value.strip() if isinstance(value, str) else ""
+
+
+def validate_rows(rows):
+    """Yields ``(offset, phone_number)``, ``phone_number`` being None for rows failing ``PHONE_REGEX``."""
+    for offset, value in rows:
+        yield offset, value if PHONE_REGEX.match(value) else None
+
+
+def chunked(rows, size):
+    """Yields lists of up to ``size`` rows."""
+    rows = iter(rows)
+    return iter(lambda: list(islice(rows, size)), [])
+
+
+def iter_phone_numbers(campaign):
+    """
+    Streams the validated phone numbers of a campaign file from its checkpoint.
+
+    Args:
+        campaign (dict): The campaign fields, as returned by ``get_campaign``.
+
+    Yields:
+        tuple: The offset after the row and the phone number (None if invalid).
+    """
+    lines = read_lines(campaign["path"], int(campaign["offset"]))
+    if campaign["format"] == "csv":
+        rows = parse_csv(lines, int(campaign["column"]))
+    else:
+        rows = parse_jsonl(lines)
+    return validate_rows(rows)
+
+
+def create_campaign(path, campaign_format=None, campaign_id=None):
+    """
+    Registers a campaign for a CSV or JSONL file of phone numbers.
+
+    Args:
+        path (str): The file, read again on every (resumed) run.
+        campaign_format (str, optional): ``csv`` or ``jsonl``, detected from the extension by default.
+        campaign_id (str, optional): Defaults to a random id.
+
+    Returns:
+        str: The campaign id.
+
+    Raises:
+        CampaignError: If the format is not supported.
+    """
+    path = os.path.abspath(path)
+    campaign_format = campaign_format or detect_format(path)
+    if campaign_format not in CAMPAIGN_FORMATS.values():
+        raise CampaignError(f"Unsupported campaign format {campaign_format!r}.")
+    column, offset = csv_layout(path) if campaign_format == "csv" else (0, 0)
+
+    campaign_id = campaign_id or uuid.uuid4().hex
+    redis_client_ins.create_campaign(campaign_id, {
+        "path": path,
+        "format": campaign_format,
+        "column": column,
+        "offset": offset,
+        "size": os.path.getsize(path),
+        "status": STATUS_PENDING,
+        "created_at": int(time()),
+        **{counter: 0 for counter in PROGRESS_COUNTERS},
+    })
+    return campaign_id
+
+
+def get_campaign(campaign_id):
+    """
+    Returns the fields of a campaign.
+
+    Raises:
+        CampaignError: If the campaign does not exist (or expired).
+    """
+    campaign = redis_client_ins.get_campaign(campaign_id)
+    if not campaign:
+        raise CampaignError(f"Campaign {campaign_id!r} does not exist.")
+    return campaign
+
+
+def campaign_progress(campaign_id, campaign):
+    """
+    Summarizes the progress of a campaign.
+
+    Returns:
+        dict: The id, status, error, row counters and percentage of the file processed.
+    """
+    size = int(campaign["size"])
+    return {
+        "campaign_id": campaign_id,
+        "status": campaign["status"],
+        "error": campaign.get("error") or None,
+        # Campaigns created by older releases lack the newer counters
+        **{counter: int(campaign.get(counter, 0)) for counter in PROGRESS_COUNTERS},
+        "percent": round(100 * int(campaign["offset"]) / size, 1) if size else 100.0,
+    }
+
+
+def campaign_send_arguments(phone_number, otp):
+    """
+    Builds the keyword arguments of ``Redis.send_otp`` for a campaign number.
+
+    Campaign sends are coalesced with, and limited like, the sends of the
+    API to the same number; there is no caller bucket.
+    """
+    return {
+        "phone_number": phone_number,
+        "otp_code": otp,
+        "dedupe_key": coalescing_key(phone_number),
+        "window": settings.OTP_IDEMPOTENCY_WINDOW,
+        "limits": send_otp_limits(phone_number) if settings.OTP_RATE_LIMIT_ENABLED else [],
+    }
+
+
+def process_chunk(campaign_id, chunk):
+    """
+    Sends the OTPs of a chunk of rows.
+
+    Numbers repeated within the chunk, or processed by an earlier chunk, are
+    skipped. The others go through ``Redis.send_otps`` like a bulk send of
+    the API, in one pipeline: a number sent to within
+    ``OTP_IDEMPOTENCY_WINDOW`` keeps its live code and counts as a
+    duplicate, one over its per-number limit counts as rate limited, and
+    the SMS of the rest are published as one bulk send.
+
+    Args:
+        campaign_id (str): The campaign.
+        chunk (list): ``(offset, phone_number)`` rows from ``iter_phone_numbers``.
+
+    Returns:
+        tuple: The progress counts of the chunk and the phone numbers it is done with.
+    """
+    phone_numbers = list(dict.fromkeys(phone_number for _, phone_number in chunk if phone_number))
+    invalid = sum(1 for _, phone_number in chunk if phone_number is None)
+    unseen = redis_client_ins.filter_unseen_phones(campaign_id, phone_numbers)
+
+    created = {}
+    rate_limited = 0
+    if unseen:
+        otps = {phone_number: generate_otp() for phone_number in unseen}
+        outcomes = redis_client_ins.send_otps([
+            campaign_send_arguments(phone_number, otp) for phone_number, otp in otps.items()
+        ])
+        for (phone_number, otp), (outcome, _) in zip(otps.items(), outcomes):
+            if outcome == OTP_SEND_CREATED:
+                created[phone_number] = otp
+            elif outcome == OTP_SEND_RATE_LIMITED:
+                rate_limited += 1
+
+    if created:
+        notify_bulk(OTP_CHANNEL, [
+            (phone_number, format_otp_message(otp)) for phone_number, otp in created.items()
+        ]).apply_async()
+
+    counts = {
+        "rows": len(chunk),
+        "queued": len(created),
+        "invalid": invalid,
+        "duplicate": len(chunk) - invalid - len(created) - rate_limited,
+        "rate_limited": rate_limited,
+    }
+    return counts, unseen
+
+
+def run_campaign(campaign_id, chunk_size=None, max_chunks=None, progress=None):
+    """
+    Streams a campaign file from its checkpoint and sends its OTPs, chunk by chunk.
+
+    Memory use does not depend on the file size: rows are read lazily, one
+    chunk is held at a time and the numbers already queued are remembered in
+    Redis. Each chunk is checkpointed once published, so a stopped or failed
+    run resumes after the last published chunk; a crash between publishing a
+    chunk and checkpointing it sends that chunk again (to the numbers whose
+    earlier send is outside ``OTP_IDEMPOTENCY_WINDOW``). Admission control
+    is asked before every chunk: while it rejects new sends the run stops,
+    leaving the campaign running from its checkpoint.
+
+    Args:
+        campaign_id (str): The campaign, see ``create_campaign``.
+        chunk_size (int, optional): Rows per chunk, defaults to ``CAMPAIGN_CHUNK_SIZE``.
+        max_chunks (int, optional): Stop after this many chunks, leaving the campaign running.
+        progress (callable, optional): Called with the campaign fields after every chunk.
+
+    Returns:
+        dict: The campaign fields after the run.
+
+    Raises:
+        CampaignError: If the campaign does not exist or its file cannot be read.
+        CampaignLocked: If another runner processes the campaign.
+        CampaignOverloaded: If admission control rejects new sends.
+    """
+    campaign = get_campaign(campaign_id)
+    if campaign["status"] == STATUS_COMPLETED:
+        return campaign
+
+    chunk_size = chunk_size or settings.CAMPAIGN_CHUNK_SIZE
+    owner = uuid.uuid4().hex
+    lock_ttl = settings.CAMPAIGN_LOCK_TTL
+    if not redis_client_ins.acquire_campaign_lock(campaign_id, owner, lock_ttl):
+        raise CampaignLocked(f"Campaign {campaign_id!r} is being processed by another runner.")
+
+    try:
+        redis_client_ins.update_campaign(campaign_id, {"status": STATUS_RUNNING, "error": ""})
+        chunks = chunked(iter_phone_numbers(campaign), chunk_size)
+        for processed, chunk in enumerate(chunks, start=1):
+            retry_after = otp_admission.retry_after()
+            if retry_after:
+                raise CampaignOverloaded(f"Campaign {campaign_id!r} paused by admission control.", retry_after)
+            counts, done = process_chunk(campaign_id, chunk)
+            if not redis_client_ins.checkpoint_campaign(campaign_id, owner, lock_ttl, chunk[-1][0], counts, done):
+                raise CampaignLocked(f"Campaign {campaign_id!r} was taken over by another runner.")
+            if progress is not None:
+                progress(redis_client_ins.get_campaign(campaign_id))
+            if max_chunks and processed >= max_chunks:
+                break
+        else:
+            redis_client_ins.update_campaign(campaign_id, {"status": STATUS_COMPLETED})
+    except (CampaignLocked, CampaignOverloaded):
+        raise
+    except Exception as exc:
+        # TODO: Logging
+        redis_client_ins.update_campaign(campaign_id, {"status": STATUS_FAILED, "error": str(exc)})
+        if isinstance(exc, OSError):
+            raise CampaignError(f"Campaign file {campaign['path']!r} cannot be read: {exc}") from exc
+        raise
+    finally:
+        redis_client_ins.release_campaign_lock(campaign_id, owner)
+
+    return redis_client_ins.get_campaign(campaign_id)
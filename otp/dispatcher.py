@@ -0,0 +1,35 @@
+import random
+
+# Constants for OTP generation and delivery
+OTP_LENGTH = 6
+OTP_MIN_VALUE = 10**(OTP_LENGTH - 1)
+OTP_MAX_VALUE = (10**OTP_LENGTH) - 1
+OTP_MESSAGE_TEMPLATE = "Your verification code is {otp}"
+# Notification channel delivering the OTPs
+OTP_CHANNEL = "sms"
+
+
+def generate_otp(length=OTP_LENGTH):
+    """
+    Generates a random One-Time Password (OTP) of specified length.
+
+    Args:
+        length (int): The length of the OTP to generate. Defaults to OTP_LENGTH.
+
+    Returns:
+        str: A string representing the generated OTP.
+    """
+    return str(random.randint(OTP_MIN_VALUE, OTP_MAX_VALUE))
+
+
+def format_otp_message(otp):
+    """
+    Builds the SMS text for an OTP.
+
+    Args:
+        otp (str): The OTP code.
+
+    Returns:
+        str: The SMS body.
+    """
+    return OTP_MESSAGE_TEMPLATE.format(otp=otp)
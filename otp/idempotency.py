@@ -0,0 +1,35 @@
+from hashlib import sha256
+
+from .rate_limit import get_subject
+from utils.redis_client import phone_key
+
+IDEMPOTENCY_KEY_HEADER = "Idempotency-Key"
+
+
+def coalescing_key(phone_number):
+    """Returns the Redis key that marks recent sends to a number, whoever asked for them."""
+    return phone_key("otp_sent", phone_number)
+
+
+def dedupe_key_for(request, phone_number):
+    """
+    Returns the Redis key that marks recent sends for this request.
+
+    With an ``Idempotency-Key`` header the key is scoped to the caller, the
+    number and the (hashed) header value; otherwise repeat sends to the same
+    number are coalesced. Either way the key shares the number's hash tag, so
+    it lives on the same Redis Cluster slot as the OTP bucket.
+
+    Args:
+        request (HttpRequest): The incoming HTTP request.
+        phone_number (str): The recipient phone number.
+
+    Returns:
+        str: The dedupe key.
+    """
+    idempotency_key = request.headers.get(IDEMPOTENCY_KEY_HEADER)
+    if not idempotency_key:
+        return coalescing_key(phone_number)
+
+    digest = sha256(idempotency_key.encode("utf-8")).hexdigest()
+    return f"{phone_key('otp_idempotency', phone_number)}:{get_subject(request)}:{digest}"
@@ -0,0 +1,21 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from otp.schema import code_fingerprint, generate_schema, read_fingerprint, write_schema_files
+
+
+class Command(BaseCommand):
+    help = "Writes the OpenAPI schema files served on /swagger.json and /swagger.yaml, if the code changed."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--dir", default=settings.OPENAPI_SCHEMA_DIR, help="Directory of the schema files.")
+        parser.add_argument("--force", action="store_true", help="Regenerate even if the code did not change.")
+
+    def handle(self, *args, **options):
+        fingerprint = code_fingerprint()
+        if not options["force"] and read_fingerprint(options["dir"]) == fingerprint:
+            self.stdout.write("Schema is up to date.")
+            return
+
+        write_schema_files(options["dir"], generate_schema(), fingerprint)
+        self.stdout.write(f"Schema written to {options['dir']}.")
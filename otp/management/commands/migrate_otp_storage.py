@@ -0,0 +1,75 @@
+from time import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from utils import redis_client_ins
+from utils.redis_client import pack_otp
+
+
+class Command(BaseCommand):
+    help = "Moves the live OTPs of the one-key-per-number format into the compact OTP buckets."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000, help="Keys read and written per round trip.")
+        parser.add_argument("--keep", action="store_true", help="Leave the old keys in place.")
+
+    def handle(self, *args, **options):
+        if redis_client_ins is None:
+            raise CommandError("Redis is not reachable.")
+
+        migrated = skipped = 0
+        batch = []
+        for key in redis_client_ins.scan_iter(match="otp:*", count=options["batch_size"]):
+            if b"+" not in key:
+                # A bucket of the compact format
+                continue
+            batch.append(key)
+            if len(batch) >= options["batch_size"]:
+                moved, ignored = self.migrate(batch, options["keep"])
+                migrated, skipped, batch = migrated + moved, skipped + ignored, []
+        if batch:
+            moved, ignored = self.migrate(batch, options["keep"])
+            migrated, skipped = migrated + moved, skipped + ignored
+
+        self.stdout.write(f"Migrated {migrated} OTPs, skipped {skipped} expired or invalid keys.")
+        self.stdout.write(
+            "Set OTP_STORAGE_LEGACY_FALLBACK=False once no instance writes the old format anymore."
+        )
+
+    def migrate(self, keys, keep):
+        """
+        Copies a batch of old keys, with their remaining TTL, into the buckets.
+
+        Args:
+            keys (list): Old OTP keys, ``otp:<phone number>`` or ``otp:{<phone number>}``.
+            keep (bool): Whether to leave the old keys in place.
+
+        Returns:
+            tuple: The number of migrated and of skipped keys.
+        """
+        pipe = redis_client_ins.pipeline(transaction=False)
+        for key in keys:
+            pipe.get(key)
+            pipe.ttl(key)
+        values = pipe.execute()
+
+        now = int(time())
+        packed_otps = {}
+        for key, otp_code, ttl in zip(keys, values[::2], values[1::2]):
+            if otp_code is None or ttl <= 0:
+                continue
+            phone_number = key.decode("utf-8")[len("otp:"):].strip("{}")
+            try:
+                packed_otps[phone_number] = pack_otp(otp_code, now + ttl)
+            except ValueError:
+                continue
+
+        if packed_otps:
+            redis_client_ins.store_packed_otps(packed_otps)
+        if not keep:
+            # One by one, old keys of different numbers may live on different cluster slots
+            pipe = redis_client_ins.pipeline(transaction=False)
+            for key in keys:
+                pipe.delete(key)
+            pipe.execute()
+        return len(packed_otps), len(keys) - len(packed_otps)
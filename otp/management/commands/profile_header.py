@@ -0,0 +1,12 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from otp.profiling import PROFILE_HEADER, sign_debug_header
+
+
+class Command(BaseCommand):
+    help = "Prints a signed header that makes ProfilingMiddleware profile the request."
+
+    def handle(self, *args, **options):
+        self.stdout.write(f"{PROFILE_HEADER}: {sign_debug_header()}")
+        self.stderr.write(f"Valid for {settings.PROFILER_HEADER_MAX_AGE} seconds.")
@@ -0,0 +1,94 @@
+import io
+import json
+import os
+import pstats
+from collections import Counter, defaultdict
+from glob import glob
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from otp.profiling import PROFILE_SUFFIX, REPORT_SUFFIX
+
+
+class Command(BaseCommand):
+    help = "Merges the profiles written by ProfilingMiddleware and prints a summary."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--dir", default=settings.PROFILER_OUTPUT_DIR, help="Directory holding the profiles.")
+        parser.add_argument("--path", default="", help="Only merge requests whose path starts with this prefix.")
+        parser.add_argument("--sort", default="cumulative", help="pstats sort key, e.g. cumulative, tottime, calls.")
+        parser.add_argument("--limit", type=int, default=30, help="Number of functions and allocation sites shown.")
+        parser.add_argument("--output", help="Also save the merged pstats dump to this file.")
+        parser.add_argument("--clear", action="store_true", help="Delete the merged profiles afterwards.")
+
+    def handle(self, *args, **options):
+        reports = self.load_reports(options["dir"], options["path"])
+        if not reports:
+            raise CommandError(f"No profiles found in {options['dir']}.")
+
+        self.print_requests(reports)
+
+        profile_paths = [path[:-len(REPORT_SUFFIX)] + PROFILE_SUFFIX for path in reports]
+        # Django's OutputWrapper ends every write with a newline, pstats writes fragments
+        buffer = io.StringIO()
+        stats = pstats.Stats(*profile_paths, stream=buffer)
+        if options["output"]:
+            stats.dump_stats(options["output"])
+        stats.strip_dirs().sort_stats(options["sort"]).print_stats(options["limit"])
+        self.stdout.write(buffer.getvalue())
+
+        self.print_allocations(reports.values(), options["limit"])
+
+        if options["clear"]:
+            for path in list(reports) + profile_paths:
+                os.remove(path)
+
+    def load_reports(self, directory, path_prefix):
+        """
+        Reads the JSON reports that have a pstats dump next to them.
+
+        Args:
+            directory (str): The profiles directory.
+            path_prefix (str): Request path filter.
+
+        Returns:
+            dict: Report file path -> report.
+        """
+        reports = {}
+        for path in sorted(glob(os.path.join(directory, "*" + REPORT_SUFFIX))):
+            if not os.path.exists(path[:-len(REPORT_SUFFIX)] + PROFILE_SUFFIX):
+                continue
+            with open(path) as report_file:
+                report = json.load(report_file)
+            if report["path"].startswith(path_prefix):
+                reports[path] = report
+        return reports
+
+    def print_requests(self, reports):
+        """Prints the number of profiles and the request durations per path."""
+        durations = defaultdict(list)
+        for report in reports.values():
+            durations[f"{report['method']} {report['path']}"].append(report["duration"] * 1000)
+
+        self.stdout.write(f"{len(reports)} profiled requests")
+        self.stdout.write(f"{'request':<40} {'count':>6} {'mean ms':>9} {'max ms':>9}")
+        for request, values in sorted(durations.items()):
+            self.stdout.write(f"{request:<40} {len(values):6d} {sum(values) / len(values):9.2f} {max(values):9.2f}")
+        self.stdout.write("")
+
+    def print_allocations(self, reports, limit):
+        """Prints the allocation sites with the largest total size over all reports."""
+        sizes = Counter()
+        counts = Counter()
+        for report in reports:
+            for allocation in report["allocations"]:
+                sizes[allocation["location"]] += allocation["size"]
+                counts[allocation["location"]] += allocation["count"]
+        if not sizes:
+            return
+
+        self.stdout.write("Top allocations (tracemalloc, summed over all profiles)")
+        self.stdout.write(f"{'KiB':>10} {'blocks':>8}  location")
+        for location, size in sizes.most_common(limit):
+            self.stdout.write(f"{size / 1024:10.1f} {counts[location]:8d}  {location}")
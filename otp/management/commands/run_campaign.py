@@ -0,0 +1,77 @@
+from time import sleep
+
+from django.core.management.base import BaseCommand, CommandError
+from redis.exceptions import RedisError
+
+from otp.campaigns import (
+    CAMPAIGN_FORMATS,
+    CampaignError,
+    CampaignOverloaded,
+    campaign_progress,
+    create_campaign,
+    get_campaign,
+    run_campaign,
+)
+from otp.tasks import run_campaign_task
+from utils import redis_client_ins
+
+
+class Command(BaseCommand):
+    help = "Sends an OTP to every phone number of a CSV or JSONL file, streaming it in chunks."
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", nargs="?", help="CSV (phone_number column, or the first one) or JSONL file.")
+        parser.add_argument("--format", choices=sorted(set(CAMPAIGN_FORMATS.values())), help="Defaults to the file extension.")
+        parser.add_argument("--resume", metavar="CAMPAIGN_ID", help="Continue a campaign from its checkpoint.")
+        parser.add_argument("--chunk-size", type=int, help="Rows per Redis pipeline and checkpoint.")
+        parser.add_argument("--background", action="store_true", help="Hand the campaign to the Celery workers.")
+
+    def handle(self, *args, **options):
+        if bool(options["path"]) == bool(options["resume"]):
+            raise CommandError("Pass either a file or --resume <campaign id>.")
+        try:
+            redis_client_ins.ping()
+        except RedisError as exc:
+            raise CommandError(f"Redis is not reachable: {exc}")
+
+        try:
+            if options["resume"]:
+                campaign_id = options["resume"]
+                get_campaign(campaign_id)
+            else:
+                campaign_id = create_campaign(options["path"], options["format"])
+                self.stdout.write(f"Campaign {campaign_id} created; resume it with --resume {campaign_id}.")
+
+            if options["background"]:
+                run_campaign_task.delay(campaign_id)
+                self.stdout.write(f"Campaign {campaign_id} queued.")
+                return
+
+            self.last_percent = -1
+            while True:
+                try:
+                    campaign = run_campaign(
+                        campaign_id,
+                        chunk_size=options["chunk_size"],
+                        progress=lambda fields: self.report(campaign_id, fields),
+                    )
+                    break
+                except CampaignOverloaded as exc:
+                    self.stdout.write(f"{exc} Resuming in {exc.retry_after} seconds.")
+                    sleep(exc.retry_after)
+        except (CampaignError, OSError) as exc:
+            raise CommandError(str(exc))
+
+        self.report(campaign_id, campaign, force=True)
+
+    def report(self, campaign_id, campaign, force=False):
+        """Prints the progress whenever another percent of the file is done."""
+        progress = campaign_progress(campaign_id, campaign)
+        if not force and int(progress["percent"]) == self.last_percent:
+            return
+        self.last_percent = int(progress["percent"])
+        self.stdout.write(
+            f"{progress['percent']:5.1f}% {progress['status']}: {progress['rows']} rows, "
+            f"{progress['queued']} queued, {progress['invalid']} invalid, {progress['duplicate']} duplicates, "
+            f"{progress['rate_limited']} rate limited"
+        )
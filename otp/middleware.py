@@ -1,18 +1,36 @@
+from time import perf_counter
 from traceback import print_exc
 
-from requests import post
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
 from django.conf import settings
-from django.http import JsonResponse
-from pybreaker import CircuitBreaker, CircuitBreakerError
+from pybreaker import CircuitBreakerError
 from jwt import ExpiredSignatureError, InvalidTokenError
 
-from utils import extract_token, decode_token
+from utils import (
+    extract_token,
+    decode_token,
+    token_validation_cache,
+    auth_service_client,
+    async_auth_service_client,
+    auth_service_circuit_breaker,
+    concurrency_limiter,
+    metrics,
+    revocation_list,
+)
+from utils.json_response import PreEncodedJSON
 
 
 # Constants for response messages and status codes
 AUTHORIZATION_HEADER = "Authorization"
 STATUS_UNAUTHORIZED = 401
 STATUS_INTERNAL_SERVER_ERROR = 500
+STATUS_SERVICE_UNAVAILABLE = 503
+
+# Seconds clients are asked to wait when the concurrency limit is reached
+OVERLOADED_RETRY_AFTER = 1
+
+# Requests under these paths must carry a valid token
+PROTECTED_PATH_PREFIXES = ("/api/otp/", "/api/notifications/")
 
 ERROR_RESPONSES = {
     "missing_authorization": {
@@ -45,17 +63,46 @@ ERROR_RESPONSES = {
         "error": "Token validation failed.",
         "data": None,
     },
+    "overloaded": {
+        "statusCode": STATUS_SERVICE_UNAVAILABLE,
+        "message": "Operation failed.",
+        "error": "The service is overloaded. Please try again later.",
+        "data": None,
+    },
+}
+
+
+# Encoded once at import time, so error responses cost no serialization
+ENCODED_ERROR_RESPONSES = {
+    error_key: PreEncodedJSON(response, status=response["statusCode"])
+    for error_key, response in ERROR_RESPONSES.items()
 }
 
 
 def json_unauthorized_response(error_key):
-    """Utility function to generate unauthorized JsonResponse."""
-    response = ERROR_RESPONSES.get(error_key, ERROR_RESPONSES["validation_failed"])
-    return JsonResponse(response, status=response["statusCode"])
+    """Utility function to generate unauthorized JSON response."""
+    response = ENCODED_ERROR_RESPONSES.get(error_key, ENCODED_ERROR_RESPONSES["validation_failed"])
+    return response.response()
+
+
+class TokenRejected(Exception):
+    """Raised when a request is rejected before the token reaches the auth service."""
+
+    def __init__(self, error_key):
+        super().__init__(error_key)
+        self.error_key = error_key
 
 
 class TokenValidationMiddleware:
-    """Middleware for validating JWT tokens on specific API endpoints."""
+    """
+    Middleware for validating JWT tokens on specific API endpoints.
+
+    Works in both sync (WSGI) and async (ASGI) chains; in the async chain the
+    cache lookups and the auth-service call do not block the event loop.
+    """
+
+    sync_capable = True
+    async_capable = True
 
     def __init__(self, get_response):
         """
@@ -65,7 +112,11 @@ class TokenValidationMiddleware:
             get_response (callable): The next middleware or view.
         """
         self.get_response = get_response
-        self.circuit_breaker = CircuitBreaker(fail_max=5, reset_timeout=60)
+        self.circuit_breaker = auth_service_circuit_breaker
+        self.local_verification = settings.TOKEN_LOCAL_VERIFICATION
+        self.async_mode = iscoroutinefunction(self.get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
 
     def __call__(self, request):
         """
@@ -77,43 +128,206 @@ class TokenValidationMiddleware:
         Returns:
             HttpResponse: The HTTP response.
         """
-        if not request.path.startswith("/api/otp/"):
+        if self.async_mode:
+            return self.__acall__(request)
+
+        if not request.path.startswith(PROTECTED_PATH_PREFIXES):
             return self.get_response(request)
 
+        if not concurrency_limiter.try_acquire():
+            return self.overloaded_response()
+        started = perf_counter()
+        response = None
+        try:
+            with metrics.timer("request"):
+                try:
+                    token, payload = self.parse_token(request)
+                    if not self.check_token(token, payload):
+                        response = self.unauthorized_response("invalid_token")
+                        return response
+                except Exception as exc:
+                    response = self.unauthorized_response(self.error_key_for(exc))
+                    return response
+
+                request.token_payload = payload
+                response = self.get_response(request)
+                return response
+        finally:
+            concurrency_limiter.release(perf_counter() - started, failed=self.is_failure(response))
+
+    async def __acall__(self, request):
+        """Async variant of ``__call__``."""
+        if not request.path.startswith(PROTECTED_PATH_PREFIXES):
+            return await self.get_response(request)
+
+        if not concurrency_limiter.try_acquire():
+            return self.overloaded_response()
+        started = perf_counter()
+        response = None
+        try:
+            with metrics.timer("request"):
+                try:
+                    token, payload = self.parse_token(request)
+                    if not await self.acheck_token(token, payload):
+                        response = self.unauthorized_response("invalid_token")
+                        return response
+                except Exception as exc:
+                    response = self.unauthorized_response(self.error_key_for(exc))
+                    return response
+
+                request.token_payload = payload
+                response = await self.get_response(request)
+                return response
+        finally:
+            concurrency_limiter.release(perf_counter() - started, failed=self.is_failure(response))
+
+    @staticmethod
+    def is_failure(response):
+        """
+        Tells whether a request counts as failed for the concurrency limiter.
+
+        Load shedding (503) is not a failure of this process, server errors
+        and exceptions (no response) are.
+        """
+        return response is None or (
+            response.status_code >= STATUS_INTERNAL_SERVER_ERROR
+            and response.status_code != STATUS_SERVICE_UNAVAILABLE
+        )
+
+    def overloaded_response(self):
+        """Returns the 503 response for a request over the concurrency limit."""
+        response = self.unauthorized_response("overloaded")
+        response["Retry-After"] = str(OVERLOADED_RETRY_AFTER)
+        return response
+
+    @staticmethod
+    def unauthorized_response(error_key):
+        """
+        Counts a rejected request and returns its error response.
+
+        Args:
+            error_key (str): The ``ERROR_RESPONSES`` key.
+
+        Returns:
+            HttpResponse: The error response.
+        """
+        metrics.increment(f"rejected_{error_key}")
+        return json_unauthorized_response(error_key)
+
+    @staticmethod
+    def parse_token(request):
+        """
+        Extracts and decodes the access token of the request.
+
+        Args:
+            request (HttpRequest): The HTTP request object.
+
+        Returns:
+            tuple: The raw token and its decoded payload.
+
+        Raises:
+            TokenRejected: If the header is missing or the token is not an access token.
+            InvalidTokenError: If the token is invalid or expired.
+        """
         auth_header = request.headers.get(AUTHORIZATION_HEADER)
         if not auth_header:
-            return json_unauthorized_response("missing_authorization")
+            raise TokenRejected("missing_authorization")
 
-        try:
+        with metrics.timer("extract_token"):
             token = extract_token(auth_header=auth_header)
+        with metrics.timer("decode_token"):
             payload = decode_token(token=token)
 
-            if payload.get("type") != "access":
-                return json_unauthorized_response("invalid_token")
+        if payload.get("type") != "access":
+            raise TokenRejected("invalid_token")
+        return token, payload
 
-            response = self.validate_token_with_service(token)
+    @staticmethod
+    def error_key_for(exc):
+        """
+        Maps an exception raised during validation to an ``ERROR_RESPONSES`` key.
 
-            if self.is_token_valid(response):
-                return self.get_response(request)
-            else:
-                return json_unauthorized_response("invalid_token")
+        Args:
+            exc (Exception): The raised exception.
 
-        except ExpiredSignatureError:
-            return json_unauthorized_response("expired_token")
-        except InvalidTokenError:
-            return json_unauthorized_response("invalid_token")
-        except CircuitBreakerError:
-            return json_unauthorized_response("service_unavailable")
-        except Exception:
-            # TODO: Logging
-            return JsonResponse(
-                ERROR_RESPONSES["validation_failed"],
-                status=STATUS_INTERNAL_SERVER_ERROR,
-            )
+        Returns:
+            str: The error response key.
+        """
+        if isinstance(exc, TokenRejected):
+            return exc.error_key
+        if isinstance(exc, ExpiredSignatureError):
+            return "expired_token"
+        if isinstance(exc, InvalidTokenError):
+            return "invalid_token"
+        if isinstance(exc, CircuitBreakerError):
+            return "service_unavailable"
+        # TODO: Logging
+        return "validation_failed"
+
+    def check_token(self, token, payload):
+        """
+        Returns the validation result for the token, consulting the cache first.
+
+        In local verification mode the pushed revocation list answers first
+        and the authentication service is only asked when it cannot.
+
+        Only answers actually given by the authentication service are cached;
+        server-side failures are retried on the next request.
+
+        Args:
+            token (str): The JWT token to validate.
+            payload (dict): The decoded token payload.
+
+        Returns:
+            bool: True if token is valid, False otherwise.
+        """
+        if self.local_verification:
+            with metrics.timer("revocation_check"):
+                is_valid = revocation_list.check(payload)
+            if is_valid is not None:
+                return is_valid
+
+        with metrics.timer("token_cache"):
+            is_valid = token_validation_cache.get(token, payload)
+        if is_valid is not None:
+            metrics.increment("token_cache_hit")
+            return is_valid
+        metrics.increment("token_cache_miss")
+
+        response = self.validate_token_with_service(token)
+        is_valid = self.is_token_valid(response)
+
+        if is_valid or response.status_code < STATUS_INTERNAL_SERVER_ERROR:
+            token_validation_cache.set(token, payload, is_valid)
+        return is_valid
+
+    async def acheck_token(self, token, payload):
+        """Async variant of ``check_token``."""
+        if self.local_verification:
+            with metrics.timer("revocation_check"):
+                is_valid = await revocation_list.acheck(payload)
+            if is_valid is not None:
+                return is_valid
+
+        with metrics.timer("token_cache"):
+            is_valid = await token_validation_cache.aget(token, payload)
+        if is_valid is not None:
+            metrics.increment("token_cache_hit")
+            return is_valid
+        metrics.increment("token_cache_miss")
+
+        response = await self.avalidate_token_with_service(token)
+        is_valid = self.is_token_valid(response)
+
+        if is_valid or response.status_code < STATUS_INTERNAL_SERVER_ERROR:
+            await token_validation_cache.aset(token, payload, is_valid)
+        return is_valid
 
     def validate_token_with_service(self, token):
         """
-        Validates the token by calling the external authentication service.
+        Validates the token by calling the external authentication service
+        through the pooled client, guarded by the circuit breaker shared by
+        all processes.
 
         Args:
             token (str): The JWT token to validate.
@@ -121,11 +335,27 @@ class TokenValidationMiddleware:
         Returns:
             requests.Response: The response from the authentication service.
         """
-        return self.circuit_breaker.call(
-            post,
-            settings.TOKEN_VALIDATION_URL,
-            json={"token": token},
-        )
+        with metrics.timer("circuit_breaker"):
+            return self.circuit_breaker.call(
+                auth_service_client.validate_token,
+                token,
+            )
+
+    async def avalidate_token_with_service(self, token):
+        """
+        Async variant of ``validate_token_with_service`` using the non-blocking client.
+
+        Args:
+            token (str): The JWT token to validate.
+
+        Returns:
+            httpx.Response: The response from the authentication service.
+        """
+        with metrics.timer("circuit_breaker"):
+            return await self.circuit_breaker.acall(
+                async_auth_service_client.validate_token,
+                token,
+            )
 
     @staticmethod
     def is_token_valid(response):
@@ -133,14 +363,14 @@ class TokenValidationMiddleware:
         Determines if the token is valid based on the authentication service response.
 
         Args:
-            response (requests.Response): The response from the authentication service.
+            response (requests.Response or httpx.Response): The response from the authentication service.
 
         Returns:
             bool: True if token is valid, False otherwise.
         """
         try:
             json_response = response.json()
-            return response.status_code == 200 and json_response.get("data", {}).get("is_valid", False)
+            return response.status_code == 200 and bool(json_response.get("data", {}).get("is_valid", False))
         except ValueError:
             # TODO: Logging
             return False
\ No newline at end of file
@@ -0,0 +1,217 @@
+import cProfile
+import json
+import os
+import random
+import tracemalloc
+from itertools import count
+from threading import Lock
+from time import perf_counter, time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.signing import BadSignature, TimestampSigner
+
+# Request header asking for the request to be profiled, see ``sign_debug_header``
+PROFILE_HEADER = "X-Debug-Profile"
+# Response header carrying the id of the written profile
+PROFILE_ID_HEADER = "X-Profile-Id"
+
+SIGNER_SALT = "otp.profiling"
+SIGNED_VALUE = "profile"
+
+PROFILE_SUFFIX = ".prof"
+REPORT_SUFFIX = ".json"
+
+# One profile at a time per process: cProfile and tracemalloc are process-wide
+_profiling_lock = Lock()
+_profile_counter = count()
+
+
+def sign_debug_header():
+    """
+    Returns a value for the ``X-Debug-Profile`` header.
+
+    The value is signed with ``SECRET_KEY`` and accepted for
+    ``PROFILER_HEADER_MAX_AGE`` seconds.
+
+    Returns:
+        str: The signed header value.
+    """
+    return TimestampSigner(salt=SIGNER_SALT).sign(SIGNED_VALUE)
+
+
+def has_valid_debug_header(request):
+    """
+    Checks the signed debug header of a request.
+
+    Args:
+        request (HttpRequest): The HTTP request object.
+
+    Returns:
+        bool: True if the header is present, correctly signed and not expired.
+    """
+    value = request.headers.get(PROFILE_HEADER)
+    if not value:
+        return False
+    try:
+        return TimestampSigner(salt=SIGNER_SALT).unsign(value, max_age=settings.PROFILER_HEADER_MAX_AGE) == SIGNED_VALUE
+    except BadSignature:
+        return False
+
+
+class ProfilingMiddleware:
+    """
+    Profiles a sample of the OTP requests, or any request with a signed debug header.
+
+    Sampled requests run under cProfile, and optionally tracemalloc. Each
+    profile is written to ``PROFILER_OUTPUT_DIR`` as a pstats dump and a JSON
+    report, to be merged with ``manage.py profile_report``. The cost for
+    requests that are not profiled is one random number.
+
+    In the async chain the profiler also sees other coroutines running on the
+    event loop while the sampled request awaits.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        """
+        Args:
+            get_response (callable): The next middleware or view.
+        """
+        self.get_response = get_response
+        self.sample_rate = settings.PROFILER_SAMPLE_RATE
+        self.output_dir = settings.PROFILER_OUTPUT_DIR
+        self.trace_memory = settings.PROFILER_TRACEMALLOC
+        self.async_mode = iscoroutinefunction(self.get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def should_profile(self, request):
+        """
+        Decides whether a request is profiled.
+
+        Args:
+            request (HttpRequest): The HTTP request object.
+
+        Returns:
+            bool: True for sampled OTP requests and requests with a valid debug header.
+        """
+        if PROFILE_HEADER in request.headers:
+            return has_valid_debug_header(request)
+        return request.path.startswith("/api/otp/") and random.random() < self.sample_rate
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+
+        if not self.should_profile(request) or not self.start():
+            return self.get_response(request)
+
+        profiling = self.start_profile()
+        try:
+            response = self.get_response(request)
+        finally:
+            profile_id = self.finish_profile(request, *profiling)
+        if profile_id:
+            response[PROFILE_ID_HEADER] = profile_id
+        return response
+
+    async def __acall__(self, request):
+        """Async variant of ``__call__``."""
+        if not self.should_profile(request) or not self.start():
+            return await self.get_response(request)
+
+        profiling = self.start_profile()
+        try:
+            response = await self.get_response(request)
+        finally:
+            profile_id = self.finish_profile(request, *profiling)
+        if profile_id:
+            response[PROFILE_ID_HEADER] = profile_id
+        return response
+
+    def start(self):
+        """Takes the per-process profiling slot, False if another request holds it or the disk quota is used."""
+        if not _profiling_lock.acquire(blocking=False):
+            return False
+        if self.quota_exceeded():
+            _profiling_lock.release()
+            return False
+        return True
+
+    def quota_exceeded(self):
+        """Checks whether ``PROFILER_MAX_FILES`` profiles are already waiting in the output directory."""
+        try:
+            with os.scandir(self.output_dir) as entries:
+                profiles = sum(1 for entry in entries if entry.name.endswith(PROFILE_SUFFIX))
+        except FileNotFoundError:
+            return False
+        return profiles >= settings.PROFILER_MAX_FILES
+
+    def start_profile(self):
+        """
+        Starts cProfile, and tracemalloc when enabled and not already tracing.
+
+        Returns:
+            tuple: The profiler, the start time and whether tracemalloc was started here.
+        """
+        started_tracing = self.trace_memory and not tracemalloc.is_tracing()
+        if started_tracing:
+            tracemalloc.start(settings.PROFILER_TRACEMALLOC_FRAMES)
+        profile = cProfile.Profile()
+        profile.enable()
+        return profile, perf_counter(), started_tracing
+
+    def finish_profile(self, request, profile, started, started_tracing):
+        """
+        Stops the profilers and writes the pstats dump and the JSON report.
+
+        Args:
+            request (HttpRequest): The profiled request.
+            profile (cProfile.Profile): The running profiler.
+            started (float): ``perf_counter`` value at the start of the request.
+            started_tracing (bool): Whether tracemalloc has to be stopped.
+
+        Returns:
+            str or None: The profile id (the common name of the written files), None if writing failed.
+        """
+        try:
+            profile.disable()
+            duration = perf_counter() - started
+
+            allocations = []
+            if self.trace_memory:
+                snapshot = tracemalloc.take_snapshot()
+                if started_tracing:
+                    tracemalloc.stop()
+                allocations = [
+                    {
+                        "location": str(statistic.traceback[0]),
+                        "size": statistic.size,
+                        "count": statistic.count,
+                    }
+                    for statistic in snapshot.statistics("lineno")[:settings.PROFILER_TRACEMALLOC_TOP]
+                ]
+
+            profile_id = f"{int(time())}-{os.getpid()}-{next(_profile_counter)}"
+            report = {
+                "id": profile_id,
+                "method": request.method,
+                "path": request.path,
+                "duration": duration,
+                "allocations": allocations,
+            }
+
+            os.makedirs(self.output_dir, exist_ok=True)
+            base_path = os.path.join(self.output_dir, profile_id)
+            profile.dump_stats(base_path + PROFILE_SUFFIX)
+            with open(base_path + REPORT_SUFFIX, "w") as report_file:
+                json.dump(report, report_file)
+            return profile_id
+        except OSError:
+            # TODO: Logging
+            return None
+        finally:
+            _profiling_lock.release()
@@ -0,0 +1,218 @@
+import atexit
+import json
+import logging
+import os
+from queue import Empty, Full, Queue
+from threading import Event, Lock, Thread
+from time import monotonic, sleep
+
+from celery import signature
+from django.conf import settings
+from kombu.exceptions import KombuError
+from redis import RedisError
+
+from notification_service.celery import app as celery_app
+from utils import metrics, redis_client_ins
+
+# Overflow policies, see ``PUBLISHER_OVERFLOW``
+OVERFLOW_BLOCK = "block"
+OVERFLOW_FAIL = "fail"
+OVERFLOW_SPILL = "spill"
+
+# Seconds to wait before publishing again after a broker error
+PUBLISH_RETRY_DELAY = 1.0
+
+logger = logging.getLogger(__name__)
+
+
+class PublisherFull(Exception):
+    """Raised when a task cannot be buffered, e.g. the buffer is full and the overflow policy is ``fail``."""
+
+
+class TaskPublisher:
+    """
+    Publishes Celery tasks from a background thread, off the request path.
+
+    ``publish`` only appends the signature to a bounded in-process buffer. A
+    daemon thread takes the buffered signatures in batches of up to
+    ``batch_size`` and publishes each batch over one producer taken from the
+    app's pool. When the buffer is full the ``overflow`` policy applies:
+    block the caller for a while, fail fast, or spill to a Redis stream that
+    the publisher threads of every process drain once they are idle.
+
+    Batches that cannot reach the broker are spilled as well when Redis is
+    available, and the buffer is flushed when the process exits.
+    """
+
+    def __init__(
+        self,
+        app=celery_app,
+        redis_client=redis_client_ins,
+        enabled=settings.PUBLISHER_ENABLED,
+        buffer_size=settings.PUBLISHER_BUFFER_SIZE,
+        batch_size=settings.PUBLISHER_BATCH_SIZE,
+        overflow=settings.PUBLISHER_OVERFLOW,
+        block_timeout=settings.PUBLISHER_BLOCK_TIMEOUT,
+        poll_interval=settings.PUBLISHER_POLL_INTERVAL,
+        shutdown_timeout=settings.PUBLISHER_SHUTDOWN_TIMEOUT,
+    ):
+        if overflow not in (OVERFLOW_BLOCK, OVERFLOW_FAIL, OVERFLOW_SPILL):
+            raise ValueError(f"Unknown publisher overflow policy {overflow!r}.")
+
+        self.app = app
+        self.redis_client = redis_client
+        self.enabled = enabled
+        self.buffer_size = buffer_size
+        self.batch_size = batch_size
+        self.overflow = overflow
+        self.block_timeout = block_timeout
+        self.poll_interval = poll_interval
+        self.shutdown_timeout = shutdown_timeout
+
+        self._reset()
+        os.register_at_fork(after_in_child=self._reset)
+        atexit.register(self.close)
+
+    def _reset(self):
+        # A forked worker must not publish the parent's buffered tasks again
+        self._buffer = Queue(maxsize=self.buffer_size)
+        self._thread = None
+        self._lock = Lock()
+        self._stopping = Event()
+
+    @property
+    def may_block(self):
+        """True if ``publish`` can wait, for room in the buffer or for the broker; async callers run it in a thread then."""
+        return not self.enabled or self.overflow == OVERFLOW_BLOCK
+
+    def start(self):
+        """Starts the background thread of this process, or a new one if it died."""
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = Thread(target=self._run, name="task-publisher", daemon=True)
+                self._thread.start()
+
+    def publish(self, task_signature):
+        """
+        Queues a task for publishing.
+
+        Args:
+            task_signature (Signature): The task (or canvas) to publish, e.g. ``send_otp_task.s(phone, otp)``.
+
+        Raises:
+            PublisherFull: If the buffer is full and the overflow policy could not take the task.
+        """
+        if not self.enabled:
+            task_signature.apply_async()
+            return
+
+        if self._thread is None or not self._thread.is_alive():
+            self.start()
+        try:
+            self._buffer.put_nowait(task_signature)
+            return
+        except Full:
+            metrics.increment("publisher_overflow")
+
+        if self.overflow == OVERFLOW_BLOCK:
+            try:
+                self._buffer.put(task_signature, timeout=self.block_timeout)
+                return
+            except Full:
+                raise PublisherFull()
+
+        if self.overflow == OVERFLOW_SPILL and self.spill([task_signature]):
+            return
+        raise PublisherFull()
+
+    def spill(self, signatures):
+        """
+        Appends signatures to the Redis spill stream.
+
+        Returns:
+            bool: False if Redis is unreachable.
+        """
+        try:
+            self.redis_client.spill_tasks([json.dumps(task_signature) for task_signature in signatures])
+        except RedisError:
+            # TODO: Logging
+            return False
+        metrics.increment("publisher_spilled", len(signatures))
+        return True
+
+    def next_batch(self, timeout):
+        """Waits up to ``timeout`` seconds for a buffered signature and returns it with the ones queued behind it."""
+        try:
+            batch = [self._buffer.get(timeout=timeout)]
+        except Empty:
+            return []
+        while len(batch) < self.batch_size:
+            try:
+                batch.append(self._buffer.get_nowait())
+            except Empty:
+                break
+        return batch
+
+    def send(self, batch):
+        """
+        Publishes a batch over one pooled producer.
+
+        Whatever could not be published is spilled to Redis, or dropped
+        when that fails too.
+
+        Returns:
+            bool: True if the whole batch was published.
+        """
+        published = 0
+        try:
+            with metrics.timer("celery_publish_batch"), self.app.producer_or_acquire() as producer:
+                for task_signature in batch:
+                    task_signature.apply_async(producer=producer)
+                    published += 1
+        except (KombuError, OSError):
+            # TODO: Logging
+            if not self.spill(batch[published:]):
+                metrics.increment("publisher_dropped", len(batch) - published)
+        metrics.increment("publisher_published", published)
+        return published == len(batch)
+
+    def drain_spilled(self):
+        """Publishes a batch of spilled signatures, if there are any."""
+        try:
+            messages = self.redis_client.claim_spilled_tasks(self.batch_size)
+        except RedisError:
+            # TODO: Logging
+            return
+        if messages:
+            self.send([signature(json.loads(message), app=self.app) for message in messages])
+
+    def _run(self):
+        next_drain = monotonic()
+        while not self._stopping.is_set():
+            try:
+                batch = self.next_batch(self.poll_interval)
+                if batch and not self.send(batch):
+                    sleep(PUBLISH_RETRY_DELAY)
+                elif not batch and monotonic() >= next_drain:
+                    self.drain_spilled()
+                    next_drain = monotonic() + self.poll_interval
+            except Exception:
+                # The thread must outlive unexpected errors, or the buffer fills up for good
+                logger.exception("Task publisher failed, retrying in %s seconds.", PUBLISH_RETRY_DELAY)
+                sleep(PUBLISH_RETRY_DELAY)
+
+    def close(self):
+        """Stops the background thread and publishes what is still buffered, within ``shutdown_timeout`` seconds."""
+        self._stopping.set()
+        if self._thread is not None:
+            self._thread.join(self.shutdown_timeout)
+
+        deadline = monotonic() + self.shutdown_timeout
+        while monotonic() < deadline:
+            batch = self.next_batch(0)
+            if not batch:
+                break
+            self.send(batch)
+
+
+task_publisher = TaskPublisher()
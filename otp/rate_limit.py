@@ -0,0 +1,49 @@
+from math import ceil
+
+from django.conf import settings
+
+from utils.redis_client import phone_key
+
+
+def send_otp_limits(phone_number, subject=None):
+    """
+    Builds the token buckets that guard sending an OTP.
+
+    Args:
+        phone_number (str): The recipient phone number.
+        subject (str, optional): The caller identity from the JWT.
+
+    Returns:
+        list: ``(key, capacity, period_seconds)`` tuples for ``Redis.consume_rate_limits``.
+    """
+    limits = [(
+        phone_key("otp_phone", phone_number),
+        settings.OTP_RATE_LIMIT_PHONE_CAPACITY,
+        settings.OTP_RATE_LIMIT_PHONE_PERIOD,
+    )]
+    if subject is not None:
+        limits.append((
+            f"otp_subject:{subject}",
+            settings.OTP_RATE_LIMIT_SUBJECT_CAPACITY,
+            settings.OTP_RATE_LIMIT_SUBJECT_PERIOD,
+        ))
+    return limits
+
+
+def get_subject(request):
+    """
+    Returns the caller identity stored on the request by ``TokenValidationMiddleware``.
+
+    Args:
+        request (HttpRequest): The incoming HTTP request.
+
+    Returns:
+        str or None: The subject claim, if present.
+    """
+    payload = getattr(request, "token_payload", None) or {}
+    return payload.get(settings.JWT_SUBJECT_CLAIM)
+
+
+def retry_after_seconds(retry_after_ms):
+    """Converts the limiter's wait in milliseconds to a ``Retry-After`` value."""
+    return max(1, ceil(retry_after_ms / 1000))
@@ -0,0 +1,136 @@
+import hashlib
+import os
+from functools import lru_cache
+from pathlib import Path
+
+from django.conf import settings
+
+# Schema formats: file name and content type of each
+SCHEMA_FORMATS = {
+    "json": ("openapi.json", "application/json"),
+    "yaml": ("openapi.yaml", "application/yaml"),
+}
+# File holding the fingerprint of the code the schema files were generated from
+FINGERPRINT_FILE = "openapi.fingerprint"
+
+# Packages whose code shapes the schema
+SCHEMA_SOURCE_PACKAGES = ("notification_service", "notifications", "otp", "utils")
+
+# In-process copies of the schema, format -> (body, ETag)
+_schemas = {}
+
+
+def get_schema_info():
+    """Returns the ``openapi.Info`` of the API. drf_yasg is imported here, only when a schema is built."""
+    from drf_yasg import openapi
+
+    return openapi.Info(
+        title="Tehran Payment - Code Challenge - Notification Service",
+        default_version='v1',
+        description="API documentation for 'Tehran Payment - Code Challenge - Notification Service' - Prepared By Reza Aghamohammadi",
+        contact=openapi.Contact(email="hacknitive@gmail.com"),
+        license=openapi.License(name="MIT License"),
+    )
+
+
+@lru_cache(maxsize=None)
+def get_schema_view():
+    """Returns the drf_yasg ``SchemaView`` class, built on first use."""
+    from drf_yasg.views import get_schema_view as build_schema_view
+    from rest_framework import permissions
+
+    return build_schema_view(
+        get_schema_info(),
+        public=True,
+        permission_classes=(permissions.AllowAny,),
+    )
+
+
+def generate_schema():
+    """
+    Walks the views and serializers and encodes the OpenAPI schema.
+
+    Returns:
+        dict: Format -> encoded schema (bytes).
+    """
+    from drf_yasg.codecs import OpenAPICodecJson, OpenAPICodecYaml
+    from drf_yasg.generators import OpenAPISchemaGenerator
+
+    schema = OpenAPISchemaGenerator(get_schema_info()).get_schema(request=None, public=True)
+    return {
+        "json": OpenAPICodecJson(validators=[]).encode(schema),
+        "yaml": OpenAPICodecYaml(validators=[]).encode(schema),
+    }
+
+
+def code_fingerprint():
+    """
+    Hashes the source files the schema is generated from.
+
+    Returns:
+        str: Hex digest over the paths and contents of the ``.py`` files and the drf_yasg version.
+    """
+    import drf_yasg
+
+    digest = hashlib.sha256(drf_yasg.__version__.encode("utf-8"))
+    base_dir = Path(settings.BASE_DIR)
+    for package in SCHEMA_SOURCE_PACKAGES:
+        for path in sorted((base_dir / package).rglob("*.py")):
+            digest.update(str(path.relative_to(base_dir)).encode("utf-8"))
+            digest.update(path.read_bytes())
+    return digest.hexdigest()
+
+
+def schema_etag(body):
+    """Returns the strong ETag of an encoded schema."""
+    return f'"{hashlib.sha256(body).hexdigest()[:32]}"'
+
+
+def write_schema_files(directory, schemas, fingerprint):
+    """
+    Saves the encoded schemas and the code fingerprint they were generated from.
+
+    Args:
+        directory (str): The output directory, created if missing.
+        schemas (dict): Format -> encoded schema, as returned by ``generate_schema``.
+        fingerprint (str): The ``code_fingerprint`` of the code.
+    """
+    os.makedirs(directory, exist_ok=True)
+    for schema_format, body in schemas.items():
+        with open(os.path.join(directory, SCHEMA_FORMATS[schema_format][0]), "wb") as schema_file:
+            schema_file.write(body)
+    with open(os.path.join(directory, FINGERPRINT_FILE), "w") as fingerprint_file:
+        fingerprint_file.write(fingerprint)
+
+
+def read_fingerprint(directory):
+    """Returns the fingerprint saved next to the schema files, None if there is none."""
+    try:
+        with open(os.path.join(directory, FINGERPRINT_FILE)) as fingerprint_file:
+            return fingerprint_file.read().strip()
+    except FileNotFoundError:
+        return None
+
+
+def get_schema(schema_format):
+    """
+    Returns an encoded schema and its ETag, loaded once per process.
+
+    The schema is read from the files written by ``manage.py generate_schema``
+    in ``OPENAPI_SCHEMA_DIR``; without them it is generated on the first call.
+
+    Args:
+        schema_format (str): ``json`` or ``yaml``.
+
+    Returns:
+        tuple: The encoded schema (bytes) and its ETag.
+    """
+    if schema_format not in _schemas:
+        path = os.path.join(settings.OPENAPI_SCHEMA_DIR, SCHEMA_FORMATS[schema_format][0])
+        try:
+            with open(path, "rb") as schema_file:
+                body = schema_file.read()
+        except FileNotFoundError:
+            body = generate_schema()[schema_format]
+        _schemas[schema_format] = (body, schema_etag(body))
+    return _schemas[schema_format]
@@ -1,5 +1,6 @@
 import re
 
+from django.conf import settings
 from django.core.validators import RegexValidator
 from rest_framework import serializers
 
@@ -33,6 +34,22 @@ class SendOTPSerializer(PhoneNumberSerializer):
     pass
 
 
+class BulkSendOTPSerializer(serializers.Serializer):
+    """
+    Serializer for sending OTPs to many phone numbers at once.
+
+    Only the shape of the payload is validated here; each number is validated
+    individually with ``SendOTPSerializer`` so results can be reported per number.
+    """
+
+    phone_numbers = serializers.ListField(
+        child=serializers.CharField(),
+        allow_empty=False,
+        max_length=settings.OTP_BULK_MAX_SIZE,
+        help_text="Phone numbers to send an OTP to.",
+    )
+
+
 class VerifyOTPSerializer(PhoneNumberSerializer):
     """Serializer for verifying OTP for a phone number."""
 
@@ -58,4 +75,31 @@ class VerifyOTPSerializer(PhoneNumberSerializer):
         """
         if not value.isdigit():
             raise serializers.ValidationError("OTP must consist of digits only.")
-        return value
\ No newline at end of file
+        return value
+
+
+class CampaignUploadSerializer(serializers.Serializer):
+    """Serializer for uploading the phone numbers of an OTP campaign."""
+
+    file = serializers.FileField(
+        max_length=255,
+        help_text="CSV (a phone_number column, or numbers in the first column) or JSONL file.",
+    )
+    format = serializers.ChoiceField(
+        choices=["csv", "jsonl"],
+        required=False,
+        help_text="File format, detected from the file extension by default.",
+    )
+
+    def validate_file(self, value):
+        """
+        Checks the upload size.
+
+        Raises:
+            serializers.ValidationError: If the file exceeds ``CAMPAIGN_UPLOAD_MAX_SIZE``.
+        """
+        if value.size > settings.CAMPAIGN_UPLOAD_MAX_SIZE:
+            raise serializers.ValidationError(
+                f"Campaign files are limited to {settings.CAMPAIGN_UPLOAD_MAX_SIZE} bytes."
+            )
+        return value
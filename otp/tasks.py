@@ -1,11 +1,66 @@
+import logging
+
 from celery import shared_task
 from django.conf import settings
-import time
+
+from .campaigns import STATUS_COMPLETED, CampaignLocked, CampaignOverloaded, run_campaign
+from .dispatcher import OTP_CHANNEL, format_otp_message
+from notifications.async_worker import async_task
+from notifications.tasks import asend_notification, flush_notifications_task, send_notification_task
+
+logger = logging.getLogger(__name__)
+
 
 @shared_task
 def send_otp_task(phone_number, otp):
-    # Simulate calling SMS provider API
-    print(f"<<<<<<<<<<<<<<<<<Sending OTP {otp} to phone number {phone_number}>>>>>>>>>>>>>>>>>")
-    # Example: time.sleep to simulate network delay
-    time.sleep(2)
-    # Log or handle success/failure accordingly
\ No newline at end of file
+    """
+    Sends an OTP through the ``sms`` notification channel.
+
+    Runs on the ``sms`` channel queue (see ``CELERY_TASK_ROUTES``) and hands
+    the message to ``send_notification_task`` in-process, which batches it.
+
+    Args:
+        phone_number (str): The recipient phone number.
+        otp (str): The OTP to send.
+    """
+    send_notification_task(OTP_CHANNEL, phone_number, format_otp_message(otp))
+
+
+@async_task(send_otp_task)
+async def asend_otp(phone_number, otp):
+    """Variant of ``send_otp_task`` run by the asyncio worker."""
+    await asend_notification(OTP_CHANNEL, phone_number, format_otp_message(otp))
+
+
+@shared_task
+def flush_sms_batch_task():
+    """Sends every buffered SMS. Kept for flushes scheduled before the channel tasks existed."""
+    flush_notifications_task(OTP_CHANNEL)
+
+
+@shared_task(bind=True, acks_late=True, max_retries=None)
+def run_campaign_task(self, campaign_id):
+    """
+    Processes up to ``CAMPAIGN_CHUNKS_PER_TASK`` chunks of a campaign, then
+    queues itself again until the file is done.
+
+    Short tasks keep a campaign from holding a worker process (or its broker
+    acknowledgement) for hours, and let other campaigns interleave. A task
+    lost with its worker is redelivered; the lock of the dead runner is then
+    still held, so the task retries once it has expired
+    (``CAMPAIGN_LOCK_TTL``) and resumes from the checkpoint. While admission
+    control rejects new sends, the task retries after the wait it asks for.
+
+    Args:
+        campaign_id (str): The campaign, see ``otp.campaigns.create_campaign``.
+    """
+    try:
+        campaign = run_campaign(campaign_id, max_chunks=settings.CAMPAIGN_CHUNKS_PER_TASK)
+    except CampaignLocked as exc:
+        logger.info("%s Retrying in %s seconds.", exc, settings.CAMPAIGN_LOCK_TTL)
+        raise self.retry(exc=exc, countdown=settings.CAMPAIGN_LOCK_TTL)
+    except CampaignOverloaded as exc:
+        logger.info("%s Retrying in %s seconds.", exc, exc.retry_after)
+        raise self.retry(exc=exc, countdown=exc.retry_after)
+    if campaign["status"] != STATUS_COMPLETED:
+        run_campaign_task.delay(campaign_id)
@@ -1,3 +1,538 @@
-from django.test import TestCase
+import os
+import tempfile
+from io import StringIO
+from threading import Event
+from time import sleep
+from unittest import mock
 
-# Create your tests here.
+from celery.exceptions import Retry
+from django.core.management import call_command
+from django.test import AsyncRequestFactory, SimpleTestCase, override_settings
+
+from .admission import otp_admission
+from .campaigns import (
+    STATUS_COMPLETED,
+    STATUS_RUNNING,
+    CampaignLocked,
+    CampaignOverloaded,
+    campaign_progress,
+    create_campaign,
+    get_campaign,
+    run_campaign,
+)
+from .dispatcher import format_otp_message
+from .idempotency import coalescing_key
+from .middleware import TokenValidationMiddleware
+from . import schema
+from .publisher import OVERFLOW_BLOCK, OVERFLOW_FAIL, OVERFLOW_SPILL, PublisherFull, TaskPublisher
+from .rate_limit import send_otp_limits
+from .tasks import run_campaign_task, send_otp_task
+from .views import AsyncSendOTPView, AsyncVerifyOTPView
+from utils import redis_client_ins, token_validation_cache
+from utils.redis_client import campaign_keys
+from utils.testing import FakeRedisMixin
+
+SEND_OTP_URL = "/api/otp/send-otp/"
+VERIFY_OTP_URL = "/api/otp/verify-otp/"
+BULK_SEND_OTP_URL = "/api/otp/bulk-send-otp/"
+
+PHONE_NUMBER = "+989121234567"
+OTHER_PHONE_NUMBER = "+989121234568"
+TOKEN_PAYLOAD = {"type": "access", "sub": "user-1"}
+
+
+class OTPAPITestCase(FakeRedisMixin, SimpleTestCase):
+    """
+    Calls the OTP endpoints through the middleware with an accepted token.
+
+    The token is neither decoded nor sent to the authentication service,
+    admission control admits every send and published tasks are recorded
+    instead of reaching the broker.
+    """
+
+    def setUp(self):
+        super().setUp()
+        for target, attribute, value in (
+            (TokenValidationMiddleware, "parse_token", mock.Mock(return_value=("token", TOKEN_PAYLOAD))),
+            (TokenValidationMiddleware, "check_token", mock.Mock(return_value=True)),
+            (otp_admission, "enabled", False),
+        ):
+            patcher = mock.patch.object(target, attribute, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+        patcher = mock.patch("otp.views.send_otp.task_publisher.publish")
+        self.publish = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def post(self, path, data, **headers):
+        return self.client.post(path, data, content_type="application/json", HTTP_AUTHORIZATION="Bearer token", **headers)
+
+    async def apost(self, view_class, path, data):
+        """Calls an async view directly, as the ASGI middleware would after accepting the token."""
+        request = AsyncRequestFactory().post(path, data, content_type="application/json")
+        request.token_payload = TOKEN_PAYLOAD
+        return await view_class.as_view()(request)
+
+    def stored_otp(self, phone_number=PHONE_NUMBER):
+        otp = redis_client_ins.get_otp(phone_number)
+        return otp.decode("utf-8") if otp is not None else None
+
+
+@override_settings(OTP_MAX_VERIFY_ATTEMPTS=3)
+class VerifyOTPTests(OTPAPITestCase):
+    def verify(self, otp):
+        return self.post(VERIFY_OTP_URL, {"phone_number": PHONE_NUMBER, "otp": otp})
+
+    def test_otp_is_single_use(self):
+        redis_client_ins.set_otp(PHONE_NUMBER, "123456")
+
+        self.assertEqual(self.verify("123456").status_code, 200)
+        response = self.verify("123456")
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()["error"], "OTP has expired or does not exist.")
+
+    def test_mismatch_keeps_the_otp(self):
+        redis_client_ins.set_otp(PHONE_NUMBER, "123456")
+
+        response = self.verify("654321")
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()["error"], "Invalid OTP.")
+        self.assertEqual(self.verify("123456").status_code, 200)
+
+    def test_lockout_after_max_attempts(self):
+        redis_client_ins.set_otp(PHONE_NUMBER, "123456")
+
+        self.assertEqual([self.verify("654321").status_code for _ in range(3)], [400, 400, 429])
+        # The OTP is gone and the number stays locked, even for a new code
+        self.assertIsNone(self.stored_otp())
+        redis_client_ins.set_otp(PHONE_NUMBER, "111111")
+        self.assertEqual(self.verify("111111").status_code, 429)
+
+    def test_success_resets_the_attempts(self):
+        redis_client_ins.set_otp(PHONE_NUMBER, "123456")
+        self.verify("654321")
+        self.verify("654321")
+        self.assertEqual(self.verify("123456").status_code, 200)
+
+        redis_client_ins.set_otp(PHONE_NUMBER, "111111")
+        self.assertEqual([self.verify("654321").status_code for _ in range(2)], [400, 400])
+
+
+@override_settings(OTP_RATE_LIMIT_PHONE_CAPACITY=2, OTP_RATE_LIMIT_SUBJECT_CAPACITY=10)
+class SendOTPTests(OTPAPITestCase):
+    def send(self, phone_number=PHONE_NUMBER, **headers):
+        return self.post(SEND_OTP_URL, {"phone_number": phone_number}, **headers)
+
+    def test_send_stores_and_publishes_the_otp(self):
+        response = self.send()
+
+        self.assertEqual(response.status_code, 200)
+        otp = self.stored_otp()
+        self.publish.assert_called_once_with(send_otp_task.s(PHONE_NUMBER, otp))
+
+    def test_repeated_send_is_coalesced(self):
+        self.send()
+        otp = self.stored_otp()
+
+        response = self.send()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.publish.call_count, 1)
+        self.assertEqual(self.stored_otp(), otp)
+
+    def test_idempotency_key_scopes_the_dedupe(self):
+        self.send(HTTP_IDEMPOTENCY_KEY="first")
+        self.send(HTTP_IDEMPOTENCY_KEY="first")
+        self.assertEqual(self.publish.call_count, 1)
+
+        self.send(HTTP_IDEMPOTENCY_KEY="second")
+        self.assertEqual(self.publish.call_count, 2)
+
+    @override_settings(OTP_IDEMPOTENCY_WINDOW=0)
+    def test_per_number_rate_limit(self):
+        self.assertEqual([self.send().status_code for _ in range(2)], [200, 200])
+
+        response = self.send()
+        self.assertEqual(response.status_code, 429)
+        self.assertGreaterEqual(int(response["Retry-After"]), 1)
+        self.assertEqual(self.publish.call_count, 2)
+        # Other numbers have buckets of their own
+        self.assertEqual(self.send(OTHER_PHONE_NUMBER).status_code, 200)
+
+    @override_settings(OTP_IDEMPOTENCY_WINDOW=0, OTP_RATE_LIMIT_SUBJECT_CAPACITY=1)
+    def test_per_caller_rate_limit(self):
+        self.assertEqual(self.send().status_code, 200)
+        self.assertEqual(self.send(OTHER_PHONE_NUMBER).status_code, 429)
+        self.assertIsNone(self.stored_otp(OTHER_PHONE_NUMBER))
+
+    def test_admission_rejects_new_sends_only(self):
+        self.send()
+        otp = self.stored_otp()
+
+        with mock.patch.object(otp_admission, "retry_after", return_value=42):
+            duplicate = self.send()
+            new = self.send(OTHER_PHONE_NUMBER)
+
+        self.assertEqual(duplicate.status_code, 200)
+        self.assertEqual(self.stored_otp(), otp)
+        self.assertEqual(new.status_code, 503)
+        self.assertEqual(new["Retry-After"], "42")
+        self.assertIsNone(self.stored_otp(OTHER_PHONE_NUMBER))
+        self.assertEqual(self.publish.call_count, 1)
+
+    def test_publisher_full_deletes_the_otp(self):
+        self.publish.side_effect = PublisherFull()
+
+        response = self.send()
+        self.assertEqual(response.status_code, 503)
+        self.assertIn("Retry-After", response)
+        self.assertIsNone(self.stored_otp())
+        # Without a live OTP the retry is a new send, not a duplicate
+        self.publish.side_effect = None
+        self.assertEqual(self.send().status_code, 200)
+        self.assertEqual(self.publish.call_count, 2)
+
+
+class AsyncViewTests(OTPAPITestCase):
+    async def test_send_stores_and_publishes_the_otp(self):
+        response = await self.apost(AsyncSendOTPView, SEND_OTP_URL, {"phone_number": PHONE_NUMBER})
+
+        self.assertEqual(response.status_code, 200)
+        otp = self.stored_otp()
+        self.publish.assert_called_once_with(send_otp_task.s(PHONE_NUMBER, otp))
+
+    async def test_repeated_send_is_coalesced(self):
+        data = {"phone_number": PHONE_NUMBER}
+        responses = [await self.apost(AsyncSendOTPView, SEND_OTP_URL, data) for _ in range(2)]
+
+        self.assertEqual([response.status_code for response in responses], [200, 200])
+        self.assertEqual(self.publish.call_count, 1)
+
+    async def test_verify_consumes_the_otp(self):
+        redis_client_ins.set_otp(PHONE_NUMBER, "123456")
+        data = {"phone_number": PHONE_NUMBER, "otp": "123456"}
+
+        self.assertEqual((await self.apost(AsyncVerifyOTPView, VERIFY_OTP_URL, data)).status_code, 200)
+        self.assertEqual((await self.apost(AsyncVerifyOTPView, VERIFY_OTP_URL, data)).status_code, 400)
+
+
+@override_settings(OTP_RATE_LIMIT_PHONE_CAPACITY=2, OTP_RATE_LIMIT_SUBJECT_CAPACITY=10)
+class BulkSendOTPTests(OTPAPITestCase):
+    def send(self, phone_numbers, **headers):
+        return self.post(BULK_SEND_OTP_URL, {"phone_numbers": phone_numbers}, **headers)
+
+    def published_messages(self):
+        return [
+            message
+            for (task_group,), _ in self.publish.call_args_list
+            for task in task_group.tasks
+            for message in task.args[1]
+        ]
+
+    def test_results_per_number(self):
+        response = self.send([PHONE_NUMBER, "12345", PHONE_NUMBER, OTHER_PHONE_NUMBER])
+
+        self.assertEqual(response.status_code, 200)
+        results = response.json()["data"]["results"]
+        self.assertEqual([result["status"] for result in results], ["queued", "invalid", "duplicate", "queued"])
+        self.assertEqual(self.published_messages(), [
+            (PHONE_NUMBER, format_otp_message(self.stored_otp())),
+            (OTHER_PHONE_NUMBER, format_otp_message(self.stored_otp(OTHER_PHONE_NUMBER))),
+        ])
+
+    def test_retried_request_sends_new_numbers_only(self):
+        self.send([PHONE_NUMBER])
+        response = self.send([PHONE_NUMBER, OTHER_PHONE_NUMBER])
+
+        self.assertEqual([result["status"] for result in response.json()["data"]["results"]], ["queued", "queued"])
+        self.assertEqual([recipient for recipient, _ in self.published_messages()], [PHONE_NUMBER, OTHER_PHONE_NUMBER])
+
+    @override_settings(OTP_IDEMPOTENCY_WINDOW=0)
+    def test_rate_limited_numbers(self):
+        self.send([PHONE_NUMBER, OTHER_PHONE_NUMBER])
+        self.send([PHONE_NUMBER])
+
+        response = self.send([PHONE_NUMBER, OTHER_PHONE_NUMBER])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [result["status"] for result in response.json()["data"]["results"]],
+            ["rate_limited", "queued"],
+        )
+
+        response = self.send([PHONE_NUMBER, OTHER_PHONE_NUMBER])
+        self.assertEqual(response.status_code, 429)
+        self.assertIn("Retry-After", response)
+
+    def test_publisher_full_deletes_the_otps(self):
+        self.publish.side_effect = PublisherFull()
+
+        response = self.send([PHONE_NUMBER, OTHER_PHONE_NUMBER])
+        self.assertEqual(response.status_code, 503)
+        self.assertIsNone(self.stored_otp())
+        self.assertIsNone(self.stored_otp(OTHER_PHONE_NUMBER))
+
+    def test_no_valid_numbers(self):
+        response = self.send(["12345"])
+        self.assertEqual(response.status_code, 400)
+        self.publish.assert_not_called()
+
+
+class TokenValidationCacheTests(FakeRedisMixin, SimpleTestCase):
+    """The middleware asks the authentication service once per token, then the cache tiers answer."""
+
+    def setUp(self):
+        super().setUp()
+        token_validation_cache.local_cache.clear()
+        self.addCleanup(token_validation_cache.local_cache.clear)
+        self.middleware = TokenValidationMiddleware(lambda request: None)
+        patcher = mock.patch.object(self.middleware, "validate_token_with_service")
+        self.validate = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def answer(self, status_code, is_valid):
+        self.validate.return_value = mock.Mock(
+            status_code=status_code,
+            json=mock.Mock(return_value={"data": {"is_valid": is_valid}}),
+        )
+
+    def test_valid_token_is_cached_in_both_tiers(self):
+        self.answer(200, True)
+        payload = {"jti": "token-1", "type": "access"}
+
+        self.assertTrue(self.middleware.check_token("token", payload))
+        self.assertTrue(self.middleware.check_token("token", payload))
+        token_validation_cache.local_cache.clear()
+        self.assertTrue(self.middleware.check_token("token", payload))
+        self.assertEqual(self.validate.call_count, 1)
+
+    def test_server_errors_are_not_cached(self):
+        self.answer(503, False)
+        payload = {"jti": "token-2", "type": "access"}
+
+        self.assertFalse(self.middleware.check_token("token", payload))
+        self.answer(200, True)
+        self.assertTrue(self.middleware.check_token("token", payload))
+        self.assertEqual(self.validate.call_count, 2)
+
+
+class TaskPublisherTests(FakeRedisMixin, SimpleTestCase):
+    """The buffer is not drained by a background thread, so overflows are deterministic."""
+
+    def make_publisher(self, overflow, **options):
+        publisher = TaskPublisher(buffer_size=1, overflow=overflow, enabled=True, **options)
+        patcher = mock.patch.object(publisher, "start")
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        return publisher
+
+    def test_fail_overflow(self):
+        publisher = self.make_publisher(OVERFLOW_FAIL)
+        publisher.publish(send_otp_task.s(PHONE_NUMBER, "123456"))
+
+        with self.assertRaises(PublisherFull):
+            publisher.publish(send_otp_task.s(OTHER_PHONE_NUMBER, "123456"))
+        self.assertEqual(publisher.next_batch(0), [send_otp_task.s(PHONE_NUMBER, "123456")])
+
+    def test_block_overflow_waits_for_room(self):
+        publisher = self.make_publisher(OVERFLOW_BLOCK, block_timeout=0.01)
+        publisher.publish(send_otp_task.s(PHONE_NUMBER, "123456"))
+
+        with self.assertRaises(PublisherFull):
+            publisher.publish(send_otp_task.s(OTHER_PHONE_NUMBER, "123456"))
+        publisher.next_batch(0)
+        publisher.publish(send_otp_task.s(OTHER_PHONE_NUMBER, "123456"))
+        self.assertEqual(publisher.next_batch(0), [send_otp_task.s(OTHER_PHONE_NUMBER, "123456")])
+
+    def test_spill_overflow_is_drained_later(self):
+        publisher = self.make_publisher(OVERFLOW_SPILL)
+        publisher.publish(send_otp_task.s(PHONE_NUMBER, "123456"))
+        publisher.publish(send_otp_task.s(OTHER_PHONE_NUMBER, "123456"))
+
+        with mock.patch.object(publisher, "send") as send:
+            publisher.drain_spilled()
+            publisher.drain_spilled()
+        (batch,), _ = send.call_args
+        self.assertEqual(send.call_count, 1)
+        self.assertEqual(
+            [(spilled["task"], list(spilled["args"])) for spilled in batch],
+            [(send_otp_task.name, [OTHER_PHONE_NUMBER, "123456"])],
+        )
+
+    def test_unpublished_batch_is_spilled(self):
+        publisher = self.make_publisher(OVERFLOW_FAIL)
+        app = mock.Mock()
+        app.producer_or_acquire.side_effect = OSError("Broker unreachable.")
+        publisher.app = app
+
+        self.assertFalse(publisher.send([send_otp_task.s(PHONE_NUMBER, "123456")]))
+        self.assertEqual(len(redis_client_ins.claim_spilled_tasks(10)), 1)
+
+    def test_thread_survives_unexpected_errors(self):
+        publisher = TaskPublisher(buffer_size=10, overflow=OVERFLOW_FAIL, enabled=True, poll_interval=0.01)
+        self.addCleanup(publisher.close)
+        sent = Event()
+
+        def send(batch):
+            if not sent.is_set():
+                sent.set()
+                raise TypeError("Unexpected.")
+            sent.clear()
+            return True
+
+        with mock.patch.object(publisher, "send", side_effect=send), mock.patch("otp.publisher.sleep"), \
+                self.assertLogs("otp.publisher", "ERROR"):
+            publisher.publish(send_otp_task.s(PHONE_NUMBER, "123456"))
+            self.assertTrue(sent.wait(1))
+            publisher.publish(send_otp_task.s(OTHER_PHONE_NUMBER, "123456"))
+            for _ in range(100):
+                if not sent.is_set():
+                    break
+                sleep(0.01)
+            self.assertFalse(sent.is_set())
+            self.assertTrue(publisher._thread.is_alive())
+
+
+class OpenAPISchemaTests(SimpleTestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        schemas = {"json": b'{"swagger": "2.0"}', "yaml": b"swagger: '2.0'\n"}
+        schema.write_schema_files(directory.name, schemas, "fingerprint")
+        settings_override = override_settings(OPENAPI_SCHEMA_DIR=directory.name)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        # Drop the in-process copies loaded by other tests
+        patcher = mock.patch.dict(schema._schemas, clear=True)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_serves_the_precomputed_schema(self):
+        response = self.client.get("/swagger.json")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.content, b'{"swagger": "2.0"}')
+        self.assertEqual(response["Content-Type"], "application/json")
+        self.assertIn("max-age", response["Cache-Control"])
+
+    def test_current_copies_are_revalidated(self):
+        etag = self.client.get("/swagger.yaml")["ETag"]
+
+        response = self.client.get("/swagger.yaml", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b"")
+        self.assertEqual(self.client.get("/swagger.yaml", HTTP_IF_NONE_MATCH='"stale"').status_code, 200)
+
+
+@override_settings(CAMPAIGN_LOCK_TTL=300, OTP_RATE_LIMIT_PHONE_CAPACITY=2)
+class CampaignTests(FakeRedisMixin, SimpleTestCase):
+    PHONE_NUMBERS = [f"+98912000000{index}" for index in range(5)]
+
+    def setUp(self):
+        super().setUp()
+        campaign_file = tempfile.NamedTemporaryFile("w", suffix=".csv", delete=False)
+        with campaign_file:
+            campaign_file.write("name,phone_number\n")
+            for index, phone_number in enumerate(self.PHONE_NUMBERS):
+                campaign_file.write(f"user {index},{phone_number}\n")
+            campaign_file.write("someone,12345\n")
+            campaign_file.write(f"again,{self.PHONE_NUMBERS[0]}\n")
+        self.addCleanup(os.remove, campaign_file.name)
+        self.path = campaign_file.name
+        self.campaign_id = create_campaign(self.path)
+
+        patcher = mock.patch.object(otp_admission, "enabled", False)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        patcher = mock.patch("otp.campaigns.notify_bulk")
+        self.notify_bulk = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def sent_numbers(self):
+        return [recipient for (_, messages), _ in self.notify_bulk.call_args_list for recipient, _ in messages]
+
+    def progress(self):
+        progress = campaign_progress(self.campaign_id, get_campaign(self.campaign_id))
+        return [progress[counter] for counter in ("rows", "queued", "invalid", "duplicate", "rate_limited")]
+
+    def test_run_to_completion(self):
+        campaign = run_campaign(self.campaign_id, chunk_size=3)
+
+        self.assertEqual(campaign["status"], STATUS_COMPLETED)
+        self.assertEqual(self.progress(), [7, 5, 1, 1, 0])
+        self.assertEqual(self.sent_numbers(), self.PHONE_NUMBERS)
+        self.assertIsNotNone(redis_client_ins.get_otp(self.PHONE_NUMBERS[-1]))
+
+    def test_recent_sends_are_coalesced(self):
+        # A code the user may be about to verify, sent through the API
+        phone_number = self.PHONE_NUMBERS[1]
+        redis_client_ins.send_otp(
+            phone_number=phone_number, otp_code="111111", dedupe_key=coalescing_key(phone_number), window=60,
+        )
+
+        run_campaign(self.campaign_id, chunk_size=3)
+
+        self.assertEqual(self.progress(), [7, 4, 1, 2, 0])
+        self.assertNotIn(phone_number, self.sent_numbers())
+        self.assertEqual(redis_client_ins.get_otp(phone_number), b"111111")
+
+    @override_settings(OTP_IDEMPOTENCY_WINDOW=0)
+    def test_per_number_rate_limit(self):
+        phone_number = self.PHONE_NUMBERS[2]
+        redis_client_ins.consume_rate_limits_many([send_otp_limits(phone_number)] * 2)
+
+        run_campaign(self.campaign_id, chunk_size=3)
+
+        self.assertEqual(self.progress(), [7, 4, 1, 1, 1])
+        self.assertNotIn(phone_number, self.sent_numbers())
+        self.assertIsNone(redis_client_ins.get_otp(phone_number))
+
+    def test_overloaded_campaign_pauses(self):
+        run_campaign(self.campaign_id, chunk_size=2, max_chunks=1)
+
+        with mock.patch.object(otp_admission, "retry_after", return_value=30):
+            with self.assertRaises(CampaignOverloaded):
+                run_campaign(self.campaign_id, chunk_size=2)
+            with mock.patch.object(run_campaign_task, "retry", side_effect=Retry()) as retry, \
+                    self.assertRaises(Retry), self.assertLogs("otp.tasks", "INFO"):
+                run_campaign_task(self.campaign_id)
+        self.assertEqual(retry.call_args.kwargs["countdown"], 30)
+        self.assertEqual(get_campaign(self.campaign_id)["status"], STATUS_RUNNING)
+        self.assertEqual(self.sent_numbers(), self.PHONE_NUMBERS[:2])
+
+        run_campaign(self.campaign_id, chunk_size=2)
+        self.assertEqual(get_campaign(self.campaign_id)["status"], STATUS_COMPLETED)
+        self.assertEqual(self.sent_numbers(), self.PHONE_NUMBERS)
+
+    def test_command_waits_while_overloaded(self):
+        stdout = StringIO()
+        with mock.patch.object(otp_admission, "retry_after", side_effect=[30, 0, 0, 0]), \
+                mock.patch("otp.management.commands.run_campaign.sleep") as sleep:
+            call_command("run_campaign", self.path, chunk_size=3, stdout=stdout)
+
+        sleep.assert_called_once_with(30)
+        self.assertIn("Resuming in 30 seconds.", stdout.getvalue())
+        self.assertIn("completed: 7 rows, 5 queued, 1 invalid, 1 duplicates, 0 rate limited", stdout.getvalue())
+
+    def test_locked_campaign_resumes_from_its_checkpoint(self):
+        run_campaign(self.campaign_id, chunk_size=2, max_chunks=1)
+        self.assertEqual(get_campaign(self.campaign_id)["status"], STATUS_RUNNING)
+
+        # A runner that died without releasing the lock
+        _, _, lock_key = campaign_keys(self.campaign_id)
+        redis_client_ins.set(lock_key, "dead-runner", ex=300)
+        with self.assertRaises(CampaignLocked):
+            run_campaign(self.campaign_id, chunk_size=2)
+
+        # The task is retried once the lock has expired, and resumes
+        with mock.patch.object(run_campaign_task, "retry", side_effect=Retry()) as retry, \
+                self.assertRaises(Retry), self.assertLogs("otp.tasks", "INFO"):
+            run_campaign_task(self.campaign_id)
+        self.assertEqual(retry.call_args.kwargs["countdown"], 300)
+
+        redis_client_ins.delete(lock_key)
+        with mock.patch.object(run_campaign_task, "delay") as delay:
+            run_campaign_task(self.campaign_id)
+        delay.assert_not_called()
+
+        self.assertEqual(get_campaign(self.campaign_id)["status"], STATUS_COMPLETED)
+        self.assertEqual(self.sent_numbers(), self.PHONE_NUMBERS)
@@ -1,9 +1,26 @@
 # otp/urls.py
 
+from django.conf import settings
 from django.urls import path
-from .views import SendOTPView, VerifyOTPView
+from .views import (
+    SendOTPView,
+    VerifyOTPView,
+    AsyncSendOTPView,
+    AsyncVerifyOTPView,
+    BulkSendOTPView,
+    CampaignUploadView,
+    CampaignProgressView,
+)
+
+if settings.OTP_ASYNC_VIEWS:
+    send_otp_view, verify_otp_view = AsyncSendOTPView, AsyncVerifyOTPView
+else:
+    send_otp_view, verify_otp_view = SendOTPView, VerifyOTPView
 
 urlpatterns = [
-    path('send-otp/', SendOTPView.as_view(), name='send-otp'),
-    path('verify-otp/', VerifyOTPView.as_view(), name='verify-otp'),
+    path('send-otp/', send_otp_view.as_view(), name='send-otp'),
+    path('verify-otp/', verify_otp_view.as_view(), name='verify-otp'),
+    path('bulk-send-otp/', BulkSendOTPView.as_view(), name='bulk-send-otp'),
+    path('campaigns/', CampaignUploadView.as_view(), name='campaign-upload'),
+    path('campaigns/<slug:campaign_id>/', CampaignProgressView.as_view(), name='campaign-progress'),
 ]
\ No newline at end of file
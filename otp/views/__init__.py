@@ -1,2 +1,6 @@
-from .send_otp import SendOTPView
-from .verify_otp import VerifyOTPView
\ No newline at end of file
+from .send_otp import SendOTPView, AsyncSendOTPView
+from .verify_otp import VerifyOTPView, AsyncVerifyOTPView
+from .bulk_send_otp import BulkSendOTPView
+from .campaign import CampaignUploadView, CampaignProgressView
+from .metrics import MetricsView
+from .schema import OpenAPISchemaView, schema_ui_view
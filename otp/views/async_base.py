@@ -0,0 +1,44 @@
+import json
+
+from django.http import JsonResponse
+from django.utils.decorators import method_decorator
+from django.views import View
+from django.views.decorators.csrf import csrf_exempt
+from rest_framework import status
+
+STATUS_CODE_BAD_REQUEST = status.HTTP_400_BAD_REQUEST
+MESSAGE_JSON_PARSE_ERROR = "JSON parse error."
+
+
+@method_decorator(csrf_exempt, name="dispatch")
+class AsyncAPIView(View):
+    """
+    Base class for async-native JSON views.
+
+    DRF views are synchronous, so under ASGI they run through a thread adapter.
+    Subclasses of this view run directly on the event loop and reuse the DRF
+    serializers only for (CPU-bound) input validation.
+    """
+
+    serializer_class = None
+    http_method_names = ["post", "options"]
+
+    def get_validated_data(self, request):
+        """
+        Parses the JSON body and validates it with ``serializer_class``.
+
+        Args:
+            request (HttpRequest): The incoming HTTP request.
+
+        Returns:
+            tuple: ``(validated_data, None)`` on success, ``(None, JsonResponse)`` on failure.
+        """
+        try:
+            data = json.loads(request.body or b"{}")
+        except ValueError:
+            return None, JsonResponse({"detail": MESSAGE_JSON_PARSE_ERROR}, status=STATUS_CODE_BAD_REQUEST)
+
+        serializer = self.serializer_class(data=data)
+        if not serializer.is_valid():
+            return None, JsonResponse(serializer.errors, status=STATUS_CODE_BAD_REQUEST)
+        return serializer.validated_data, None
@@ -0,0 +1,216 @@
+from rest_framework import generics, status
+from rest_framework.exceptions import ValidationError
+from rest_framework.response import Response
+
+from .send_otp import (
+    RATE_LIMITED_RESPONSE_DATA,
+    overloaded_response,
+    publisher_full_response,
+    send_otp_arguments,
+)
+from ..admission import otp_admission
+from ..dispatcher import OTP_CHANNEL, format_otp_message, generate_otp
+from ..publisher import PublisherFull, task_publisher
+from ..rate_limit import retry_after_seconds
+from ..serializers import BulkSendOTPSerializer, SendOTPSerializer
+from notifications.tasks import notify_bulk
+from utils import redis_client_ins, metrics
+from utils.redis_client import OTP_SEND_CREATED, OTP_SEND_RATE_LIMITED, OTP_SEND_REJECTED
+
+# Per-number result statuses
+RESULT_QUEUED = "queued"
+RESULT_INVALID = "invalid"
+RESULT_DUPLICATE = "duplicate"
+RESULT_RATE_LIMITED = "rate_limited"
+
+STATUS_CODE_SUCCESS = status.HTTP_200_OK
+STATUS_CODE_BAD_REQUEST = status.HTTP_400_BAD_REQUEST
+STATUS_CODE_TOO_MANY_REQUESTS = status.HTTP_429_TOO_MANY_REQUESTS
+
+MESSAGE_BULK_PROCESSED = "OTPs processed."
+MESSAGE_OPERATION_FAILED = "Operation failed."
+MESSAGE_NO_VALID_NUMBERS = "No valid phone numbers."
+
+
+class BulkSendOTPView(generics.GenericAPIView):
+    """
+    API view to send OTPs to many phone numbers with a single request.
+
+    All OTPs are written in one Redis pipeline, each number subject to the
+    per-number and per-caller rate limits of ``SendOTPView``, and the SMS are
+    published as a bulk send of the ``sms`` notification channel: a handful
+    of tasks, each sent with one bulk provider call, instead of one message
+    per number. Numbers over their limit are reported as ``rate_limited``;
+    when every number is, the request is answered with a 429. As with single
+    sends, numbers sent to within ``OTP_IDEMPOTENCY_WINDOW`` (per
+    ``Idempotency-Key`` when one is given) keep their live code and are
+    reported as queued without being sent again. While admission control
+    rejects new sends, a request with any number to send is answered with
+    a 503; one made only of such duplicates still succeeds.
+    """
+
+    serializer_class = BulkSendOTPSerializer
+
+    def post(self, request):
+        """
+        Handles POST requests to send OTPs to a list of phone numbers.
+
+        Args:
+            request (HttpRequest): The incoming HTTP request containing the phone numbers.
+
+        Returns:
+            Response: A JSON response with the outcome for every phone number.
+        """
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        overloaded_retry_after = otp_admission.retry_after()
+        otps, results = self.validate_phone_numbers(serializer.validated_data["phone_numbers"])
+
+        if not otps:
+            return Response(
+                {
+                    "statusCode": STATUS_CODE_BAD_REQUEST,
+                    "message": MESSAGE_OPERATION_FAILED,
+                    "error": MESSAGE_NO_VALID_NUMBERS,
+                    "data": {"results": results},
+                },
+                status=STATUS_CODE_BAD_REQUEST,
+            )
+
+        outcomes = self.store_otps(request, otps, admitted=not overloaded_retry_after)
+        if any(outcome == OTP_SEND_REJECTED for outcome, _ in outcomes.values()):
+            return overloaded_response(overloaded_retry_after)
+
+        created = {}
+        retry_after = None
+        for result in results:
+            if result["status"] != RESULT_QUEUED:
+                continue
+            outcome, value = outcomes[result["phone_number"]]
+            # Duplicates reuse the live OTP, which has already been sent
+            if outcome == OTP_SEND_CREATED:
+                created[result["phone_number"]] = otps[result["phone_number"]]
+            elif outcome == OTP_SEND_RATE_LIMITED:
+                result["status"] = RESULT_RATE_LIMITED
+                result["error"] = RATE_LIMITED_RESPONSE_DATA["error"]
+                retry_after = min(retry_after or value, value)
+
+        if not created and retry_after is not None:
+            return Response(
+                {
+                    "statusCode": STATUS_CODE_TOO_MANY_REQUESTS,
+                    "message": MESSAGE_OPERATION_FAILED,
+                    "error": RATE_LIMITED_RESPONSE_DATA["error"],
+                    "data": {"results": results},
+                },
+                status=STATUS_CODE_TOO_MANY_REQUESTS,
+                headers={"Retry-After": str(retry_after_seconds(retry_after))},
+            )
+
+        if created:
+            try:
+                self.dispatch_send_otp_tasks(created)
+            except PublisherFull:
+                # Without live OTPs the retry is not taken for duplicates
+                redis_client_ins.delete_otps(list(created))
+                return publisher_full_response()
+
+        return Response(
+            {
+                "statusCode": STATUS_CODE_SUCCESS,
+                "message": MESSAGE_BULK_PROCESSED,
+                "error": None,
+                "data": {"results": results},
+            },
+            status=STATUS_CODE_SUCCESS,
+        )
+
+    def validate_phone_numbers(self, phone_numbers):
+        """
+        Validates every phone number with ``SendOTPSerializer`` and generates OTPs for the valid ones.
+
+        Args:
+            phone_numbers (list): The raw phone numbers from the request.
+
+        Returns:
+            tuple: ``{phone_number: otp}`` for valid numbers and the per-number results, in request order.
+        """
+        number_serializer = SendOTPSerializer()
+        otps = {}
+        results = []
+
+        for raw_phone_number in phone_numbers:
+            try:
+                phone_number = number_serializer.run_validation({"phone_number": raw_phone_number})["phone_number"]
+            except ValidationError as exc:
+                results.append({
+                    "phone_number": raw_phone_number,
+                    "status": RESULT_INVALID,
+                    "error": exc.detail["phone_number"][0],
+                })
+                continue
+
+            if phone_number in otps:
+                results.append({"phone_number": phone_number, "status": RESULT_DUPLICATE, "error": None})
+                continue
+
+            otps[phone_number] = generate_otp()
+            results.append({"phone_number": phone_number, "status": RESULT_QUEUED, "error": None})
+
+        return otps, results
+
+    def store_otps(self, request, otps, admitted=True):
+        """
+        Stores the generated OTPs, subject to the rate limits and the dedupe
+        window of ``SendOTPView``, with one pipelined round trip.
+
+        A number whose previous send is still within the window and whose
+        code is still live is a duplicate: its code is kept and not sent
+        again, so a retried bulk request does not resend every code.
+
+        On Redis Cluster the per-caller bucket lives on another shard and is
+        consumed first, with another pipelined round trip.
+
+        Args:
+            request (HttpRequest): The incoming HTTP request.
+            otps (dict): Mapping of phone number to OTP.
+            admitted (bool): Whether admission control lets new OTPs be sent.
+
+        Returns:
+            dict: ``[outcome, value]`` per phone number, as returned by ``Redis.send_otp``.
+        """
+        sends = {}
+        other_slot_limits = {}
+        for phone_number, otp in otps.items():
+            arguments = send_otp_arguments(request, phone_number, otp, admitted)
+            arguments["limits"], other_limits = redis_client_ins.split_limits_by_slot(phone_number, arguments["limits"])
+            sends[phone_number] = arguments
+            if other_limits and admitted:
+                other_slot_limits[phone_number] = other_limits
+
+        outcomes = {}
+        with metrics.timer("redis_send_otps"):
+            if other_slot_limits:
+                waits = redis_client_ins.consume_rate_limits_many(list(other_slot_limits.values()))
+                for phone_number, wait in zip(other_slot_limits, waits):
+                    if wait:
+                        outcomes[phone_number] = [OTP_SEND_RATE_LIMITED, wait]
+                        del sends[phone_number]
+            if sends:
+                outcomes.update(zip(sends, redis_client_ins.send_otps(list(sends.values()))))
+        return outcomes
+
+    def dispatch_send_otp_tasks(self, otps):
+        """
+        Publishes the SMS as a bulk send of the ``sms`` channel, in chunks of ``OTP_BULK_CHUNK_SIZE`` numbers.
+
+        Args:
+            otps (dict): Mapping of phone number to OTP.
+
+        Raises:
+            PublisherFull: If the chunks could not be queued.
+        """
+        messages = [(phone_number, format_otp_message(otp)) for phone_number, otp in otps.items()]
+        with metrics.timer("celery_publish"):
+            task_publisher.publish(notify_bulk(OTP_CHANNEL, messages))
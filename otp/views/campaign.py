@@ -0,0 +1,125 @@
+import os
+import uuid
+
+from django.conf import settings
+from rest_framework import generics, status
+from rest_framework.parsers import MultiPartParser
+from rest_framework.response import Response
+
+from ..campaigns import CampaignError, campaign_progress, create_campaign, detect_format, get_campaign
+from ..serializers import CampaignUploadSerializer
+from ..tasks import run_campaign_task
+
+STATUS_CODE_SUCCESS = status.HTTP_200_OK
+STATUS_CODE_ACCEPTED = status.HTTP_202_ACCEPTED
+STATUS_CODE_BAD_REQUEST = status.HTTP_400_BAD_REQUEST
+STATUS_CODE_NOT_FOUND = status.HTTP_404_NOT_FOUND
+
+MESSAGE_CAMPAIGN_QUEUED = "Campaign queued."
+MESSAGE_CAMPAIGN_PROGRESS = "Campaign progress."
+MESSAGE_OPERATION_FAILED = "Operation failed."
+
+
+def campaign_error_response(status_code, error):
+    """Builds the standard error envelope of the campaign endpoints."""
+    return Response(
+        {
+            "statusCode": status_code,
+            "message": MESSAGE_OPERATION_FAILED,
+            "error": error,
+            "data": None,
+        },
+        status=status_code,
+    )
+
+
+class CampaignUploadView(generics.GenericAPIView):
+    """
+    API view to start an OTP campaign from an uploaded CSV or JSONL file.
+
+    The upload is streamed to ``CAMPAIGN_UPLOAD_DIR`` (Django spools large
+    uploads to a temporary file, never holding them in memory) and handed to
+    the Celery workers, which process it in checkpointed chunks.
+    """
+
+    serializer_class = CampaignUploadSerializer
+    parser_classes = (MultiPartParser,)
+
+    def post(self, request):
+        """
+        Handles POST requests uploading a campaign file.
+
+        Args:
+            request (HttpRequest): The incoming multipart request with the ``file``.
+
+        Returns:
+            Response: 202 with the campaign id and progress.
+        """
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        upload = serializer.validated_data["file"]
+        try:
+            campaign_format = serializer.validated_data.get("format") or detect_format(upload.name)
+        except CampaignError as exc:
+            return campaign_error_response(STATUS_CODE_BAD_REQUEST, str(exc))
+
+        campaign_id = uuid.uuid4().hex
+        path = self.save_upload(upload, f"{campaign_id}.{campaign_format}")
+        create_campaign(path, campaign_format, campaign_id)
+        run_campaign_task.delay(campaign_id)
+
+        return Response(
+            {
+                "statusCode": STATUS_CODE_ACCEPTED,
+                "message": MESSAGE_CAMPAIGN_QUEUED,
+                "error": None,
+                "data": campaign_progress(campaign_id, get_campaign(campaign_id)),
+            },
+            status=STATUS_CODE_ACCEPTED,
+        )
+
+    @staticmethod
+    def save_upload(upload, filename):
+        """
+        Copies an uploaded file to ``CAMPAIGN_UPLOAD_DIR`` chunk by chunk.
+
+        Returns:
+            str: The path of the saved file.
+        """
+        os.makedirs(settings.CAMPAIGN_UPLOAD_DIR, exist_ok=True)
+        path = os.path.join(settings.CAMPAIGN_UPLOAD_DIR, filename)
+        with open(path, "wb") as campaign_file:
+            for chunk in upload.chunks():
+                campaign_file.write(chunk)
+        return path
+
+
+class CampaignProgressView(generics.GenericAPIView):
+    """API view reporting the progress of an OTP campaign."""
+
+    def get(self, request, campaign_id):
+        """
+        Handles GET requests for the progress of a campaign.
+
+        Args:
+            request (HttpRequest): The incoming HTTP request.
+            campaign_id (str): The campaign id from the URL.
+
+        Returns:
+            Response: The status, row counters and percentage of the file processed.
+        """
+        try:
+            campaign = get_campaign(campaign_id)
+        except CampaignError as exc:
+            return campaign_error_response(STATUS_CODE_NOT_FOUND, str(exc))
+
+        return Response(
+            {
+                "statusCode": STATUS_CODE_SUCCESS,
+                "message": MESSAGE_CAMPAIGN_PROGRESS,
+                "error": None,
+                "data": campaign_progress(campaign_id, campaign),
+            },
+            status=STATUS_CODE_SUCCESS,
+        )
@@ -0,0 +1,22 @@
+from django.http import HttpResponse
+from django.views import View
+
+from utils.metrics import PROMETHEUS_CONTENT_TYPE, metrics
+
+
+class MetricsView(View):
+    """Prometheus scrape endpoint for the OTP request path metrics of every worker."""
+
+    http_method_names = ["get"]
+
+    def get(self, request):
+        """
+        Handles GET requests from the Prometheus scraper.
+
+        Args:
+            request (HttpRequest): The incoming HTTP request.
+
+        Returns:
+            HttpResponse: The metrics in Prometheus text format.
+        """
+        return HttpResponse(metrics.render(), content_type=PROMETHEUS_CONTENT_TYPE)
@@ -0,0 +1,61 @@
+from django.conf import settings
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.views import View
+
+from ..schema import SCHEMA_FORMATS, get_schema, get_schema_view
+
+
+class OpenAPISchemaView(View):
+    """
+    Serves the precomputed OpenAPI schema (see ``manage.py generate_schema``).
+
+    The schema is kept in memory and served with a strong ETag, so pollers
+    revalidating with ``If-None-Match`` get an empty 304 response.
+    """
+
+    http_method_names = ["get", "head"]
+
+    def get(self, request, format):
+        """
+        Handles GET requests for ``/swagger.json`` and ``/swagger.yaml``.
+
+        Args:
+            request (HttpRequest): The incoming HTTP request.
+            format (str): ``.json`` or ``.yaml``, from the URL.
+
+        Returns:
+            HttpResponse: The schema, or 304 when the client's copy is current.
+        """
+        schema_format = format.lstrip(".")
+        body, etag = get_schema(schema_format)
+
+        response = get_conditional_response(request, etag=etag)
+        if response is None:
+            response = HttpResponse(body, content_type=SCHEMA_FORMATS[schema_format][1])
+        response["ETag"] = etag
+        patch_cache_control(response, public=True, max_age=settings.OPENAPI_SCHEMA_MAX_AGE)
+        return response
+
+
+def schema_ui_view(renderer):
+    """
+    Builds a view rendering a drf_yasg UI page (``swagger`` or ``redoc``).
+
+    drf_yasg is only imported by the first request to the page. The page
+    loads the schema from ``OpenAPISchemaView`` (``SPEC_URL`` setting).
+
+    Args:
+        renderer (str): The drf_yasg UI renderer name.
+
+    Returns:
+        callable: The view.
+    """
+    views = {}
+
+    def view(request, *args, **kwargs):
+        if "ui" not in views:
+            views["ui"] = get_schema_view().with_ui(renderer, cache_timeout=0)
+        return views["ui"](request, *args, **kwargs)
+
+    return view
@@ -1,32 +1,112 @@
-import random
-
+from asgiref.sync import sync_to_async
+from django.conf import settings
 from rest_framework import generics, status
-from rest_framework.response import Response
 
+from .async_base import AsyncAPIView
+from ..admission import otp_admission
+from ..dispatcher import generate_otp
+from ..idempotency import dedupe_key_for
+from ..publisher import PublisherFull, task_publisher
+from ..rate_limit import get_subject, retry_after_seconds, send_otp_limits
 from ..serializers import SendOTPSerializer
 from ..tasks import send_otp_task
-from utils import redis_client_ins
-
-# Constants for OTP generation and response messages
-OTP_LENGTH = 6
-OTP_MIN_VALUE = 10**(OTP_LENGTH - 1)
-OTP_MAX_VALUE = (10**OTP_LENGTH) - 1
+from utils import redis_client_ins, async_redis_client_ins, metrics
+from utils.json_response import PreEncodedJSON
+from utils.redis_client import OTP_SEND_CREATED, OTP_SEND_RATE_LIMITED, OTP_SEND_REJECTED
 
+# Constants for response messages
 SUCCESS_MESSAGE = "OTP sent successfully."
 STATUS_CODE_SUCCESS = status.HTTP_200_OK
+STATUS_CODE_TOO_MANY_REQUESTS = status.HTTP_429_TOO_MANY_REQUESTS
+STATUS_CODE_SERVICE_UNAVAILABLE = status.HTTP_503_SERVICE_UNAVAILABLE
+
+# Seconds clients are asked to wait when the task publisher is saturated
+PUBLISHER_FULL_RETRY_AFTER = 1
+
+SUCCESS_RESPONSE_DATA = {
+    "statusCode": STATUS_CODE_SUCCESS,
+    "message": SUCCESS_MESSAGE,
+    "error": None,
+    "data": None,
+}
+
+RATE_LIMITED_RESPONSE_DATA = {
+    "statusCode": STATUS_CODE_TOO_MANY_REQUESTS,
+    "message": "Operation failed.",
+    "error": "Too many OTP requests. Please try again later.",
+    "data": None,
+}
+
+PUBLISHER_FULL_RESPONSE_DATA = {
+    "statusCode": STATUS_CODE_SERVICE_UNAVAILABLE,
+    "message": "Operation failed.",
+    "error": "The service is overloaded. Please try again later.",
+    "data": None,
+}
+
+# Constant bodies are encoded once, at import time
+SUCCESS_RESPONSE = PreEncodedJSON(SUCCESS_RESPONSE_DATA, status=STATUS_CODE_SUCCESS)
+RATE_LIMITED_RESPONSE = PreEncodedJSON(RATE_LIMITED_RESPONSE_DATA, status=STATUS_CODE_TOO_MANY_REQUESTS)
+PUBLISHER_FULL_RESPONSE = PreEncodedJSON(PUBLISHER_FULL_RESPONSE_DATA, status=STATUS_CODE_SERVICE_UNAVAILABLE)
+
+
+def send_otp_arguments(request, phone_number, otp, admitted=True):
+    """
+    Builds the keyword arguments of ``Redis.send_otp`` for a request.
+
+    Args:
+        request (HttpRequest): The incoming HTTP request.
+        phone_number (str): The recipient phone number.
+        otp (str): The newly generated OTP.
+        admitted (bool): Whether admission control lets a new OTP be sent.
+
+    Returns:
+        dict: Keyword arguments for ``send_otp``.
+    """
+    return {
+        "phone_number": phone_number,
+        "otp_code": otp,
+        "dedupe_key": dedupe_key_for(request, phone_number),
+        "window": settings.OTP_IDEMPOTENCY_WINDOW,
+        "limits": send_otp_limits(phone_number, get_subject(request)) if settings.OTP_RATE_LIMIT_ENABLED else [],
+        "admitted": admitted,
+    }
+
+
+def rate_limited_response(retry_after):
+    """
+    Constructs the 429 response for a rate-limited send.
+
+    Args:
+        retry_after (int): Seconds until the caller may retry.
+
+    Returns:
+        HttpResponse: A response object with a ``Retry-After`` header.
+    """
+    return RATE_LIMITED_RESPONSE.response(headers={"Retry-After": str(retry_after)})
+
+
+def publisher_full_response():
+    """
+    Constructs the 503 response for a send whose SMS task could not be queued.
+
+    Returns:
+        HttpResponse: A response object with a ``Retry-After`` header.
+    """
+    return PUBLISHER_FULL_RESPONSE.response(headers={"Retry-After": str(PUBLISHER_FULL_RETRY_AFTER)})
 
 
-def generate_otp(length=OTP_LENGTH):
+def overloaded_response(retry_after):
     """
-    Generates a random One-Time Password (OTP) of specified length.
+    Constructs the 503 response for a send rejected by admission control.
 
     Args:
-        length (int): The length of the OTP to generate. Defaults to OTP_LENGTH.
+        retry_after (int): Seconds until the SMS backlog is expected to have drained enough.
 
     Returns:
-        str: A string representing the generated OTP.
+        HttpResponse: A response object with a ``Retry-After`` header.
     """
-    return str(random.randint(OTP_MIN_VALUE, OTP_MAX_VALUE))
+    return PUBLISHER_FULL_RESPONSE.response(headers={"Retry-After": str(retry_after)})
 
 
 class SendOTPView(generics.GenericAPIView):
@@ -38,8 +118,11 @@ class SendOTPView(generics.GenericAPIView):
         """
         Handles POST requests to send an OTP to the provided phone number.
 
-        Validates the input data, generates an OTP, stores it in Redis,
-        and triggers an asynchronous task to send the OTP via SMS.
+        Validates the input data, generates an OTP, stores it in Redis
+        (subject to rate limits and idempotency), and triggers an
+        asynchronous task to send the OTP via SMS. New sends are rejected
+        with a 503 while the SMS backlog would outlast the OTP (see
+        ``otp.admission``); duplicates of a recent send still succeed.
 
         Args:
             request (HttpRequest): The incoming HTTP request containing the phone number.
@@ -50,45 +133,134 @@ class SendOTPView(generics.GenericAPIView):
         serializer = self.get_serializer(data=request.data)
         serializer.is_valid(raise_exception=True)
 
+        # The SMS would arrive after the OTP expired, storing it is wasted work
+        overloaded_retry_after = otp_admission.retry_after()
+
         phone_number = serializer.validated_data["phone_number"]
         otp = generate_otp()
 
-        self.store_otp(phone_number, otp)
-        self.dispatch_send_otp_task(phone_number, otp)
+        outcome, value = self.store_otp(request, phone_number, otp, admitted=not overloaded_retry_after)
+        if outcome == OTP_SEND_REJECTED:
+            return overloaded_response(overloaded_retry_after)
+        if outcome == OTP_SEND_RATE_LIMITED:
+            return rate_limited_response(retry_after_seconds(value))
+
+        # Duplicates reuse the live OTP, which has already been sent
+        if outcome == OTP_SEND_CREATED:
+            try:
+                self.dispatch_send_otp_task(phone_number, otp)
+            except PublisherFull:
+                # Without a live OTP the retry is not taken for a duplicate
+                redis_client_ins.delete_otp(phone_number)
+                return publisher_full_response()
 
         return self.success_response()
 
-    def store_otp(self, phone_number, otp):
+    def store_otp(self, request, phone_number, otp, admitted=True):
         """
         Stores the generated OTP in Redis with a predefined Time-To-Live (TTL).
 
+        Rate limits and duplicate detection are applied by the same atomic
+        Redis call, so retries and rejections cost a single round trip. On
+        Redis Cluster the per-caller bucket lives on another shard and is
+        consumed first, with a separate call.
+
         Args:
+            request (HttpRequest): The incoming HTTP request.
             phone_number (str): The user's phone number.
             otp (str): The generated OTP to store.
+            admitted (bool): Whether admission control lets a new OTP be sent.
+
+        Returns:
+            list: ``[outcome, value]`` as returned by ``Redis.send_otp``.
         """
-        redis_client_ins.set_otp(phone_number=phone_number, otp_code=otp)
+        arguments = send_otp_arguments(request, phone_number, otp, admitted)
+        arguments["limits"], other_slot_limits = redis_client_ins.split_limits_by_slot(phone_number, arguments["limits"])
+
+        with metrics.timer("redis_send_otp"):
+            if other_slot_limits and admitted:
+                retry_after = redis_client_ins.consume_rate_limits(other_slot_limits)
+                if retry_after:
+                    return [OTP_SEND_RATE_LIMITED, retry_after]
+            return redis_client_ins.send_otp(**arguments)
 
     def dispatch_send_otp_task(self, phone_number, otp):
         """
-        Dispatches an asynchronous task to send the OTP via SMS.
+        Hands the task sending the OTP via SMS to the background publisher.
 
         Args:
             phone_number (str): The user's phone number.
             otp (str): The OTP to send.
+
+        Raises:
+            PublisherFull: If the task could not be queued.
         """
-        send_otp_task.delay(phone_number, otp)
+        with metrics.timer("celery_publish"):
+            task_publisher.publish(send_otp_task.s(phone_number, otp))
 
     def success_response(self):
         """
         Constructs a standardized success JSON response.
 
         Returns:
-            Response: A DRF Response object with the success message and HTTP 200 status.
+            HttpResponse: A pre-encoded response with the success message and HTTP 200 status.
+        """
+        return SUCCESS_RESPONSE.response()
+
+
+class AsyncSendOTPView(AsyncAPIView):
+    """Async-native variant of ``SendOTPView`` for the ASGI request path."""
+
+    serializer_class = SendOTPSerializer
+
+    async def post(self, request):
+        """
+        Handles POST requests to send an OTP to the provided phone number.
+
+        Args:
+            request (HttpRequest): The incoming HTTP request containing the phone number.
+
+        Returns:
+            HttpResponse: A JSON response indicating the success or failure of the OTP sending process.
         """
-        response_data = {
-            "statusCode": STATUS_CODE_SUCCESS,
-            "message": SUCCESS_MESSAGE,
-            "error": None,
-            "data": None,
-        }
-        return Response(response_data, status=STATUS_CODE_SUCCESS)
\ No newline at end of file
+        validated_data, error_response = self.get_validated_data(request)
+        if error_response is not None:
+            return error_response
+
+        overloaded_retry_after = otp_admission.retry_after()
+
+        phone_number = validated_data["phone_number"]
+        otp = generate_otp()
+
+        arguments = send_otp_arguments(request, phone_number, otp, admitted=not overloaded_retry_after)
+        arguments["limits"], other_slot_limits = async_redis_client_ins.split_limits_by_slot(
+            phone_number, arguments["limits"],
+        )
+
+        with metrics.timer("redis_send_otp"):
+            retry_after = 0
+            if other_slot_limits and not overloaded_retry_after:
+                retry_after = await async_redis_client_ins.consume_rate_limits(other_slot_limits)
+            if retry_after:
+                outcome, value = OTP_SEND_RATE_LIMITED, retry_after
+            else:
+                outcome, value = await async_redis_client_ins.send_otp(**arguments)
+        if outcome == OTP_SEND_REJECTED:
+            return overloaded_response(overloaded_retry_after)
+        if outcome == OTP_SEND_RATE_LIMITED:
+            return rate_limited_response(retry_after_seconds(value))
+
+        if outcome == OTP_SEND_CREATED:
+            task_signature = send_otp_task.s(phone_number, otp)
+            try:
+                with metrics.timer("celery_publish"):
+                    if task_publisher.may_block:
+                        # Waiting for the buffer or the broker must not block the event loop
+                        await sync_to_async(task_publisher.publish, thread_sensitive=False)(task_signature)
+                    else:
+                        task_publisher.publish(task_signature)
+            except PublisherFull:
+                await async_redis_client_ins.delete_otp(phone_number)
+                return publisher_full_response()
+
+        return SUCCESS_RESPONSE.response()
\ No newline at end of file
@@ -1,23 +1,27 @@
 from rest_framework import generics, status
-from rest_framework.response import Response
 
+from .async_base import AsyncAPIView
 from ..serializers import VerifyOTPSerializer
-from utils import redis_client_ins
+from utils import redis_client_ins, async_redis_client_ins, metrics
+from utils.json_response import PreEncodedJSON
+from utils.redis_client import OTP_VERIFIED, OTP_MISSING, OTP_MISMATCH, OTP_LOCKED
 
 
 # Constants for response messages and status codes
 STATUS_CODE_SUCCESS = status.HTTP_200_OK
 STATUS_CODE_BAD_REQUEST = status.HTTP_400_BAD_REQUEST
+STATUS_CODE_TOO_MANY_REQUESTS = status.HTTP_429_TOO_MANY_REQUESTS
 
 MESSAGE_OPERATION_FAILED = "Operation failed."
 MESSAGE_OTP_EXPIRED = "OTP has expired or does not exist."
 MESSAGE_INVALID_OTP = "Invalid OTP."
+MESSAGE_OTP_LOCKED = "Too many failed attempts. Please request a new OTP later."
 MESSAGE_VERIFIED_SUCCESS = "OTP verified successfully."
 
 
-def build_response(status_code, message, error=None, data=None):
+def build_response_data(status_code, message, error=None, data=None):
     """
-    Constructs a standardized JSON response.
+    Constructs a standardized JSON response payload.
 
     Args:
         status_code (int): The HTTP status code for the response.
@@ -26,17 +30,40 @@ def build_response(status_code, message, error=None, data=None):
         data (dict, optional): Any additional data to include. Defaults to None.
 
     Returns:
-        Response: A DRF Response object with the specified data and status.
+        dict: The response payload.
     """
-    return Response(
-        {
-            "statusCode": status_code,
-            "message": message,
-            "error": error,
-            "data": data,
-        },
-        status=status_code,
-    )
+    return {
+        "statusCode": status_code,
+        "message": message,
+        "error": error,
+        "data": data,
+    }
+
+
+def _encoded_response(status_code, message, error=None):
+    return PreEncodedJSON(build_response_data(status_code, message, error), status=status_code)
+
+
+# Verification status -> response, encoded once at import time
+VERIFICATION_RESPONSES = {
+    OTP_VERIFIED: _encoded_response(STATUS_CODE_SUCCESS, MESSAGE_VERIFIED_SUCCESS),
+    OTP_MISSING: _encoded_response(STATUS_CODE_BAD_REQUEST, MESSAGE_OPERATION_FAILED, MESSAGE_OTP_EXPIRED),
+    OTP_MISMATCH: _encoded_response(STATUS_CODE_BAD_REQUEST, MESSAGE_OPERATION_FAILED, MESSAGE_INVALID_OTP),
+    OTP_LOCKED: _encoded_response(STATUS_CODE_TOO_MANY_REQUESTS, MESSAGE_OPERATION_FAILED, MESSAGE_OTP_LOCKED),
+}
+
+
+def build_verification_response(result):
+    """
+    Returns the response for a verification status.
+
+    Args:
+        result (int): The verification status returned by ``verify_otp``.
+
+    Returns:
+        HttpResponse: A pre-encoded response describing the outcome.
+    """
+    return VERIFICATION_RESPONSES[result].response()
 
 
 class VerifyOTPView(generics.GenericAPIView):
@@ -48,14 +75,14 @@ class VerifyOTPView(generics.GenericAPIView):
         """
         Handles POST requests to verify an OTP for a provided phone number.
 
-        Validates the input data, retrieves the stored OTP from Redis,
-        compares it with the provided OTP, and responds accordingly.
+        Validates the input data, then compares and consumes the stored OTP
+        with a single atomic Redis script, and responds accordingly.
 
         Args:
             request (HttpRequest): The incoming HTTP request containing the phone number and OTP.
 
         Returns:
-            Response: A JSON response indicating the success or failure of the OTP verification process.
+            HttpResponse: A JSON response indicating the success or failure of the OTP verification process.
         """
         serializer = self.get_serializer(data=request.data)
         serializer.is_valid(raise_exception=True)
@@ -63,71 +90,54 @@ class VerifyOTPView(generics.GenericAPIView):
         phone_number = serializer.validated_data["phone_number"]
         otp_provided = serializer.validated_data["otp"]
 
-        stored_otp = self.retrieve_stored_otp(phone_number)
-        if stored_otp is None:
-
-            return build_response(
-                status_code=STATUS_CODE_BAD_REQUEST,
-                message=MESSAGE_OPERATION_FAILED,
-                error=MESSAGE_OTP_EXPIRED,
-            )
-
-        if self.is_otp_valid(stored_otp, otp_provided):
-            self.delete_stored_otp(phone_number)
-            return build_response(
-                status_code=STATUS_CODE_SUCCESS,
-                message=MESSAGE_VERIFIED_SUCCESS,
-            )
-        else:
-            return build_response(
-                status_code=STATUS_CODE_BAD_REQUEST,
-                message=MESSAGE_OPERATION_FAILED,
-                error=MESSAGE_INVALID_OTP,
-            )
-
-    def retrieve_stored_otp(self, phone_number):
+        result = self.verify_stored_otp(phone_number, otp_provided)
+        return build_verification_response(result)
+
+    def verify_stored_otp(self, phone_number, provided_otp):
         """
-        Retrieves the stored OTP from Redis for a given phone number.
+        Checks the provided OTP against Redis in one atomic round trip.
 
         Args:
             phone_number (str): The user's phone number.
+            provided_otp (str): The OTP provided by the user.
 
         Returns:
-            bytes or None: The stored OTP as bytes if exists, else None.
+            int: The verification status (see ``utils.redis_client``).
         """
         try:
-            return redis_client_ins.get_otp(phone_number=phone_number)
+            with metrics.timer("redis_verify_otp"):
+                return redis_client_ins.verify_otp(phone_number=phone_number, otp_code=provided_otp)
         except Exception:
             # TODO: Logging
-            return None
+            return OTP_MISSING
 
-    def is_otp_valid(self, stored_otp, provided_otp):
+
+class AsyncVerifyOTPView(AsyncAPIView):
+    """Async-native variant of ``VerifyOTPView`` for the ASGI request path."""
+
+    serializer_class = VerifyOTPSerializer
+
+    async def post(self, request):
         """
-        Compares the stored OTP with the provided OTP.
+        Handles POST requests to verify an OTP for a provided phone number.
 
         Args:
-            stored_otp (bytes): The OTP retrieved from Redis.
-            provided_otp (str): The OTP provided by the user.
+            request (HttpRequest): The incoming HTTP request containing the phone number and OTP.
 
         Returns:
-            bool: True if the OTPs match, False otherwise.
+            HttpResponse: A JSON response indicating the success or failure of the OTP verification process.
         """
-        try:
-            decoded_stored_otp = stored_otp.decode("utf-8")
-            return decoded_stored_otp == provided_otp
-        except UnicodeDecodeError:
-            # TODO: Logging
-            return False
+        validated_data, error_response = self.get_validated_data(request)
+        if error_response is not None:
+            return error_response
 
-    def delete_stored_otp(self, phone_number):
-        """
-        Deletes the stored OTP from Redis for a given phone number.
+        phone_number = validated_data["phone_number"]
+        otp_provided = validated_data["otp"]
 
-        Args:
-            phone_number (str): The user's phone number.
-        """
         try:
-            redis_client_ins.delete_otp(phone_number=phone_number)
+            with metrics.timer("redis_verify_otp"):
+                result = await async_redis_client_ins.verify_otp(phone_number=phone_number, otp_code=otp_provided)
         except Exception:
             # TODO: Logging
-            pass
+            result = OTP_MISSING
+        return build_verification_response(result)
@@ -1,3 +1,11 @@
 from .decode_token import decode_token
 from .extract_token import extract_token
-from .redis_client import redis_client_ins
\ No newline at end of file
+from .redis_client import redis_client_ins
+from .async_redis_client import async_redis_client_ins
+from .token_cache import token_validation_cache
+from .auth_client import auth_service_client
+from .async_auth_client import async_auth_service_client
+from .metrics import metrics
+from .revocation import revocation_list
+from .circuit_breaker import auth_service_circuit_breaker
+from .concurrency_limit import concurrency_limiter
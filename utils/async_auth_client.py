@@ -0,0 +1,137 @@
+import asyncio
+from time import perf_counter
+
+from django.conf import settings
+from httpx import AsyncClient, Limits, Timeout
+
+from .auth_client import LatencyTracker
+from .metrics import metrics
+
+
+class AsyncAuthServiceClient:
+    """
+    Non-blocking counterpart of ``AuthServiceClient`` for the ASGI request path.
+
+    One ``httpx.AsyncClient`` is kept per event loop, so keep-alive connections
+    are shared by every in-flight request of the worker process.
+    """
+
+    def __init__(
+        self,
+        url=settings.TOKEN_VALIDATION_URL,
+        connect_timeout=settings.AUTH_SERVICE_CONNECT_TIMEOUT,
+        read_timeout=settings.AUTH_SERVICE_READ_TIMEOUT,
+        pool_maxsize=settings.AUTH_SERVICE_POOL_MAXSIZE,
+        max_connections=settings.AUTH_SERVICE_ASYNC_MAX_CONNECTIONS,
+        hedge_enabled=settings.AUTH_SERVICE_HEDGE_ENABLED,
+        hedge_percentile=settings.AUTH_SERVICE_HEDGE_PERCENTILE,
+        hedge_min_delay=settings.AUTH_SERVICE_HEDGE_MIN_DELAY,
+        latency_window=500,
+    ):
+        self.url = url
+        self.timeout = Timeout(read_timeout, connect=connect_timeout)
+        self.limits = Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=pool_maxsize,
+        )
+        self.hedge_enabled = hedge_enabled
+        self.latencies = LatencyTracker(
+            percentile=hedge_percentile,
+            min_delay=hedge_min_delay,
+            window=latency_window,
+        )
+
+        self._client = None
+        self._loop = None
+        self.hedged_requests = 0
+        self.hedge_wins = 0
+
+    def get_client(self):
+        """
+        Returns the HTTP client bound to the running event loop.
+
+        Returns:
+            httpx.AsyncClient: The pooled client.
+        """
+        loop = asyncio.get_running_loop()
+        if self._client is None or self._loop is not loop:
+            if self._client is not None:
+                self._close_client(self._client, self._loop)
+            self._client = AsyncClient(timeout=self.timeout, limits=self.limits)
+            self._loop = loop
+        return self._client
+
+    @staticmethod
+    def _close_client(client, loop):
+        """Closes the connections of a client replaced by one of another event loop, on their own loop."""
+        if loop.is_closed():
+            # The connections cannot be closed without their loop; the
+            # sockets are released once the client is garbage collected
+            return
+        asyncio.run_coroutine_threadsafe(client.aclose(), loop)
+
+    async def _timed_post(self, client, payload):
+        started = perf_counter()
+        response = await client.post(self.url, json=payload)
+        latency = perf_counter() - started
+        self.latencies.record(latency)
+        metrics.observe("auth_service", latency)
+        return response
+
+    async def validate_token(self, token):
+        """
+        Posts the token to the authentication service.
+
+        Args:
+            token (str): The JWT token to validate.
+
+        Returns:
+            httpx.Response: The response from the authentication service.
+
+        Raises:
+            httpx.HTTPError: If every attempt failed or timed out.
+        """
+        client = self.get_client()
+        payload = {"token": token}
+
+        delay = self.latencies.hedge_delay() if self.hedge_enabled else None
+        if delay is None:
+            return await self._timed_post(client, payload)
+
+        primary = asyncio.ensure_future(self._timed_post(client, payload))
+        done, _ = await asyncio.wait({primary}, timeout=delay)
+        if done:
+            return primary.result()
+
+        self.hedged_requests += 1
+        metrics.increment("auth_service_hedged")
+        hedge = asyncio.ensure_future(self._timed_post(client, payload))
+        pending = {primary, hedge}
+        error = None
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None:
+                    for other in pending:
+                        other.cancel()
+                    if task is hedge:
+                        self.hedge_wins += 1
+                    return task.result()
+                error = task.exception()
+        raise error
+
+    def stats(self):
+        """
+        Returns hedging counters of the current process.
+
+        Returns:
+            dict: ``hedged_requests`` and ``hedge_wins``.
+        """
+        return {
+            "hedged_requests": self.hedged_requests,
+            "hedge_wins": self.hedge_wins,
+        }
+
+
+async_auth_service_client = AsyncAuthServiceClient()
+metrics.register_collector("auth_service_async", async_auth_service_client.stats)
@@ -0,0 +1,35 @@
+from redis.asyncio import Redis as _AsyncRedis
+from redis.asyncio import ConnectionPool
+from redis.asyncio.cluster import ClusterNode, RedisCluster as _AsyncRedisCluster
+from django.conf import settings
+
+from .redis_client import OTPCommandsMixin, cluster_nodes
+
+
+class AsyncRedis(OTPCommandsMixin, _AsyncRedis):
+    pass
+
+
+class AsyncRedisCluster(OTPCommandsMixin, _AsyncRedisCluster):
+    cluster_mode = True
+
+
+# Connections are opened lazily on the running event loop, so building the
+# client at import time performs no I/O.
+if settings.REDIS_CLUSTER_NODES:
+    async_redis_client_ins = AsyncRedisCluster(
+        startup_nodes=cluster_nodes(node_cls=ClusterNode),
+        password=settings.REDIS_PASSWORD or None,
+        max_connections=100,
+        cluster_error_retry_attempts=settings.REDIS_CLUSTER_RETRY_ATTEMPTS,
+    )
+else:
+    async_redis_client_ins = AsyncRedis(
+        connection_pool=ConnectionPool(
+            host=settings.REDIS_HOST,
+            port=settings.REDIS_PORT,
+            db=settings.REDIS_DB,
+            password=settings.REDIS_PASSWORD,
+            max_connections=100,
+        ),
+    )
@@ -0,0 +1,215 @@
+import os
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from threading import Lock
+from time import perf_counter
+
+from django.conf import settings
+from requests import Session
+from requests.adapters import HTTPAdapter
+
+from .metrics import metrics
+
+# Number of latency samples required before hedging kicks in
+HEDGE_MIN_SAMPLES = 20
+# Recompute the hedge threshold after this many new samples
+HEDGE_RECOMPUTE_EVERY = 50
+
+
+class LatencyTracker:
+    """Keeps a window of recent call latencies and derives the hedging delay from it."""
+
+    def __init__(self, percentile, min_delay, window=500):
+        """
+        Args:
+            percentile (float): Latency percentile after which a call is hedged.
+            min_delay (float): Lower bound of the hedging delay in seconds.
+            window (int): Number of recent samples kept.
+        """
+        self.percentile = percentile
+        self.min_delay = min_delay
+        self._latencies = deque(maxlen=window)
+        self._samples_since_recompute = 0
+        self._hedge_delay = None
+
+    def record(self, latency):
+        """Adds a latency sample in seconds."""
+        self._latencies.append(latency)
+        self._samples_since_recompute += 1
+        if self._samples_since_recompute >= HEDGE_RECOMPUTE_EVERY:
+            self._samples_since_recompute = 0
+            self._hedge_delay = None
+
+    def hedge_delay(self):
+        """
+        Returns the latency after which a hedged request is sent.
+
+        Returns:
+            float or None: Delay in seconds, None while there are too few samples.
+        """
+        if self._hedge_delay is None and len(self._latencies) >= HEDGE_MIN_SAMPLES:
+            samples = sorted(self._latencies)
+            index = min(len(samples) - 1, int(len(samples) * self.percentile / 100))
+            self._hedge_delay = max(samples[index], self.min_delay)
+        return self._hedge_delay
+
+    def clear(self):
+        """Drops every sample."""
+        self._latencies.clear()
+        self._samples_since_recompute = 0
+        self._hedge_delay = None
+
+
+class AuthServiceClient:
+    """
+    Keep-alive HTTP client for the authentication service.
+
+    Each process owns one ``requests.Session`` whose connection pool is reused
+    across requests, every call is bounded by connect/read timeouts, and an
+    optional hedged second request is fired when the first one is slower than
+    the configured latency percentile.
+    """
+
+    def __init__(
+        self,
+        url=settings.TOKEN_VALIDATION_URL,
+        connect_timeout=settings.AUTH_SERVICE_CONNECT_TIMEOUT,
+        read_timeout=settings.AUTH_SERVICE_READ_TIMEOUT,
+        pool_maxsize=settings.AUTH_SERVICE_POOL_MAXSIZE,
+        hedge_enabled=settings.AUTH_SERVICE_HEDGE_ENABLED,
+        hedge_percentile=settings.AUTH_SERVICE_HEDGE_PERCENTILE,
+        hedge_min_delay=settings.AUTH_SERVICE_HEDGE_MIN_DELAY,
+        latency_window=500,
+    ):
+        self.url = url
+        self.timeout = (connect_timeout, read_timeout)
+        self.pool_maxsize = pool_maxsize
+        self.hedge_enabled = hedge_enabled
+        self.latencies = LatencyTracker(
+            percentile=hedge_percentile,
+            min_delay=hedge_min_delay,
+            window=latency_window,
+        )
+
+        self._lock = Lock()
+        self._pid = None
+        self._session = None
+        self._executor = None
+        self.hedged_requests = 0
+        self.hedge_wins = 0
+
+    def _reset_for_current_process(self):
+        """(Re)creates the session and executor, so forked workers never share sockets."""
+        session = Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_maxsize)
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+
+        self._session = session
+        self._executor = None
+        self.latencies.clear()
+        self.hedged_requests = 0
+        self.hedge_wins = 0
+        self._pid = os.getpid()
+
+    def get_session(self):
+        """
+        Returns the session of the current process, creating it if needed.
+
+        Returns:
+            requests.Session: The pooled session.
+        """
+        if self._pid != os.getpid():
+            with self._lock:
+                if self._pid != os.getpid():
+                    self._reset_for_current_process()
+        return self._session
+
+    def _get_executor(self):
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(
+                        max_workers=self.pool_maxsize,
+                        thread_name_prefix="auth-hedge",
+                    )
+        return self._executor
+
+    def _timed_post(self, session, payload):
+        started = perf_counter()
+        response = session.post(self.url, json=payload, timeout=self.timeout)
+        latency = perf_counter() - started
+        self.latencies.record(latency)
+        metrics.observe("auth_service", latency)
+        return response
+
+    def validate_token(self, token):
+        """
+        Posts the token to the authentication service.
+
+        Args:
+            token (str): The JWT token to validate.
+
+        Returns:
+            requests.Response: The response from the authentication service.
+
+        Raises:
+            requests.RequestException: If every attempt failed or timed out.
+        """
+        session = self.get_session()
+        payload = {"token": token}
+
+        delay = self.latencies.hedge_delay() if self.hedge_enabled else None
+        if delay is None:
+            return self._timed_post(session, payload)
+
+        executor = self._get_executor()
+        primary = executor.submit(self._timed_post, session, payload)
+        done, _ = wait([primary], timeout=delay)
+        if done:
+            return primary.result()
+
+        self.hedged_requests += 1
+        metrics.increment("auth_service_hedged")
+        hedge = executor.submit(self._timed_post, session, payload)
+        pending = {primary, hedge}
+        error = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    if future is hedge:
+                        self.hedge_wins += 1
+                    return future.result()
+                error = future.exception()
+        raise error
+
+    def stats(self):
+        """
+        Returns connection pool and hedging counters of the current process.
+
+        Returns:
+            dict: ``requests``, ``new_connections``, ``pool_hits``, ``hedged_requests`` and ``hedge_wins``.
+        """
+        requests_count = new_connections = 0
+        if self._session is not None and self._pid == os.getpid():
+            for adapter in set(self._session.adapters.values()):
+                for key in adapter.poolmanager.pools.keys():
+                    pool = adapter.poolmanager.pools.get(key)
+                    if pool is None:
+                        # Evicted since the keys were listed
+                        continue
+                    requests_count += pool.num_requests
+                    new_connections += pool.num_connections
+
+        return {
+            "requests": requests_count,
+            "new_connections": new_connections,
+            "pool_hits": requests_count - new_connections,
+            "hedged_requests": self.hedged_requests,
+            "hedge_wins": self.hedge_wins,
+        }
+
+
+auth_service_client = AuthServiceClient()
+metrics.register_collector("auth_service", auth_service_client.stats)
@@ -0,0 +1,51 @@
+from hashlib import blake2b
+from math import ceil, log
+
+
+class BloomFilter:
+    """
+    Fixed-size Bloom filter over strings.
+
+    Membership tests may return false positives at about ``error_rate`` while
+    at most ``capacity`` items are stored, never false negatives. Items
+    cannot be removed; build a new filter instead.
+    """
+
+    def __init__(self, capacity: int, error_rate: float):
+        """
+        Args:
+            capacity (int): Number of items the filter is sized for.
+            error_rate (float): Target false positive probability at ``capacity`` items.
+        """
+        self.capacity = max(capacity, 1)
+        self.size = max(ceil(-self.capacity * log(error_rate) / (log(2) ** 2)), 8)
+        self.hash_count = max(round(self.size / self.capacity * log(2)), 1)
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, item: str):
+        # Double hashing: k positions derived from the two halves of one digest
+        digest = blake2b(item.encode("utf-8"), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], "little")
+        second = int.from_bytes(digest[8:], "little") | 1
+        size = self.size
+        return [(first + index * second) % size for index in range(self.hash_count)]
+
+    def add(self, item: str):
+        """Adds ``item`` to the filter."""
+        bits = self.bits
+        for position in self._positions(item):
+            bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, item: str):
+        bits = self.bits
+        for position in self._positions(item):
+            if not bits[position >> 3] & (1 << (position & 7)):
+                return False
+        return True
+
+    @property
+    def is_full(self):
+        """True once more items than ``capacity`` were added and the error rate degrades."""
+        return self.count > self.capacity
@@ -0,0 +1,293 @@
+from time import perf_counter, time
+
+from django.conf import settings
+from pybreaker import CircuitBreaker, CircuitBreakerError
+from redis import RedisError
+
+from .async_redis_client import async_redis_client_ins
+from .metrics import metrics
+from .redis_client import redis_client_ins
+
+STATE_CLOSED = "closed"
+STATE_OPEN = "open"
+STATE_HALF_OPEN = "half_open"
+
+# KEYS: breaker hash
+# ARGV: now in ms, reset timeout in ms, max concurrent probes, probe lease in ms
+# Returns {state, opened_at, allowed}. An open breaker whose reset timeout
+# passed turns half-open, where only ``max probes`` calls at a time pass.
+ACQUIRE_SCRIPT = """
+local breaker = redis.call('HMGET', KEYS[1], 'state', 'opened_at', 'probes', 'probe_at')
+local state = breaker[1] or 'closed'
+local opened_at = breaker[2] or '0'
+local now = tonumber(ARGV[1])
+
+if state == 'open' then
+    if now < tonumber(opened_at) + tonumber(ARGV[2]) then
+        return {state, opened_at, 0}
+    end
+    state = 'half_open'
+    breaker[3] = '0'
+    redis.call('HSET', KEYS[1], 'state', state, 'probes', 0, 'successes', 0)
+end
+
+if state == 'half_open' then
+    local probes = tonumber(breaker[3]) or 0
+    -- Probes that never reported back (e.g. a killed worker) give their slot up
+    if probes > 0 and now > (tonumber(breaker[4]) or 0) + tonumber(ARGV[4]) then
+        probes = 0
+    end
+    if probes >= tonumber(ARGV[3]) then
+        return {state, opened_at, 0}
+    end
+    redis.call('HSET', KEYS[1], 'probes', probes + 1, 'probe_at', now)
+end
+return {state, opened_at, 1}
+"""
+
+# KEYS: breaker hash
+# ARGV: now in ms, failed (0/1), probe (0/1), window in ms, fail max,
+#       failure ratio, successes closing a half-open breaker
+# Returns {state, opened_at}. A closed breaker opens once a window holds
+# ``fail max`` failures that are also at least ``failure ratio`` of its calls.
+RECORD_SCRIPT = """
+local breaker = redis.call('HMGET', KEYS[1], 'state', 'opened_at', 'window_start', 'calls', 'failures', 'probes')
+local state = breaker[1] or 'closed'
+local now = tonumber(ARGV[1])
+local failed = ARGV[2] == '1'
+
+local function trip()
+    redis.call('DEL', KEYS[1])
+    redis.call('HSET', KEYS[1], 'state', 'open', 'opened_at', now)
+    return {'open', now}
+end
+
+if state == 'open' then
+    return {state, breaker[2]}
+end
+
+if state == 'half_open' then
+    -- Late results of calls started before the breaker opened do not count
+    if ARGV[3] ~= '1' then
+        return {state, breaker[2]}
+    end
+    if failed then
+        return trip()
+    end
+    redis.call('HSET', KEYS[1], 'probes', math.max((tonumber(breaker[6]) or 1) - 1, 0))
+    if redis.call('HINCRBY', KEYS[1], 'successes', 1) >= tonumber(ARGV[7]) then
+        redis.call('DEL', KEYS[1])
+        return {'closed', '0'}
+    end
+    return {state, breaker[2]}
+end
+
+local window_start = tonumber(breaker[3]) or 0
+local calls = tonumber(breaker[4]) or 0
+local failures = tonumber(breaker[5]) or 0
+if now - window_start >= tonumber(ARGV[4]) then
+    window_start, calls, failures = now, 0, 0
+end
+calls = calls + 1
+if failed then
+    failures = failures + 1
+end
+if failures >= tonumber(ARGV[5]) and failures >= calls * tonumber(ARGV[6]) then
+    return trip()
+end
+redis.call('HSET', KEYS[1], 'window_start', window_start, 'calls', calls, 'failures', failures)
+return {'closed', '0'}
+"""
+
+
+class SharedCircuitBreaker:
+    """
+    Circuit breaker whose state is shared by every process through Redis.
+
+    All workers of all pods trip, half-open and close together. Failures
+    are counted over a window of ``window`` seconds; calls slower than
+    ``slow_call_seconds`` count as failures even when they succeed. While
+    half-open only ``half_open_probes`` calls at a time go through, and
+    ``success_threshold`` successful probes close the breaker.
+
+    Each process keeps a local view of the state: a closed breaker is
+    rechecked at most every ``state_ttl`` seconds, an open one is not asked
+    again before its reset timeout. Every outcome is recorded with one
+    script call. While Redis is unreachable a per-process breaker takes over.
+    """
+
+    def __init__(
+        self,
+        name,
+        redis_client=redis_client_ins,
+        async_redis_client=async_redis_client_ins,
+        fail_max=settings.CIRCUIT_BREAKER_FAIL_MAX,
+        failure_ratio=settings.CIRCUIT_BREAKER_FAILURE_RATIO,
+        window=settings.CIRCUIT_BREAKER_WINDOW,
+        reset_timeout=settings.CIRCUIT_BREAKER_RESET_TIMEOUT,
+        half_open_probes=settings.CIRCUIT_BREAKER_HALF_OPEN_PROBES,
+        success_threshold=settings.CIRCUIT_BREAKER_SUCCESS_THRESHOLD,
+        slow_call_seconds=settings.CIRCUIT_BREAKER_SLOW_CALL_SECONDS,
+        state_ttl=settings.CIRCUIT_BREAKER_STATE_TTL,
+    ):
+        self.name = name
+        self.key = f"circuit:{{{name}}}"
+        self.redis_client = redis_client
+        self.async_redis_client = async_redis_client
+        self.fail_max = fail_max
+        self.failure_ratio = failure_ratio
+        self.window = window
+        self.reset_timeout = reset_timeout
+        self.half_open_probes = half_open_probes
+        self.success_threshold = success_threshold
+        self.slow_call_seconds = slow_call_seconds
+        self.state_ttl = state_ttl
+        # Probes hold their slot for at most this long
+        self.probe_lease = max(slow_call_seconds * 2, 1.0)
+        self.fallback = CircuitBreaker(fail_max=fail_max, reset_timeout=reset_timeout)
+
+        self._state = STATE_CLOSED
+        self._opened_at = 0.0
+        self._checked_at = float("-inf")
+
+    @property
+    def current_state(self):
+        """The state as last seen by this process."""
+        return self._state
+
+    def _local_decision(self, now):
+        # True or False when the local view is enough, None when Redis must be asked
+        if self._state == STATE_CLOSED and now - self._checked_at < self.state_ttl:
+            return True
+        if self._state == STATE_OPEN and now < self._opened_at + self.reset_timeout:
+            return False
+        return None
+
+    def _update(self, state, opened_at, now):
+        state = state.decode("utf-8") if isinstance(state, bytes) else state
+        if state != self._state:
+            metrics.increment(f"circuit_{self.name}_{state}")
+        self._state = state
+        self._opened_at = int(opened_at) / 1000
+        self._checked_at = now
+
+    def _acquire_args(self, now):
+        return [int(now * 1000), int(self.reset_timeout * 1000), self.half_open_probes, int(self.probe_lease * 1000)]
+
+    def _record_args(self, now, failed, probe):
+        return [
+            int(now * 1000),
+            int(failed),
+            int(probe),
+            int(self.window * 1000),
+            self.fail_max,
+            self.failure_ratio,
+            self.success_threshold,
+        ]
+
+    def _admit(self, allowed):
+        if not allowed:
+            metrics.increment(f"circuit_{self.name}_rejected")
+            raise CircuitBreakerError(f"Circuit breaker {self.name!r} is open.")
+        return self._state == STATE_HALF_OPEN
+
+    def before_call(self):
+        """
+        Admits a call or rejects it.
+
+        Returns:
+            bool: True if the call is a half-open probe.
+
+        Raises:
+            CircuitBreakerError: If the breaker is open, or half-open with every probe slot taken.
+            RedisError: If Redis cannot be reached.
+        """
+        now = time()
+        allowed = self._local_decision(now)
+        if allowed is None:
+            state, opened_at, allowed = self.redis_client.get_script("circuit_acquire", ACQUIRE_SCRIPT)(
+                keys=[self.key], args=self._acquire_args(now),
+            )
+            self._update(state, opened_at, now)
+        return self._admit(allowed)
+
+    async def abefore_call(self):
+        """Async variant of ``before_call``."""
+        now = time()
+        allowed = self._local_decision(now)
+        if allowed is None:
+            state, opened_at, allowed = await self.async_redis_client.get_script("circuit_acquire", ACQUIRE_SCRIPT)(
+                keys=[self.key], args=self._acquire_args(now),
+            )
+            self._update(state, opened_at, now)
+        return self._admit(allowed)
+
+    def after_call(self, probe, failed):
+        """Records the outcome of an admitted call."""
+        now = time()
+        try:
+            state, opened_at = self.redis_client.get_script("circuit_record", RECORD_SCRIPT)(
+                keys=[self.key], args=self._record_args(now, failed, probe),
+            )
+        except RedisError:
+            # TODO: Logging
+            return
+        self._update(state, opened_at, now)
+
+    async def aafter_call(self, probe, failed):
+        """Async variant of ``after_call``."""
+        now = time()
+        try:
+            state, opened_at = await self.async_redis_client.get_script("circuit_record", RECORD_SCRIPT)(
+                keys=[self.key], args=self._record_args(now, failed, probe),
+            )
+        except RedisError:
+            # TODO: Logging
+            return
+        self._update(state, opened_at, now)
+
+    def call(self, func, *args, **kwargs):
+        """
+        Calls ``func`` through the breaker.
+
+        Returns:
+            The result of ``func``.
+
+        Raises:
+            CircuitBreakerError: If the breaker rejects the call.
+        """
+        try:
+            probe = self.before_call()
+        except RedisError:
+            # TODO: Logging
+            return self.fallback.call(func, *args, **kwargs)
+
+        started = perf_counter()
+        try:
+            result = func(*args, **kwargs)
+        except Exception:
+            self.after_call(probe, failed=True)
+            raise
+        self.after_call(probe, failed=perf_counter() - started > self.slow_call_seconds)
+        return result
+
+    async def acall(self, func, *args, **kwargs):
+        """Async variant of ``call`` for a coroutine function ``func``."""
+        try:
+            probe = await self.abefore_call()
+        except RedisError:
+            # TODO: Logging
+            with self.fallback.calling():
+                return await func(*args, **kwargs)
+
+        started = perf_counter()
+        try:
+            result = await func(*args, **kwargs)
+        except Exception:
+            await self.aafter_call(probe, failed=True)
+            raise
+        await self.aafter_call(probe, failed=perf_counter() - started > self.slow_call_seconds)
+        return result
+
+
+auth_service_circuit_breaker = SharedCircuitBreaker(name="auth_service")
@@ -0,0 +1,108 @@
+from math import sqrt
+from threading import Lock
+
+from django.conf import settings
+
+# Factor applied to the limit when a request fails
+BACKOFF_RATIO = 0.9
+# Requests averaged by the short-term latency
+SHORT_WINDOW = 10
+
+
+class AdaptiveConcurrencyLimiter:
+    """
+    Caps the requests a process handles at once, with a limit that follows latency.
+
+    The limit is adjusted after every request from two moving averages of
+    the latency: a long-term one (about ``long_window`` requests), taken as
+    the latency of the process when it is not overloaded, and a short-term
+    one. While the short-term latency stays within ``tolerance`` times the
+    long-term one the limit grows by its square root; beyond, it shrinks in
+    proportion (by at most half). ``smoothing`` damps every change. A failed
+    request cuts the limit by 10%. The limit only grows while at least half
+    of it is in use, so an idle process does not inflate it.
+
+    Requests over the limit are rejected right away instead of queueing
+    behind slow ones, which keeps the latency of the admitted requests low.
+    The threads (gthread) or greenlets (gevent) of a gunicorn worker are a
+    hard limit of their own, past which requests queue in gunicorn without
+    reaching this one: the limiter sheds load only while its limit is below
+    them, hence ``max_limit`` should not exceed them. Uvicorn workers take
+    every connection, so there ``max_limit`` alone bounds the requests in
+    flight.
+    """
+
+    def __init__(
+        self,
+        enabled=settings.CONCURRENCY_LIMIT_ENABLED,
+        initial_limit=settings.CONCURRENCY_LIMIT_INITIAL,
+        min_limit=settings.CONCURRENCY_LIMIT_MIN,
+        max_limit=settings.CONCURRENCY_LIMIT_MAX,
+        smoothing=settings.CONCURRENCY_LIMIT_SMOOTHING,
+        tolerance=settings.CONCURRENCY_LIMIT_TOLERANCE,
+        long_window=settings.CONCURRENCY_LIMIT_LONG_WINDOW,
+    ):
+        self.enabled = enabled
+        self.max_limit = max_limit
+        self.min_limit = min(min_limit, max_limit)
+        self.limit = float(min(max(initial_limit, self.min_limit), max_limit))
+        self.smoothing = smoothing
+        self.tolerance = tolerance
+        self.long_alpha = 2 / (long_window + 1)
+        self.short_alpha = 2 / (SHORT_WINDOW + 1)
+        self.in_flight = 0
+        self._long_latency = None
+        self._short_latency = None
+        self._lock = Lock()
+
+    def try_acquire(self):
+        """
+        Takes a slot for a request.
+
+        Returns:
+            bool: False if the limit is reached and the request must be rejected.
+        """
+        if not self.enabled:
+            return True
+        with self._lock:
+            if self.in_flight >= int(self.limit):
+                return False
+            self.in_flight += 1
+            return True
+
+    def release(self, latency, failed=False):
+        """
+        Frees the slot of a finished request and adjusts the limit.
+
+        Args:
+            latency (float): Seconds the request took.
+            failed (bool): Whether the request failed (server error).
+        """
+        if not self.enabled:
+            return
+        with self._lock:
+            in_flight = self.in_flight
+            self.in_flight -= 1
+
+            if failed:
+                self.limit = max(self.min_limit, self.limit * BACKOFF_RATIO)
+                return
+
+            if self._long_latency is None:
+                self._long_latency = self._short_latency = latency
+                return
+            self._long_latency += self.long_alpha * (latency - self._long_latency)
+            self._short_latency += self.short_alpha * (latency - self._short_latency)
+
+            if in_flight < self.limit / 2:
+                return
+
+            gradient = max(0.5, min(1.0, self.tolerance * self._long_latency / max(self._short_latency, 1e-9)))
+            new_limit = self.limit * gradient + sqrt(self.limit)
+            self.limit = min(
+                self.max_limit,
+                max(self.min_limit, self.limit + self.smoothing * (new_limit - self.limit)),
+            )
+
+
+concurrency_limiter = AdaptiveConcurrencyLimiter()
@@ -1,11 +1,29 @@
 from django.conf import settings
-from jwt import decode
+from jwt import PyJWT
+
+from .keyring import KeyRing
+
+ALGORITHMS = ["RS256"]
+DECODE_OPTIONS = {
+    "verify_signature": True,
+    "verify_exp": True,
+}
+
+# Reused across calls: keys are parsed once and options are built once
+keyring = KeyRing(
+    path=settings.JWT_PUBLIC_KEY_PATH,
+    reload_interval=settings.JWT_KEYRING_RELOAD_INTERVAL,
+    default_kid=settings.JWT_DEFAULT_KID,
+)
+_decoder = PyJWT(options=DECODE_OPTIONS)
 
 
 def decode_token(token):
     """
     Decodes the JWT token using the public key and specified algorithm.
 
+    The public key is picked from the keyring by the token's ``kid`` header.
+
     Args:
         token (str): The JWT token to decode.
 
@@ -16,4 +34,4 @@ def decode_token(token):
         ExpiredSignatureError: If the token has expired.
         InvalidTokenError: If the token is invalid.
     """
-    return decode(token, settings.JWT_PUBLIC_KEY, algorithms=["RS256"])
+    return _decoder.decode(token, keyring.get_key(token), algorithms=ALGORITHMS)
@@ -0,0 +1,66 @@
+from django.http import HttpResponse
+from orjson import dumps
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+JSON_CONTENT_TYPE = "application/json"
+
+_fallback_encoder = JSONEncoder()
+
+
+def encode_json(data):
+    """
+    Serializes ``data`` to JSON bytes with orjson.
+
+    Types orjson does not know (lazy translation strings, Decimals, ...) are
+    handled by DRF's encoder.
+
+    Args:
+        data (object): The data to serialize.
+
+    Returns:
+        bytes: The encoded JSON.
+    """
+    return dumps(data, default=_fallback_encoder.default)
+
+
+class FastJSONRenderer(JSONRenderer):
+    """DRF JSON renderer backed by orjson."""
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b""
+        return encode_json(data)
+
+
+class PreEncodedJSON:
+    """A constant JSON body encoded once, at import time."""
+
+    def __init__(self, data, status):
+        """
+        Args:
+            data (dict): The response payload.
+            status (int): The HTTP status code of the response.
+        """
+        self.data = data
+        self.status = status
+        self.body = encode_json(data)
+
+    def response(self, headers=None):
+        """
+        Returns a fresh response carrying the pre-encoded body.
+
+        Works both in DRF and in plain (sync or async) Django views.
+
+        Args:
+            headers (dict, optional): Extra response headers.
+
+        Returns:
+            HttpResponse: The response object.
+        """
+        return HttpResponse(
+            self.body,
+            content_type=JSON_CONTENT_TYPE,
+            status=self.status,
+            headers=headers,
+        )
@@ -0,0 +1,120 @@
+import os
+from pathlib import Path
+from threading import Lock, Thread
+from time import monotonic
+
+from cryptography.hazmat.primitives.serialization import load_pem_public_key
+from jwt import InvalidTokenError, get_unverified_header
+
+# File suffixes considered public keys when the key path is a directory
+KEY_FILE_SUFFIXES = (".pem", ".key", ".pub")
+
+
+class KeyRing:
+    """
+    Pre-parsed JWT public keys indexed by ``kid``.
+
+    ``path`` is either a single PEM file or a directory of PEM files, in which
+    case each file stem is used as the ``kid``. Files are re-checked at most
+    every ``reload_interval`` seconds from a background thread, and the key
+    map is swapped atomically, so requests never wait on disk I/O or parsing.
+    """
+
+    def __init__(self, path, reload_interval=30, default_kid=None):
+        """
+        Args:
+            path (str): Path to a PEM public key or a directory of them.
+            reload_interval (int): Seconds between checks for changed key files.
+            default_kid (str, optional): Key used for tokens without a ``kid`` header.
+        """
+        self.path = Path(path)
+        self.is_directory = self.path.is_dir()
+        self.reload_interval = reload_interval
+        self.default_kid = default_kid
+
+        self._keys = {}
+        self._default_key = None
+        self._mtimes = {}
+        self._next_check = 0
+        self._reload_lock = Lock()
+        self.load()
+
+    def _key_files(self):
+        if self.is_directory:
+            return sorted(
+                file
+                for file in self.path.iterdir()
+                if file.is_file() and file.suffix in KEY_FILE_SUFFIXES
+            )
+        return [self.path]
+
+    def _current_mtimes(self):
+        return {file: os.stat(file).st_mtime_ns for file in self._key_files()}
+
+    def load(self):
+        """Parses every key file and atomically replaces the key map."""
+        mtimes = self._current_mtimes()
+        keys = {
+            file.stem: load_pem_public_key(file.read_bytes())
+            for file in mtimes
+        }
+
+        if self.default_kid is not None:
+            default_key = keys.get(self.default_kid)
+        elif len(keys) == 1:
+            default_key = next(iter(keys.values()))
+        else:
+            default_key = None
+
+        # Single assignments, so readers always see a consistent snapshot
+        self._keys, self._default_key = keys, default_key
+        self._mtimes = mtimes
+        self._next_check = monotonic() + self.reload_interval
+
+    def maybe_reload(self):
+        """Schedules a background reload if the check interval has elapsed."""
+        if monotonic() < self._next_check:
+            return
+
+        if self._reload_lock.acquire(blocking=False):
+            self._next_check = monotonic() + self.reload_interval
+            Thread(target=self._reload_if_changed, daemon=True).start()
+
+    def _reload_if_changed(self):
+        try:
+            if self._current_mtimes() != self._mtimes:
+                self.load()
+        except (OSError, ValueError):
+            # TODO: Logging
+            # Keep serving the last good key set until the files are fixed
+            pass
+        finally:
+            self._reload_lock.release()
+
+    def get_key(self, token):
+        """
+        Selects the public key for a token by its ``kid`` header.
+
+        A single-file keyring ignores ``kid`` entirely, so the header is only
+        parsed when there is an actual choice to make.
+
+        Args:
+            token (str): The JWT token.
+
+        Returns:
+            RSAPublicKey: The parsed public key.
+
+        Raises:
+            InvalidTokenError: If no key matches the token.
+        """
+        self.maybe_reload()
+
+        keys = self._keys
+        if not self.is_directory:
+            return self._default_key
+
+        kid = get_unverified_header(token).get("kid")
+        key = keys.get(kid) if kid is not None else self._default_key
+        if key is None:
+            raise InvalidTokenError("Unknown signing key.")
+        return key
@@ -0,0 +1,266 @@
+import atexit
+import json
+import os
+from bisect import bisect_left
+from contextlib import nullcontext
+from glob import glob
+from threading import Event, Thread
+from time import perf_counter
+
+from django.conf import settings
+
+# Upper bounds (seconds) of the stage duration histogram buckets
+STAGE_BUCKETS = (
+    0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005,
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+    0.1, 0.25, 0.5, 1.0, 2.5, 5.0,
+)
+
+STAGE_METRIC = "otp_stage_duration_seconds"
+STAGE_HELP = "Time spent in each stage of the OTP request path."
+EVENT_METRIC = "otp_events_total"
+EVENT_HELP = "Notable events of the OTP request path."
+CLIENT_METRIC = "otp_client_stats"
+CLIENT_HELP = "Connection pool and hedging counters of the clients of other services."
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+SNAPSHOT_FILE_PATTERN = "metrics_*.json"
+
+# Returned by ``Metrics.timer`` when metrics are disabled
+NULL_TIMER = nullcontext()
+
+
+class StageTimer:
+    """Context manager observing the duration of its block."""
+
+    __slots__ = ("metrics", "stage", "started")
+
+    def __init__(self, metrics, stage):
+        self.metrics = metrics
+        self.stage = stage
+
+    def __enter__(self):
+        self.started = perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        self.metrics.observe(self.stage, perf_counter() - self.started)
+
+
+class Metrics:
+    """
+    Per-process stage histograms and event counters, rendered in Prometheus text format.
+
+    Recording is a bisect and two list increments. They are not guarded by a
+    lock: a lock would double the cost of an observation, while the GIL makes
+    a lost increment a rare, harmless event for metrics. With
+    ``multiproc_dir`` set, every process periodically writes its
+    totals to ``metrics_<pid>.json`` in that directory, and a scrape served by
+    any gunicorn worker merges the files of all workers.
+    """
+
+    def __init__(
+        self,
+        enabled=settings.METRICS_ENABLED,
+        multiproc_dir=settings.METRICS_MULTIPROC_DIR,
+        flush_interval=settings.METRICS_FLUSH_INTERVAL,
+        buckets=STAGE_BUCKETS,
+    ):
+        self.enabled = enabled
+        self.multiproc_dir = multiproc_dir
+        self.flush_interval = flush_interval
+        self.buckets = buckets
+
+        # client -> callable returning its counters, see ``register_collector``
+        self._collectors = {}
+        self._reset()
+        os.register_at_fork(after_in_child=self._reset)
+        atexit.register(self.flush)
+
+    def _reset(self):
+        """Drops the totals; forked workers must not report the parent's numbers again."""
+        # stage -> [count of every bucket..., count above the last bucket, sum]
+        self._stages = {}
+        # event -> count
+        self._events = {}
+        self._flusher = None
+        self._stop = Event()
+
+    def timer(self, stage):
+        """
+        Returns a context manager observing the duration of its block.
+
+        Args:
+            stage (str): The stage name.
+
+        Returns:
+            StageTimer: The timer.
+        """
+        if not self.enabled:
+            return NULL_TIMER
+        return StageTimer(self, stage)
+
+    def observe(self, stage, seconds):
+        """
+        Records one stage duration.
+
+        Args:
+            stage (str): The stage name.
+            seconds (float): The measured duration.
+        """
+        if not self.enabled:
+            return
+
+        counts = self._stages.get(stage)
+        if counts is None:
+            counts = self._new_series(self._stages, stage, [0] * (len(self.buckets) + 1) + [0.0])
+
+        counts[bisect_left(self.buckets, seconds)] += 1
+        counts[-1] += seconds
+
+    def increment(self, event, amount=1):
+        """
+        Increments an event counter.
+
+        Args:
+            event (str): The event name.
+            amount (int): The increment.
+        """
+        if not self.enabled:
+            return
+
+        if event not in self._events:
+            self._new_series(self._events, event, 0)
+        self._events[event] += amount
+
+    def register_collector(self, client, collect):
+        """
+        Registers counters kept by a client itself, read whenever the totals are.
+
+        Args:
+            client (str): The client name.
+            collect (callable): Returns the counters of the client in this process as a dict.
+        """
+        self._collectors[client] = collect
+
+    def _collect_clients(self):
+        if not self.enabled:
+            return {}
+        return {client: dict(collect()) for client, collect in list(self._collectors.items())}
+
+    def _new_series(self, series, name, initial):
+        # First observation of a series in this process, the only moment the
+        # background flusher has to be looked after
+        if self.multiproc_dir and self._flusher is None:
+            self._start_flusher()
+        return series.setdefault(name, initial)
+
+    def _start_flusher(self):
+        self._flusher = Thread(target=self._flush_periodically, name="metrics-flush", daemon=True)
+        self._flusher.start()
+
+    def _flush_periodically(self):
+        stop = self._stop
+        while not stop.wait(self.flush_interval):
+            self.flush()
+
+    def snapshot(self):
+        """
+        Returns a copy of the totals of this process.
+
+        Returns:
+            dict: ``stages``, ``events`` and ``clients``.
+        """
+        return {
+            "stages": {stage: list(counts) for stage, counts in list(self._stages.items())},
+            "events": dict(self._events),
+            "clients": self._collect_clients(),
+        }
+
+    def snapshot_path(self, pid=None):
+        """Returns the snapshot file of a process in the multiprocess directory."""
+        return os.path.join(self.multiproc_dir, f"metrics_{pid or os.getpid()}.json")
+
+    def flush(self):
+        """Writes the totals of this process to the multiprocess directory."""
+        if not self.multiproc_dir or not (self._stages or self._events):
+            return
+
+        path = self.snapshot_path()
+        temporary_path = f"{path}.tmp"
+        try:
+            with open(temporary_path, "w") as snapshot_file:
+                json.dump(self.snapshot(), snapshot_file)
+            os.replace(temporary_path, path)
+        except OSError:
+            # TODO: Logging
+            pass
+
+    def collect(self):
+        """
+        Merges the totals of this process with those of every other process.
+
+        Snapshots of exited workers are kept, so counters never go backwards
+        while the directory lives; clear it when the service (re)starts.
+
+        Returns:
+            dict: ``stages``, ``events`` and ``clients`` summed over all processes.
+        """
+        merged = self.snapshot()
+        if not self.multiproc_dir:
+            return merged
+
+        own_path = self.snapshot_path()
+        for path in glob(os.path.join(self.multiproc_dir, SNAPSHOT_FILE_PATTERN)):
+            if path == own_path:
+                continue
+            try:
+                with open(path) as snapshot_file:
+                    snapshot = json.load(snapshot_file)
+            except (OSError, ValueError):
+                # TODO: Logging
+                continue
+
+            for stage, counts in snapshot["stages"].items():
+                totals = merged["stages"].setdefault(stage, [0] * len(counts))
+                for index, value in enumerate(counts):
+                    totals[index] += value
+            for event, count in snapshot["events"].items():
+                merged["events"][event] = merged["events"].get(event, 0) + count
+            for client, stats in snapshot.get("clients", {}).items():
+                totals = merged["clients"].setdefault(client, {})
+                for stat, value in stats.items():
+                    totals[stat] = totals.get(stat, 0) + value
+        return merged
+
+    def render(self):
+        """
+        Renders the merged metrics in the Prometheus text exposition format.
+
+        Returns:
+            str: The metrics page.
+        """
+        collected = self.collect()
+        bounds = [repr(bound) for bound in self.buckets] + ["+Inf"]
+
+        lines = [f"# HELP {STAGE_METRIC} {STAGE_HELP}", f"# TYPE {STAGE_METRIC} histogram"]
+        for stage, counts in sorted(collected["stages"].items()):
+            cumulative = 0
+            for bound, count in zip(bounds, counts):
+                cumulative += count
+                lines.append(f'{STAGE_METRIC}_bucket{{stage="{stage}",le="{bound}"}} {cumulative}')
+            lines.append(f'{STAGE_METRIC}_sum{{stage="{stage}"}} {counts[-1]}')
+            lines.append(f'{STAGE_METRIC}_count{{stage="{stage}"}} {cumulative}')
+
+        lines += [f"# HELP {EVENT_METRIC} {EVENT_HELP}", f"# TYPE {EVENT_METRIC} counter"]
+        for event, count in sorted(collected["events"].items()):
+            lines.append(f'{EVENT_METRIC}{{event="{event}"}} {count}')
+
+        lines += [f"# HELP {CLIENT_METRIC} {CLIENT_HELP}", f"# TYPE {CLIENT_METRIC} gauge"]
+        for client, stats in sorted(collected["clients"].items()):
+            for stat, value in sorted(stats.items()):
+                lines.append(f'{CLIENT_METRIC}{{client="{client}",stat="{stat}"}} {value}')
+        return "\n".join(lines) + "\n"
+
+
+metrics = Metrics()
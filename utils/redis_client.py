@@ -1,61 +1,883 @@
-from traceback import print_exc
+import os
+from collections import defaultdict
+from threading import Lock
+from time import time
 
 from redis import Redis as _Redis
 from redis import (
     ConnectionPool,
     ConnectionError,
 )
+from redis.cluster import ClusterNode, RedisCluster as _RedisCluster
+from redis.crc import key_slot
+from redis.exceptions import RedisClusterException
 from django.conf import settings
 
 
-class Redis(_Redis):
+# Status codes returned by ``OTPCommandsMixin.verify_otp``
+OTP_VERIFIED = 0
+OTP_MISSING = 1
+OTP_MISMATCH = 2
+OTP_LOCKED = 3
+
+# Packed OTP value: expiry timestamp (seconds) * OTP_PACK_FACTOR + code.
+# Stays below 2**53, so Lua numbers (doubles) unpack it exactly; codes have
+# at most 6 digits. The Lua scripts below hardcode the same factor.
+OTP_PACK_FACTOR = 10**6
+# Hash field holding the time a bucket was last swept of expired codes
+OTP_SWEEP_FIELD = "s"
+
+# Lua helpers for OTP buckets: hashes of packed code values keyed by the
+# rest of the phone number. Hash fields have no TTL of their own, so every
+# value carries its expiry; the bucket key itself lives for one OTP TTL
+# after its last write and expired fields are swept at most once per TTL.
+OTP_BUCKET_LUA = """
+local function unpack_otp(packed, now)
+    packed = tonumber(packed)
+    if packed and math.floor(packed / 1000000) > now then
+        return packed % 1000000
+    end
+    return nil
+end
+
+local function store_otps(key, entries, ttl, now)
+    redis.call('HSET', key, unpack(entries))
+    redis.call('EXPIRE', key, ttl)
+    local swept = tonumber(redis.call('HGET', key, 's') or '0')
+    if now - swept >= ttl then
+        local fields = redis.call('HGETALL', key)
+        for i = 1, #fields, 2 do
+            if fields[i] ~= 's' and not unpack_otp(fields[i + 1], now) then
+                redis.call('HDEL', key, fields[i])
+            end
+        end
+        redis.call('HSET', key, 's', now)
+    end
+end
+"""
+
+# KEYS: otp bucket key
+# ARGV: otp TTL, now in seconds, then field and packed value pairs
+STORE_OTPS_SCRIPT = OTP_BUCKET_LUA + """
+store_otps(KEYS[1], {unpack(ARGV, 3)}, tonumber(ARGV[1]), tonumber(ARGV[2]))
+return #ARGV / 2 - 1
+"""
+
+# KEYS: otp bucket key, optionally the legacy otp key
+# ARGV: field, now in seconds
+GET_OTP_SCRIPT = OTP_BUCKET_LUA + """
+local code = unpack_otp(redis.call('HGET', KEYS[1], ARGV[1]), tonumber(ARGV[2]))
+if code then
+    return string.format('%d', code)
+end
+if KEYS[2] then
+    return redis.call('GET', KEYS[2])
+end
+return nil
+"""
+
+# KEYS: otp bucket key, attempts key, optionally the legacy otp key
+# ARGV: field, provided otp, max attempts, attempts counter TTL, now in seconds
+VERIFY_OTP_SCRIPT = OTP_BUCKET_LUA + """
+local max_attempts = tonumber(ARGV[3])
+local attempts = tonumber(redis.call('GET', KEYS[2]) or '0')
+if attempts >= max_attempts then
+    return 3
+end
+
+local stored = nil
+local code = unpack_otp(redis.call('HGET', KEYS[1], ARGV[1]), tonumber(ARGV[5]))
+if code then
+    stored = string.format('%d', code)
+elseif KEYS[3] then
+    stored = redis.call('GET', KEYS[3])
+end
+if not stored then
+    return 1
+end
+
+local function delete_otp()
+    redis.call('HDEL', KEYS[1], ARGV[1])
+    if KEYS[3] then
+        redis.call('DEL', KEYS[3])
+    end
+end
+
+if stored == ARGV[2] then
+    delete_otp()
+    redis.call('DEL', KEYS[2])
+    return 0
+end
+
+attempts = redis.call('INCR', KEYS[2])
+if attempts == 1 then
+    redis.call('EXPIRE', KEYS[2], ARGV[4])
+end
+if attempts >= max_attempts then
+    delete_otp()
+    return 3
+end
+return 2
+"""
+
+# Status codes returned by ``OTPCommandsMixin.send_otp``
+OTP_SEND_CREATED = 0
+OTP_SEND_DUPLICATE = 1
+OTP_SEND_RATE_LIMITED = 2
+OTP_SEND_REJECTED = 3
+
+# Lua helper: token buckets checked (and consumed) all-or-nothing.
+# ``args`` holds capacity and refill period in ms for every key. Returns 0
+# when allowed, otherwise the wait in ms until a token is available.
+TAKE_TOKENS_LUA = """
+local function take_tokens(keys, args, now)
+    local tokens = {}
+    local retry_after = 0
+
+    for i, key in ipairs(keys) do
+        local capacity = tonumber(args[i * 2 - 1])
+        local period = tonumber(args[i * 2])
+        local bucket = redis.call('HMGET', key, 'tokens', 'ts')
+        local available = tonumber(bucket[1]) or capacity
+        local updated_at = tonumber(bucket[2]) or now
+        available = math.min(capacity, available + (now - updated_at) * capacity / period)
+        if available < 1 then
+            retry_after = math.max(retry_after, math.ceil((1 - available) * period / capacity))
+        end
+        tokens[i] = available
+    end
+
+    if retry_after > 0 then
+        return retry_after
+    end
+
+    for i, key in ipairs(keys) do
+        redis.call('HSET', key, 'tokens', tokens[i] - 1, 'ts', now)
+        redis.call('PEXPIRE', key, args[i * 2])
+    end
+    return 0
+end
+"""
+
+# KEYS: bucket keys
+# ARGV: now in ms, then capacity and refill period in ms for every key
+RATE_LIMIT_SCRIPT = TAKE_TOKENS_LUA + """
+return take_tokens(KEYS, {unpack(ARGV, 2)}, tonumber(ARGV[1]))
+"""
+
+# KEYS: otp bucket key, dedupe key, then bucket keys
+# ARGV: field, packed otp, otp TTL, dedupe window (0 disables it), admitted (0 or 1),
+#       now in ms, then bucket args
+# Returns {status, value}: the live OTP for duplicates, the wait in ms when rate limited.
+SEND_OTP_SCRIPT = TAKE_TOKENS_LUA + OTP_BUCKET_LUA + """
+local now = math.floor(tonumber(ARGV[6]) / 1000)
+local window = tonumber(ARGV[4])
+if window > 0 and redis.call('EXISTS', KEYS[2]) == 1 then
+    local live = unpack_otp(redis.call('HGET', KEYS[1], ARGV[1]), now)
+    if live then
+        return {1, string.format('%d', live)}
+    end
+end
+if ARGV[5] == '0' then
+    return {3, 0}
+end
+
+local bucket_keys = {}
+for i = 3, #KEYS do
+    bucket_keys[#bucket_keys + 1] = KEYS[i]
+end
+local retry_after = take_tokens(bucket_keys, {unpack(ARGV, 7)}, tonumber(ARGV[6]))
+if retry_after > 0 then
+    return {2, retry_after}
+end
+
+store_otps(KEYS[1], {ARGV[1], ARGV[2]}, tonumber(ARGV[3]), now)
+if window > 0 then
+    redis.call('SET', KEYS[2], 1, 'EX', window)
+end
+return {0, 0}
+"""
+
+# KEYS: campaign hash, seen set, lock
+# ARGV: lock owner, lock TTL, campaign TTL, offset, then the increments of
+#       rows, queued, invalid, duplicate and rate_limited, then the phone
+#       numbers the chunk is done with
+# Returns 0 when the lock was lost, 1 otherwise. Marking the numbers as seen
+# and moving the checkpoint past them happen together, so a resumed
+# campaign neither skips nor repeats a checkpointed number.
+CHECKPOINT_CAMPAIGN_SCRIPT = """
+if redis.call('GET', KEYS[3]) ~= ARGV[1] then
+    return 0
+end
+local ttl = tonumber(ARGV[3])
+if #ARGV > 9 then
+    redis.call('SADD', KEYS[2], unpack(ARGV, 10))
+    redis.call('EXPIRE', KEYS[2], ttl)
+end
+redis.call('HSET', KEYS[1], 'offset', ARGV[4])
+redis.call('HINCRBY', KEYS[1], 'rows', ARGV[5])
+redis.call('HINCRBY', KEYS[1], 'queued', ARGV[6])
+redis.call('HINCRBY', KEYS[1], 'invalid', ARGV[7])
+redis.call('HINCRBY', KEYS[1], 'duplicate', ARGV[8])
+redis.call('HINCRBY', KEYS[1], 'rate_limited', ARGV[9])
+redis.call('EXPIRE', KEYS[1], ttl)
+redis.call('EXPIRE', KEYS[3], ARGV[2])
+return 1
+"""
+
+# KEYS: lock
+# ARGV: lock owner
+RELEASE_LOCK_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+
+def slot_tag(value: str):
+    """
+    Wraps ``value`` in a Redis Cluster hash tag.
+
+    Every key containing the same tag hashes to the same slot, so an OTP,
+    its attempt counter, its dedupe key and its per-number rate limit can
+    be used together by one script or pipeline on one shard.
+    """
+    return f"{{{value}}}"
+
+
+def otp_location(phone_number: str):
+    """
+    Splits a phone number into its OTP bucket and its field in that bucket.
+
+    The digits are read as one integer: the remainder modulo
+    ``OTP_STORAGE_BUCKETS`` picks the bucket, the quotient is the field, so
+    both are small integers Redis stores in their packed integer encoding.
+
+    Args:
+        phone_number (str): The phone number, e.g. ``+989123456789``.
+
+    Returns:
+        tuple: The bucket number and the field.
+    """
+    field, bucket = divmod(int(phone_number.lstrip("+")), settings.OTP_STORAGE_BUCKETS)
+    return bucket, field
+
+
+def phone_tag(phone_number: str):
+    """Returns the hash tag shared by every key of a phone number: the tag of its OTP bucket."""
+    return slot_tag(otp_location(phone_number)[0])
+
+
+def phone_key(prefix: str, phone_number: str):
+    """Returns the ``prefix`` key of a phone number, on the slot of its OTP bucket."""
+    return f"{prefix}:{phone_tag(phone_number)}:{phone_number}"
+
+
+def otp_key(phone_number: str):
+    """Returns the OTP bucket key and the hash field of a phone number."""
+    bucket, field = otp_location(phone_number)
+    return f"otp:{slot_tag(bucket)}", field
+
+
+def legacy_otp_key(phone_number: str):
+    """Returns the one-key-per-number OTP key used before the compact format."""
+    return f"otp:{phone_number}"
+
+
+def otp_attempts_key(phone_number: str):
+    return phone_key("otp_attempts", phone_number)
+
+
+def delivery_key(channel_name: str, recipient: str):
+    return f"delivery:{channel_name}:{recipient}"
+
+
+def delivered_count_key(channel_name: str):
+    """Counter of the messages of a channel the workers have sent (or given up on)."""
+    return f"delivered:{channel_name}"
+
+
+def campaign_keys(campaign_id: str):
+    """Returns the progress hash, the seen numbers set and the lock key of a campaign, all on one slot."""
+    key = f"campaign:{slot_tag(campaign_id)}"
+    return key, f"{key}:seen", f"{key}:lock"
+
+
+def pack_otp(otp_code: str, expires_at: int):
+    """
+    Packs an OTP and its expiry timestamp into a single integer.
+
+    Args:
+        otp_code (str): The OTP, at most 6 digits.
+        expires_at (int): Unix time in seconds the OTP expires at.
+
+    Returns:
+        int: The packed value.
+
+    Raises:
+        ValueError: If the OTP is not a number of at most 6 digits.
+    """
+    code = int(otp_code)
+    if not 0 <= code < OTP_PACK_FACTOR:
+        raise ValueError(f"OTP {otp_code!r} does not fit the packed format.")
+    return expires_at * OTP_PACK_FACTOR + code
+
+
+class OTPCommandsMixin:
+    """
+    OTP helpers shared by the sync and the asyncio Redis clients.
+
+    The helpers only build commands, so on ``redis.asyncio`` clients they
+    return awaitables instead of results.
+
+    Keys of one phone number share a hash tag, so the same helpers work on a
+    single node and on Redis Cluster (``cluster_mode``), where every script
+    and pipeline runs per shard.
+    """
+
+    cluster_mode = False
+    # Whether pipelines can run registered scripts (EVALSHA, loading them on
+    # NOSCRIPT); otherwise the script source is sent with every call
+    pipeline_scripts = False
+
+    def _legacy_keys(self, phone_number: str):
+        # Codes of the previous format are only looked up on a single node,
+        # their keys are not on the slot of the bucket
+        if settings.OTP_STORAGE_LEGACY_FALLBACK and not self.cluster_mode:
+            return [legacy_otp_key(phone_number)]
+        return []
 
     def get_otp(self, phone_number: str):
-        return self.get(name=f"otp:{phone_number}")
+        """Returns the live OTP of a number as bytes, None if there is none."""
+        key, field = otp_key(phone_number)
+        return self.get_script("get_otp", GET_OTP_SCRIPT)(
+            keys=[key] + self._legacy_keys(phone_number),
+            args=[field, int(time())],
+        )
 
     def set_otp(
         self,
         phone_number: str,
         otp_code: str,
     ):
-        return self.set(
-            name=f"otp:{phone_number}",
-            value=otp_code,
-            ex=settings.OTP_TTL_SECONDS,
-        )
-    
+        return self.set_otps({phone_number: otp_code})
+
     def delete_otp(
         self,
         phone_number: str,
     ):
-        return self.delete(f"otp:{phone_number}")
+        return self.delete_otps([phone_number])
+
+    def delete_otps(self, phone_numbers: list):
+        """Deletes the OTPs of many numbers in a single pipelined round trip."""
+        pipe = self.pipeline(transaction=False)
+        for phone_number in phone_numbers:
+            key, field = otp_key(phone_number)
+            pipe.hdel(key, field)
+            for legacy_key in self._legacy_keys(phone_number):
+                pipe.delete(legacy_key)
+        return pipe.execute()
+
+    def set_otps(self, otps: dict):
+        """Stores many ``{phone_number: otp_code}`` pairs in a single pipelined round trip."""
+        expires_at = int(time()) + settings.OTP_TTL_SECONDS
+        return self.store_packed_otps({
+            phone_number: pack_otp(otp_code, expires_at)
+            for phone_number, otp_code in otps.items()
+        })
+
+    def store_packed_otps(self, packed_otps: dict):
+        """
+        Stores ``{phone_number: packed_otp}`` pairs (see ``pack_otp``) in a single pipelined round trip.
+
+        Numbers are grouped by bucket, so each bucket is written by one
+        script call whatever the number of its codes.
+        """
+        now = int(time())
+        ttl = settings.OTP_TTL_SECONDS
+        buckets = defaultdict(list)
+        for phone_number, packed_otp in packed_otps.items():
+            key, field = otp_key(phone_number)
+            buckets[key].extend((field, packed_otp))
+
+        store_otps = self.get_script("store_otps", STORE_OTPS_SCRIPT)
+        pipe = self.pipeline(transaction=False)
+        for key, entries in buckets.items():
+            if self.pipeline_scripts:
+                store_otps(keys=[key], args=[ttl, now] + entries, client=pipe)
+            else:
+                pipe.eval(STORE_OTPS_SCRIPT, 1, key, ttl, now, *entries)
+        return pipe.execute()
+
+    def verify_otp(
+        self,
+        phone_number: str,
+        otp_code: str,
+    ):
+        """
+        Atomically checks an OTP in a single round trip.
+
+        The OTP is deleted on a match. A mismatch increments the per-number
+        attempt counter, and once ``OTP_MAX_VERIFY_ATTEMPTS`` is reached the
+        OTP is deleted and verification stays locked for ``OTP_VERIFY_LOCK_SECONDS``.
+
+        Returns:
+            int: One of ``OTP_VERIFIED``, ``OTP_MISSING``, ``OTP_MISMATCH`` or ``OTP_LOCKED``.
+        """
+        key, field = otp_key(phone_number)
+        return self.get_script("verify_otp", VERIFY_OTP_SCRIPT)(
+            keys=[key, otp_attempts_key(phone_number)] + self._legacy_keys(phone_number),
+            args=[
+                field,
+                otp_code,
+                settings.OTP_MAX_VERIFY_ATTEMPTS,
+                settings.OTP_VERIFY_LOCK_SECONDS,
+                int(time()),
+            ],
+        )
+
+    def send_otp(
+        self,
+        phone_number: str,
+        otp_code: str,
+        dedupe_key: str,
+        window: int,
+        limits: list = (),
+        admitted: bool = True,
+    ):
+        """
+        Stores a new OTP unless the send is a duplicate or rate limited, in one round trip.
+
+        A send is a duplicate while ``dedupe_key`` (set by the previous send)
+        is alive and the number still has a live OTP; that OTP is returned
+        instead of storing a new one. Duplicates are detected even when the
+        send was not ``admitted``, e.g. by admission control; other sends are
+        then rejected without consuming any token.
+
+        Args:
+            phone_number (str): The recipient phone number.
+            otp_code (str): The newly generated OTP.
+            dedupe_key (str): Key marking recent sends (per number or per ``Idempotency-Key``).
+            window (int): Seconds the dedupe key lives, 0 disables deduplication.
+            limits (list): ``(key, capacity, period_seconds)`` token buckets to consume.
+            admitted (bool): Whether a new OTP may be stored.
+
+        Returns:
+            list: ``[status, value]`` where status is one of ``OTP_SEND_CREATED``,
+            ``OTP_SEND_DUPLICATE``, ``OTP_SEND_RATE_LIMITED`` or ``OTP_SEND_REJECTED``.
+        """
+        keys, args = self._send_otp_call(phone_number, otp_code, dedupe_key, window, limits, admitted)
+        return self.get_script("send_otp", SEND_OTP_SCRIPT)(keys=keys, args=args)
+
+    def send_otps(self, sends: list):
+        """
+        Runs ``send_otp`` for many numbers in a single pipelined round trip.
+
+        Each send is checked and stored on its own, in order, so a caller
+        bucket shared by the sends is drained one token per number.
+
+        Args:
+            sends (list): ``send_otp`` keyword arguments, one dict per number.
+
+        Returns:
+            list: The ``[status, value]`` of every send, in order.
+        """
+        send_otp = self.get_script("send_otp", SEND_OTP_SCRIPT)
+        pipe = self.pipeline(transaction=False)
+        for send in sends:
+            keys, args = self._send_otp_call(**send)
+            if self.pipeline_scripts:
+                send_otp(keys=keys, args=args, client=pipe)
+            else:
+                pipe.eval(SEND_OTP_SCRIPT, len(keys), *keys, *args)
+        return pipe.execute()
+
+    def _send_otp_call(self, phone_number, otp_code, dedupe_key, window, limits=(), admitted=True):
+        bucket_key, field = otp_key(phone_number)
+        packed_otp = pack_otp(otp_code, int(time()) + settings.OTP_TTL_SECONDS)
+        keys = [bucket_key, dedupe_key] + [f"rate:{key}" for key, _, _ in limits]
+        args = [field, packed_otp, settings.OTP_TTL_SECONDS, window, int(admitted)] + self._rate_limit_args(limits)
+        return keys, args
+
+    def split_limits_by_slot(self, phone_number: str, limits: list):
+        """
+        Separates the buckets ``send_otp`` can take atomically from the others.
+
+        On Redis Cluster a script may only touch keys of one slot, so buckets
+        that do not carry the number's tag (e.g. the per-caller one)
+        have to be consumed with ``consume_rate_limits`` beforehand.
+
+        Args:
+            phone_number (str): The recipient phone number.
+            limits (list): ``(key, capacity, period_seconds)`` token buckets.
+
+        Returns:
+            tuple: Buckets for ``send_otp`` and buckets to consume separately.
+        """
+        if not self.cluster_mode:
+            return list(limits), []
+
+        slot = key_slot(otp_key(phone_number)[0].encode("utf-8"))
+        same_slot, other_slot = [], []
+        for limit in limits:
+            if key_slot(f"rate:{limit[0]}".encode("utf-8")) == slot:
+                same_slot.append(limit)
+            else:
+                other_slot.append(limit)
+        return same_slot, other_slot
+
+    def consume_rate_limits(self, limits: list):
+        """
+        Takes one token from every bucket in a single atomic round trip.
+
+        Nothing is consumed unless every bucket has a token available.
+
+        Args:
+            limits (list): ``(key, capacity, period_seconds)`` tuples.
+
+        Returns:
+            int: 0 when allowed, otherwise milliseconds until the request may be retried.
+        """
+        return self.get_script("rate_limit", RATE_LIMIT_SCRIPT)(
+            keys=[f"rate:{key}" for key, _, _ in limits],
+            args=self._rate_limit_args(limits),
+        )
+
+    def consume_rate_limits_many(self, limit_sets: list):
+        """
+        Runs ``consume_rate_limits`` for many sets of buckets in a single pipelined round trip.
+
+        Args:
+            limit_sets (list): Lists of ``(key, capacity, period_seconds)`` tuples.
+
+        Returns:
+            list: 0 or the wait in milliseconds of every set, in order.
+        """
+        rate_limit = self.get_script("rate_limit", RATE_LIMIT_SCRIPT)
+        pipe = self.pipeline(transaction=False)
+        for limits in limit_sets:
+            keys = [f"rate:{key}" for key, _, _ in limits]
+            args = self._rate_limit_args(limits)
+            if self.pipeline_scripts:
+                rate_limit(keys=keys, args=args, client=pipe)
+            else:
+                pipe.eval(RATE_LIMIT_SCRIPT, len(keys), *keys, *args)
+        return pipe.execute()
+
+    @staticmethod
+    def _rate_limit_args(limits):
+        args = [int(time() * 1000)]
+        for _, capacity, period in limits:
+            args.extend((capacity, int(period * 1000)))
+        return args
+
+    def get_script(self, name: str, source: str):
+        """Returns the Lua script registered on this client under ``name``, registering it once."""
+        scripts = self.__dict__.setdefault("_registered_scripts", {})
+        if name not in scripts:
+            scripts[name] = self.register_script(source)
+        return scripts[name]
+
+    def spill_tasks(self, messages: list):
+        """Appends serialized task signatures the publisher could not buffer to the spill stream."""
+        pipe = self.pipeline(transaction=False)
+        for message in messages:
+            pipe.xadd(
+                settings.PUBLISHER_SPILL_STREAM,
+                {"signature": message},
+                maxlen=settings.PUBLISHER_SPILL_MAXLEN,
+                approximate=True,
+            )
+        return pipe.execute()
+
+    def claim_spilled_tasks(self, count: int):
+        """
+        Takes up to ``count`` of the oldest spilled tasks off the stream.
+
+        Entries are claimed by deleting them: only the process whose XDEL
+        removed an entry gets it, so concurrent publishers never publish the
+        same task twice.
+
+        Returns:
+            list: The claimed serialized signatures.
+        """
+        entries = self.xrange(settings.PUBLISHER_SPILL_STREAM, count=count)
+        if not entries:
+            return []
+        pipe = self.pipeline(transaction=False)
+        for entry_id, _ in entries:
+            pipe.xdel(settings.PUBLISHER_SPILL_STREAM, entry_id)
+        deleted = pipe.execute()
+        return [fields[b"signature"] for (_, fields), claimed in zip(entries, deleted) if claimed]
+
+    def create_campaign(self, campaign_id: str, fields: dict):
+        """Saves a new campaign with its ``fields`` (file, format, status, ...)."""
+        key, _, _ = campaign_keys(campaign_id)
+        pipe = self.pipeline(transaction=False)
+        pipe.hset(key, mapping=fields)
+        pipe.expire(key, settings.CAMPAIGN_TTL)
+        return pipe.execute()
+
+    def update_campaign(self, campaign_id: str, fields: dict):
+        """Overwrites some fields of a campaign."""
+        key, _, _ = campaign_keys(campaign_id)
+        return self.hset(key, mapping=fields)
+
+    def get_campaign(self, campaign_id: str):
+        """Returns the fields of a campaign, decoded, or an empty dict if it does not exist."""
+        key, _, _ = campaign_keys(campaign_id)
+        return {
+            field.decode("utf-8"): value.decode("utf-8")
+            for field, value in self.hgetall(key).items()
+        }
+
+    def acquire_campaign_lock(self, campaign_id: str, owner: str, ttl: int):
+        """Takes the lock of a campaign so a single runner processes it; returns whether it was taken."""
+        _, _, lock_key = campaign_keys(campaign_id)
+        return bool(self.set(lock_key, owner, nx=True, ex=ttl))
+
+    def release_campaign_lock(self, campaign_id: str, owner: str):
+        """Releases the lock of a campaign if ``owner`` still holds it."""
+        _, _, lock_key = campaign_keys(campaign_id)
+        return self.get_script("release_lock", RELEASE_LOCK_SCRIPT)(keys=[lock_key], args=[owner])
+
+    def filter_unseen_phones(self, campaign_id: str, phone_numbers: list):
+        """Returns the numbers a campaign has not queued yet, in order."""
+        if not phone_numbers:
+            return []
+        _, seen_key, _ = campaign_keys(campaign_id)
+        seen = self.smismember(seen_key, phone_numbers)
+        return [phone_number for phone_number, is_seen in zip(phone_numbers, seen) if not is_seen]
+
+    def checkpoint_campaign(
+        self,
+        campaign_id: str,
+        owner: str,
+        lock_ttl: int,
+        offset: int,
+        counts: dict,
+        phone_numbers: list,
+    ):
+        """
+        Records a processed chunk of a campaign: marks ``phone_numbers`` as
+        seen, adds ``counts`` (rows, queued, invalid, duplicate, rate_limited)
+        to the progress, moves the checkpoint to ``offset`` and extends the lock.
+
+        Returns:
+            bool: False if ``owner`` no longer holds the lock.
+        """
+        return bool(self.get_script("checkpoint_campaign", CHECKPOINT_CAMPAIGN_SCRIPT)(
+            keys=list(campaign_keys(campaign_id)),
+            args=[
+                owner,
+                lock_ttl,
+                settings.CAMPAIGN_TTL,
+                offset,
+                counts.get("rows", 0),
+                counts.get("queued", 0),
+                counts.get("invalid", 0),
+                counts.get("duplicate", 0),
+                counts.get("rate_limited", 0),
+                *phone_numbers,
+            ],
+        ))
+
+    def push_pending(self, buffer_key: str, message: str, status_key: str = None, status: str = None):
+        """
+        Appends a serialized notification to a channel batch buffer and returns the buffer length.
+
+        With ``status_key``, the delivery ``status`` of the message is saved in the same round trip.
+        """
+        if status_key is None:
+            return self.rpush(buffer_key, message)
+        pipe = self.pipeline(transaction=False)
+        pipe.rpush(buffer_key, message)
+        pipe.set(status_key, status, ex=settings.DELIVERY_STATUS_TTL)
+        return pipe.execute()[0]
+
+    def pop_pending(self, buffer_key: str, count: int):
+        """Pops up to ``count`` buffered notifications of a channel (oldest first)."""
+        return self.lpop(buffer_key, count)
+
+    def set_delivery_statuses(self, channel_name: str, statuses: dict):
+        """
+        Saves ``{recipient: encoded status}`` for a channel in a single pipelined
+        round trip, and counts the messages as delivered (see ``delivery_backlog``).
+        """
+        pipe = self.pipeline(transaction=False)
+        for recipient, status in statuses.items():
+            pipe.set(delivery_key(channel_name, recipient), status, ex=settings.DELIVERY_STATUS_TTL)
+        pipe.incrby(delivered_count_key(channel_name), len(statuses))
+        return pipe.execute()
+
+    def get_delivery_statuses(self, channel_name: str, recipients: list):
+        """Returns the encoded delivery statuses of ``recipients`` (None when unknown), in order."""
+        keys = [delivery_key(channel_name, recipient) for recipient in recipients]
+        if self.cluster_mode:
+            # Split by slot, one MGET per node
+            return self.mget_nonatomic(keys)
+        return self.mget(keys)
+
+    def delivery_backlog(self, channel_name: str, buffer_key: str):
+        """
+        Reads the worker-side state of a channel with one round trip.
+
+        Returns:
+            tuple: The number of buffered messages and the delivered messages counter.
+        """
+        pipe = self.pipeline(transaction=False)
+        pipe.llen(buffer_key)
+        pipe.get(delivered_count_key(channel_name))
+        buffered, delivered = pipe.execute()
+        return buffered, int(delivered or 0)
+
+    def revocation_snapshot(self):
+        """
+        Reads the revoked ``jti`` set published by the authentication service.
+
+        The stream position is read before the set, so tailing the stream
+        from it afterwards cannot miss a revocation.
+
+        Returns:
+            tuple: The last revocation stream id and the unexpired revoked ``jti`` values.
+        """
+        last_entries = self.xrevrange(settings.REVOCATION_STREAM_KEY, count=1)
+        last_id = last_entries[0][0] if last_entries else b"0-0"
+        jtis = self.zrangebyscore(settings.REVOCATION_SET_KEY, int(time()), "+inf")
+        return last_id, jtis
+
+    def read_revocations(self, last_id, block_ms: int, count: int = 1000):
+        """
+        Blocks until revocations newer than ``last_id`` are published, or ``block_ms`` elapsed.
+
+        Returns:
+            list: ``(entry_id, fields)`` pairs, empty on timeout.
+        """
+        response = self.xread({settings.REVOCATION_STREAM_KEY: last_id}, count=count, block=block_ms)
+        return response[0][1] if response else []
+
+    def get_revocation(self, jti: str):
+        """Returns the expiry timestamp stored for a revoked ``jti``, None if it is not revoked."""
+        return self.zscore(settings.REVOCATION_SET_KEY, jti)
+
+    def revoke_token(self, jti: str, exp: int):
+        """
+        Publishes a revocation the way the authentication service does.
+
+        The ``jti`` is added to the revoked set (scored by the token expiry,
+        so expired entries can be trimmed) and announced on the stream.
+        """
+        # Both keys share a hash tag; cluster pipelines cannot be transactions
+        pipe = self.pipeline(transaction=False)
+        pipe.zadd(settings.REVOCATION_SET_KEY, {jti: exp})
+        pipe.zremrangebyscore(settings.REVOCATION_SET_KEY, "-inf", int(time()))
+        pipe.xadd(
+            settings.REVOCATION_STREAM_KEY,
+            {"jti": jti, "exp": exp},
+            maxlen=settings.REVOCATION_STREAM_MAXLEN,
+            approximate=True,
+        )
+        return pipe.execute()
+
+    def get_token_validation(self, cache_key: str):
+        """Returns the cached validation flag and its remaining TTL in seconds."""
+        pipe = self.pipeline(transaction=False)
+        pipe.get(name=f"token_validation:{cache_key}")
+        pipe.ttl(name=f"token_validation:{cache_key}")
+        return pipe.execute()
+
+    def set_token_validation(
+        self,
+        cache_key: str,
+        is_valid: bool,
+        ttl: int,
+    ):
+        return self.set(
+            name=f"token_validation:{cache_key}",
+            value=int(is_valid),
+            ex=ttl,
+        )
+
+
+class Redis(OTPCommandsMixin, _Redis):
+    pipeline_scripts = True
+
+
+class RedisCluster(OTPCommandsMixin, _RedisCluster):
+    cluster_mode = True
+
+
+def cluster_nodes(node_cls=ClusterNode):
+    """Builds the cluster startup nodes from ``REDIS_CLUSTER_NODES`` (``host:port`` entries)."""
+    nodes = []
+    for node in settings.REDIS_CLUSTER_NODES:
+        host, _, port = node.rpartition(":")
+        nodes.append(node_cls(host, int(port)))
+    return nodes
+
+
+class LazyRedisCluster:
+    """
+    Builds the cluster client of the current process on first use.
+
+    Creating a ``RedisCluster`` connects to discover the slot map, so it must
+    not happen at import time in a preloading gunicorn master; each worker
+    builds its own client, with its own connections, after the fork.
+    """
+
+    cluster_mode = True
+
+    def __init__(self, factory):
+        """
+        Args:
+            factory (callable): Builds a connected ``RedisCluster``.
+        """
+        self._factory = factory
+        self._client = None
+        self._pid = None
+        self._lock = Lock()
+
+    def _get_client(self):
+        if self._pid != os.getpid():
+            with self._lock:
+                if self._pid != os.getpid():
+                    try:
+                        self._client = self._factory()
+                    except RedisClusterException as exc:
+                        raise ConnectionError(str(exc)) from exc
+                    self._pid = os.getpid()
+        return self._client
+
+    def __getattr__(self, name):
+        return getattr(self._get_client(), name)
 
 
 class RedisClient:
     _instance: Redis = None
 
     def __new__(cls):
-        if cls._instance is None:
-            try:
-                cls._instance: Redis = Redis(
+        # Neither client opens a connection here: connections are made on
+        # first use, and a pool used before a fork is reset in the child
+        if cls._instance is None and settings.REDIS_CLUSTER_NODES:
+            # Discovers the slot map; MOVED/ASK redirects and failovers are
+            # followed by refreshing it
+            cls._instance = LazyRedisCluster(lambda: RedisCluster(
+                startup_nodes=cluster_nodes(),
+                password=settings.REDIS_PASSWORD or None,
+                max_connections=100,
+                cluster_error_retry_attempts=settings.REDIS_CLUSTER_RETRY_ATTEMPTS,
+            ))
+        elif cls._instance is None:
+            cls._instance: Redis = Redis(
+                connection_pool=ConnectionPool(
                     host=settings.REDIS_HOST,
                     port=settings.REDIS_PORT,
                     db=settings.REDIS_DB,
                     password=settings.REDIS_PASSWORD,
-                    connection_pool=ConnectionPool(
-                        host=settings.REDIS_HOST,
-                        port=settings.REDIS_PORT,
-                        db=settings.REDIS_DB,
-                        password=settings.REDIS_PASSWORD,
-                        max_connections=100,
-                    ),
-                )
-                # Test connection
-                cls._instance.ping()
-            except ConnectionError:
-                # TODO: Logging
-                print_exc()
-                cls._instance = None
+                    max_connections=100,
+                ),
+            )
         return cls._instance
 
 
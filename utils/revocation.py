@@ -0,0 +1,187 @@
+import os
+from threading import Lock, Thread
+from time import monotonic, sleep, time
+
+from django.conf import settings
+from redis import RedisError
+
+from .async_redis_client import async_redis_client_ins
+from .bloom import BloomFilter
+from .metrics import metrics
+from .redis_client import redis_client_ins
+
+# Seconds to wait before retrying after a Redis error in the listener
+LISTENER_RETRY_DELAY = 1.0
+
+
+class RevocationList:
+    """
+    In-process view of the revoked token ids published by the authentication service.
+
+    A Bloom filter of every revoked ``jti`` is built from the Redis snapshot
+    set and kept current by tailing the revocation stream from a background
+    thread. A ``jti`` missing from the filter is certainly not revoked; a
+    possible hit is confirmed against the exact set in Redis. The filter is
+    rebuilt from a fresh snapshot periodically, dropping expired entries.
+
+    Until the first snapshot is loaded, or while the listener has not heard
+    from Redis for ``max_staleness`` seconds, the list reports itself as not
+    ready and callers must fall back to remote validation.
+    """
+
+    def __init__(
+        self,
+        redis_client=redis_client_ins,
+        async_redis_client=async_redis_client_ins,
+        capacity=settings.REVOCATION_FILTER_CAPACITY,
+        error_rate=settings.REVOCATION_FILTER_ERROR_RATE,
+        block_seconds=settings.REVOCATION_STREAM_BLOCK_SECONDS,
+        max_staleness=settings.REVOCATION_MAX_STALENESS,
+        rebuild_interval=settings.REVOCATION_REBUILD_INTERVAL,
+    ):
+        self.redis_client = redis_client
+        self.async_redis_client = async_redis_client
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.block_seconds = block_seconds
+        self.max_staleness = max_staleness
+        self.rebuild_interval = rebuild_interval
+
+        self._filter = None
+        self._last_id = None
+        self._synced_at = 0.0
+        self._rebuild_at = 0.0
+        self._listener = None
+        self._lock = Lock()
+        os.register_at_fork(after_in_child=self._forget_listener)
+
+    def _forget_listener(self):
+        # Threads do not survive a fork, the child starts its own listener
+        self._listener = None
+        self._lock = Lock()
+
+    @property
+    def is_ready(self):
+        """True while the filter reflects the revocations published up to ``max_staleness`` seconds ago."""
+        if self._listener is None:
+            self.start()
+        return self._filter is not None and monotonic() - self._synced_at <= self.max_staleness
+
+    def start(self):
+        """Starts the background listener of this process, if Redis is configured."""
+        if self.redis_client is None:
+            return
+        with self._lock:
+            if self._listener is None:
+                self._listener = Thread(target=self._listen, name="revocation-listener", daemon=True)
+                self._listener.start()
+
+    def might_be_revoked(self, jti):
+        """
+        Checks the filter for a token id.
+
+        Args:
+            jti (str): The ``jti`` claim.
+
+        Returns:
+            bool: False if the token is certainly not revoked, True on a possible hit.
+        """
+        return jti in self._filter
+
+    def load_snapshot(self):
+        """Builds a new filter from the Redis snapshot and swaps it in."""
+        last_id, jtis = self.redis_client.revocation_snapshot()
+        bloom = BloomFilter(capacity=max(self.capacity, len(jtis)), error_rate=self.error_rate)
+        for jti in jtis:
+            bloom.add(jti.decode("utf-8"))
+
+        # Single assignments, so readers always see a consistent filter
+        self._filter, self._last_id = bloom, last_id
+        self._synced_at = monotonic()
+        self._rebuild_at = self._synced_at + self.rebuild_interval
+
+    def apply_revocations(self):
+        """Waits up to ``block_seconds`` for new revocations and adds them to the filter."""
+        entries = self.redis_client.read_revocations(self._last_id, block_ms=int(self.block_seconds * 1000))
+        bloom = self._filter
+        for entry_id, fields in entries:
+            bloom.add(fields[b"jti"].decode("utf-8"))
+            self._last_id = entry_id
+        self._synced_at = monotonic()
+
+    def _listen(self):
+        while True:
+            try:
+                if self._filter is None or self._filter.is_full or monotonic() >= self._rebuild_at:
+                    self.load_snapshot()
+                self.apply_revocations()
+            except RedisError:
+                # TODO: Logging
+                sleep(LISTENER_RETRY_DELAY)
+
+    @staticmethod
+    def _is_revoked(expires_at):
+        return expires_at is not None and expires_at > time()
+
+    def is_revoked(self, jti):
+        """
+        Checks the exact revoked set in Redis.
+
+        Args:
+            jti (str): The ``jti`` claim.
+
+        Returns:
+            bool: True if the token id is revoked.
+
+        Raises:
+            RedisError: If Redis cannot be reached.
+        """
+        return self._is_revoked(self.redis_client.get_revocation(jti))
+
+    async def ais_revoked(self, jti):
+        """Async variant of ``is_revoked`` using the asyncio Redis client."""
+        return self._is_revoked(await self.async_redis_client.get_revocation(jti))
+
+    def check(self, payload):
+        """
+        Decides on a token locally when possible.
+
+        Args:
+            payload (dict): The decoded (signature-verified) token payload.
+
+        Returns:
+            bool or None: True if the token is not revoked, False if it is,
+            None when the answer needs the remote validation.
+        """
+        jti = payload.get("jti")
+        if not jti or not self.is_ready:
+            return None
+        if not self.might_be_revoked(jti):
+            metrics.increment("revocation_filter_miss")
+            return True
+
+        metrics.increment("revocation_filter_hit")
+        try:
+            return not self.is_revoked(jti)
+        except RedisError:
+            # TODO: Logging
+            return None
+
+    async def acheck(self, payload):
+        """Async variant of ``check``."""
+        jti = payload.get("jti")
+        if not jti or not self.is_ready:
+            return None
+        if not self.might_be_revoked(jti):
+            metrics.increment("revocation_filter_miss")
+            return True
+
+        metrics.increment("revocation_filter_hit")
+        try:
+            return not await self.ais_revoked(jti)
+        except RedisError:
+            # TODO: Logging
+            return None
+
+
+revocation_list = RevocationList()
@@ -0,0 +1,35 @@
+"""
+Helpers for the test suites of the apps.
+
+The shared Redis clients are pointed at an in-process fakeredis server, so
+the Lua scripts, pipelines and key layout run as they do against Redis.
+fakeredis runs the scripts with lupa: ``pip install "fakeredis[lua]"``.
+"""
+import fakeredis
+import fakeredis.aioredis
+import redis
+import redis.asyncio
+
+from .async_redis_client import async_redis_client_ins
+from .redis_client import redis_client_ins
+
+
+class FakeRedisMixin:
+    """
+    Test case mixin giving every test an empty in-process Redis.
+
+    The connection pools of ``redis_client_ins`` and
+    ``async_redis_client_ins`` are swapped for pools of one fakeredis
+    server, shared by the sync and the asyncio client, and restored after
+    the test.
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.redis_server = fakeredis.FakeServer()
+        for client, pool_class, connection_class in (
+            (redis_client_ins, redis.ConnectionPool, fakeredis.FakeConnection),
+            (async_redis_client_ins, redis.asyncio.ConnectionPool, fakeredis.aioredis.FakeConnection),
+        ):
+            self.addCleanup(setattr, client, "connection_pool", client.connection_pool)
+            client.connection_pool = pool_class(connection_class=connection_class, server=self.redis_server)
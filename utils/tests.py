@@ -0,0 +1,357 @@
+import json
+import os
+import tempfile
+from pathlib import Path
+from time import time
+from unittest import mock
+
+import jwt
+from cryptography.hazmat.primitives.asymmetric import rsa
+from cryptography.hazmat.primitives.serialization import Encoding, PublicFormat
+from django.test import SimpleTestCase, override_settings
+from jwt import InvalidTokenError
+from pybreaker import CircuitBreakerError
+from redis import RedisError
+
+from .circuit_breaker import STATE_CLOSED, STATE_HALF_OPEN, STATE_OPEN, SharedCircuitBreaker
+from .concurrency_limit import AdaptiveConcurrencyLimiter
+from .keyring import KeyRing
+from .metrics import Metrics
+from .redis_client import OTP_PACK_FACTOR, OTP_VERIFIED, legacy_otp_key, pack_otp, redis_client_ins
+from .revocation import RevocationList
+from .testing import FakeRedisMixin
+
+NOW = 1_700_000_000.0
+
+
+def fail():
+    raise ConnectionError("auth service is down")
+
+
+def generate_key():
+    return rsa.generate_private_key(public_exponent=65537, key_size=2048)
+
+
+def write_public_key(path, private_key):
+    path.write_bytes(private_key.public_key().public_bytes(Encoding.PEM, PublicFormat.SubjectPublicKeyInfo))
+
+
+class KeyRingTests(SimpleTestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = Path(directory.name)
+        self.keys = {kid: generate_key() for kid in ("first", "second")}
+        for kid, private_key in self.keys.items():
+            write_public_key(self.directory / f"{kid}.pem", private_key)
+
+    def token(self, kid=None):
+        headers = {"kid": kid} if kid else None
+        return jwt.encode({"sub": "user-1"}, self.keys[kid or "first"], algorithm="RS256", headers=headers)
+
+    def expected(self, kid):
+        return self.keys[kid].public_key().public_numbers()
+
+    def test_selects_the_key_by_kid(self):
+        keyring = KeyRing(self.directory)
+
+        self.assertEqual(keyring.get_key(self.token("first")).public_numbers(), self.expected("first"))
+        self.assertEqual(keyring.get_key(self.token("second")).public_numbers(), self.expected("second"))
+
+    def test_unknown_kid(self):
+        keyring = KeyRing(self.directory)
+        self.keys["third"] = generate_key()
+
+        with self.assertRaises(InvalidTokenError):
+            keyring.get_key(self.token("third"))
+
+    def test_default_kid_for_tokens_without_kid(self):
+        keyring = KeyRing(self.directory, default_kid="second")
+
+        self.assertEqual(keyring.get_key(self.token()).public_numbers(), self.expected("second"))
+
+    def test_single_file_ignores_kid(self):
+        keyring = KeyRing(self.directory / "first.pem")
+
+        self.assertEqual(keyring.get_key(self.token("second")).public_numbers(), self.expected("first"))
+
+    def test_reload_picks_up_rotated_keys(self):
+        keyring = KeyRing(self.directory, reload_interval=3600)
+        self.keys["third"] = generate_key()
+        write_public_key(self.directory / "third.pem", self.keys["third"])
+
+        keyring._reload_lock.acquire()
+        keyring._reload_if_changed()
+
+        self.assertEqual(keyring.get_key(self.token("third")).public_numbers(), self.expected("third"))
+        # Broken key files leave the last good key set in place
+        (self.directory / "first.pem").write_text("not a key")
+        keyring._reload_lock.acquire()
+        keyring._reload_if_changed()
+        self.assertEqual(keyring.get_key(self.token("first")).public_numbers(), self.expected("first"))
+
+
+class MetricsTests(SimpleTestCase):
+    def make_metrics(self, multiproc_dir=""):
+        return Metrics(enabled=True, multiproc_dir=multiproc_dir, flush_interval=3600, buckets=(0.01, 0.1))
+
+    def test_renders_stages_and_events(self):
+        metrics = self.make_metrics()
+        metrics.observe("verify", 0.005)
+        metrics.observe("verify", 0.05)
+        metrics.increment("rate_limited", 2)
+
+        lines = metrics.render().splitlines()
+
+        self.assertIn('otp_stage_duration_seconds_bucket{stage="verify",le="0.01"} 1', lines)
+        self.assertIn('otp_stage_duration_seconds_bucket{stage="verify",le="+Inf"} 2', lines)
+        self.assertIn('otp_stage_duration_seconds_count{stage="verify"} 2', lines)
+        self.assertIn('otp_events_total{event="rate_limited"} 2', lines)
+
+    def test_merges_the_events_of_other_processes(self):
+        with tempfile.TemporaryDirectory() as directory:
+            metrics = self.make_metrics(directory)
+            metrics.increment("rate_limited")
+            with open(os.path.join(directory, "metrics_1.json"), "w") as snapshot_file:
+                json.dump({"stages": {"verify": [1, 0, 0, 0.005]}, "events": {"rate_limited": 3}}, snapshot_file)
+
+            collected = metrics.collect()
+
+        self.assertEqual(collected["stages"], {"verify": [1, 0, 0, 0.005]})
+        self.assertEqual(collected["events"], {"rate_limited": 4})
+
+    def test_disabled_metrics_record_nothing(self):
+        metrics = Metrics(enabled=False, multiproc_dir="")
+        metrics.observe("verify", 0.005)
+        metrics.increment("rate_limited")
+        metrics.register_collector("auth_service", lambda: {"pools": 2})
+
+        self.assertEqual(metrics.snapshot(), {"stages": {}, "events": {}, "clients": {}})
+
+    def test_renders_client_stats(self):
+        metrics = self.make_metrics()
+        metrics.register_collector("auth_service", lambda: {"pools": 2, "hedged": 1})
+
+        lines = metrics.render().splitlines()
+
+        self.assertIn('otp_client_stats{client="auth_service",stat="pools"} 2', lines)
+        self.assertIn('otp_client_stats{client="auth_service",stat="hedged"} 1', lines)
+
+    def test_merges_the_client_stats_of_other_processes(self):
+        with tempfile.TemporaryDirectory() as directory:
+            metrics = self.make_metrics(directory)
+            metrics.register_collector("auth_service", lambda: {"pools": 2})
+            with open(os.path.join(directory, "metrics_1.json"), "w") as snapshot_file:
+                json.dump({"stages": {}, "events": {}, "clients": {"auth_service": {"pools": 1}}}, snapshot_file)
+
+            collected = metrics.collect()
+
+        self.assertEqual(collected["clients"], {"auth_service": {"pools": 3}})
+
+
+class PackedOTPTests(FakeRedisMixin, SimpleTestCase):
+    PHONE_NUMBER = "+989121234567"
+
+    def test_packs_code_and_expiry(self):
+        packed = pack_otp("012345", 1_700_000_300)
+
+        self.assertEqual(divmod(packed, OTP_PACK_FACTOR), (1_700_000_300, 12345))
+
+    def test_rejects_codes_that_do_not_fit(self):
+        with self.assertRaises(ValueError):
+            pack_otp("1234567", 1_700_000_300)
+
+    def test_stored_codes_are_read_back(self):
+        redis_client_ins.set_otps({self.PHONE_NUMBER: "123456", "+989121234568": "654321"})
+
+        self.assertEqual(redis_client_ins.get_otp(self.PHONE_NUMBER), b"123456")
+        self.assertEqual(redis_client_ins.get_otp("+989121234568"), b"654321")
+
+    def test_expired_codes_are_not_returned(self):
+        redis_client_ins.store_packed_otps({self.PHONE_NUMBER: pack_otp("123456", int(time()) - 1)})
+
+        self.assertIsNone(redis_client_ins.get_otp(self.PHONE_NUMBER))
+
+    @override_settings(OTP_STORAGE_LEGACY_FALLBACK=True)
+    def test_reads_codes_of_the_legacy_format(self):
+        redis_client_ins.set(legacy_otp_key(self.PHONE_NUMBER), "123456", ex=60)
+
+        self.assertEqual(redis_client_ins.get_otp(self.PHONE_NUMBER), b"123456")
+        self.assertEqual(redis_client_ins.verify_otp(self.PHONE_NUMBER, "123456"), OTP_VERIFIED)
+        self.assertIsNone(redis_client_ins.get_otp(self.PHONE_NUMBER))
+
+
+class RevocationListTests(FakeRedisMixin, SimpleTestCase):
+    def setUp(self):
+        super().setUp()
+        self.revocations = RevocationList(capacity=1000, error_rate=0.01, block_seconds=0.01, max_staleness=60)
+        # No background listener, the tests load the snapshot and the stream themselves
+        self.revocations._listener = object()
+
+    def revoke(self, jti, ttl=600):
+        redis_client_ins.revoke_token(jti, int(time()) + ttl)
+
+    def test_not_ready_before_the_first_snapshot(self):
+        self.assertIsNone(self.revocations.check({"jti": "token-1"}))
+
+    def test_tokens_revoked_before_the_snapshot(self):
+        self.revoke("revoked")
+        self.revocations.load_snapshot()
+
+        self.assertIs(self.revocations.check({"jti": "revoked"}), False)
+        self.assertIs(self.revocations.check({"jti": "token-1"}), True)
+        self.assertIsNone(self.revocations.check({}))
+
+    def test_tokens_revoked_after_the_snapshot(self):
+        self.revocations.load_snapshot()
+        self.revoke("revoked")
+        self.revocations.apply_revocations()
+
+        self.assertIs(self.revocations.check({"jti": "revoked"}), False)
+
+    def test_expired_revocations_are_ignored(self):
+        self.revoke("expired", ttl=-1)
+        self.revocations.load_snapshot()
+
+        self.assertIs(self.revocations.check({"jti": "expired"}), True)
+
+
+class SharedCircuitBreakerTests(FakeRedisMixin, SimpleTestCase):
+    def setUp(self):
+        super().setUp()
+        self.now = NOW
+        patcher = mock.patch("utils.circuit_breaker.time", side_effect=lambda: self.now)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def make_breaker(self):
+        return SharedCircuitBreaker(
+            "test",
+            fail_max=2,
+            failure_ratio=0.5,
+            window=60,
+            reset_timeout=30,
+            half_open_probes=1,
+            success_threshold=1,
+            slow_call_seconds=10,
+            state_ttl=0,
+        )
+
+    def trip(self, breaker):
+        for _ in range(2):
+            with self.assertRaises(ConnectionError):
+                breaker.call(fail)
+
+    def test_opens_after_fail_max_failures(self):
+        breaker = self.make_breaker()
+        self.trip(breaker)
+
+        self.assertEqual(breaker.current_state, STATE_OPEN)
+        func = mock.Mock()
+        with self.assertRaises(CircuitBreakerError):
+            breaker.call(func)
+        func.assert_not_called()
+
+    def test_state_is_shared_through_redis(self):
+        self.trip(self.make_breaker())
+
+        with self.assertRaises(CircuitBreakerError):
+            self.make_breaker().call(mock.Mock())
+
+    def test_successes_keep_it_closed(self):
+        breaker = self.make_breaker()
+        with self.assertRaises(ConnectionError):
+            breaker.call(fail)
+        for _ in range(3):
+            breaker.call(mock.Mock())
+        with self.assertRaises(ConnectionError):
+            breaker.call(fail)
+
+        self.assertEqual(breaker.current_state, STATE_CLOSED)
+
+    def test_half_open_admits_one_probe_at_a_time(self):
+        breaker = self.make_breaker()
+        self.trip(breaker)
+        self.now += 31
+
+        self.assertTrue(breaker.before_call())
+        self.assertEqual(breaker.current_state, STATE_HALF_OPEN)
+        with self.assertRaises(CircuitBreakerError):
+            self.make_breaker().before_call()
+
+        breaker.after_call(probe=True, failed=False)
+        self.assertEqual(breaker.current_state, STATE_CLOSED)
+        self.assertFalse(self.make_breaker().before_call())
+
+    def test_failed_probe_opens_again(self):
+        breaker = self.make_breaker()
+        self.trip(breaker)
+        self.now += 31
+
+        with self.assertRaises(ConnectionError):
+            breaker.call(fail)
+
+        self.assertEqual(breaker.current_state, STATE_OPEN)
+        self.now += 29
+        with self.assertRaises(CircuitBreakerError):
+            self.make_breaker().call(mock.Mock())
+
+    def test_falls_back_to_a_local_breaker_without_redis(self):
+        breaker = self.make_breaker()
+        breaker.redis_client = mock.Mock(**{"get_script.return_value.side_effect": RedisError})
+
+        self.assertEqual(breaker.call(lambda: "ok"), "ok")
+
+
+class AdaptiveConcurrencyLimiterTests(SimpleTestCase):
+    def make_limiter(self, **kwargs):
+        options = {
+            "enabled": True,
+            "initial_limit": 2,
+            "min_limit": 1,
+            "max_limit": 4,
+            "smoothing": 1.0,
+            "tolerance": 2.0,
+            "long_window": 100,
+        }
+        options.update(kwargs)
+        return AdaptiveConcurrencyLimiter(**options)
+
+    def test_rejects_requests_over_the_limit(self):
+        limiter = self.make_limiter()
+
+        self.assertTrue(limiter.try_acquire())
+        self.assertTrue(limiter.try_acquire())
+        self.assertFalse(limiter.try_acquire())
+        limiter.release(0.01)
+        self.assertTrue(limiter.try_acquire())
+
+    def test_failures_shrink_the_limit(self):
+        limiter = self.make_limiter()
+        limiter.try_acquire()
+        limiter.release(0.01, failed=True)
+
+        self.assertEqual(int(limiter.limit), 1)
+        limiter.try_acquire()
+        self.assertFalse(limiter.try_acquire())
+
+    def test_grows_up_to_max_limit_under_steady_latency(self):
+        limiter = self.make_limiter()
+        for _ in range(20):
+            while limiter.try_acquire():
+                pass
+            for _ in range(limiter.in_flight):
+                limiter.release(0.01)
+
+        self.assertEqual(limiter.limit, 4)
+
+    def test_limits_are_clamped_to_max_limit(self):
+        limiter = self.make_limiter(initial_limit=16, min_limit=8)
+
+        self.assertEqual(limiter.min_limit, 4)
+        self.assertEqual(limiter.limit, 4)
+
+    def test_disabled_limiter_admits_everything(self):
+        limiter = self.make_limiter(enabled=False)
+
+        self.assertTrue(all(limiter.try_acquire() for _ in range(10)))
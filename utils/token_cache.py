@@ -0,0 +1,218 @@
+from collections import OrderedDict
+from hashlib import sha256
+from threading import Lock
+from time import monotonic, time
+
+from django.conf import settings
+from redis import RedisError
+
+from .redis_client import redis_client_ins
+from .async_redis_client import async_redis_client_ins
+from .metrics import metrics
+
+
+class LocalLRUCache:
+    """Bounded, thread-safe in-process LRU cache with per-entry expiry."""
+
+    def __init__(self, max_size: int):
+        """
+        Args:
+            max_size (int): Maximum number of entries kept before evicting the least recently used.
+        """
+        self.max_size = max_size
+        self._entries = OrderedDict()
+        self._lock = Lock()
+
+    def get(self, key):
+        """
+        Returns the cached value for ``key`` or None if missing or expired.
+
+        Args:
+            key (str): The cache key.
+
+        Returns:
+            object or None: The cached value.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+
+            value, expires_at = entry
+            if expires_at <= monotonic():
+                del self._entries[key]
+                return None
+
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl: int):
+        """
+        Stores ``value`` under ``key`` for ``ttl`` seconds.
+
+        Args:
+            key (str): The cache key.
+            value (object): The value to cache.
+            ttl (int): Time-To-Live in seconds.
+        """
+        if ttl <= 0 or self.max_size <= 0:
+            return
+
+        with self._lock:
+            self._entries[key] = (value, monotonic() + ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        """Drops every cached entry."""
+        with self._lock:
+            self._entries.clear()
+
+
+class TokenValidationCache:
+    """
+    Two-tier cache for auth-service token validation results.
+
+    The first tier is a per-process LRU, the second one is shared between all
+    workers through Redis. Entries never outlive the token's ``exp`` claim and
+    negative results are kept only for a short period.
+    """
+
+    def __init__(
+        self,
+        redis_client=redis_client_ins,
+        async_redis_client=async_redis_client_ins,
+        local_cache_size=settings.TOKEN_VALIDATION_LOCAL_CACHE_SIZE,
+        ttl=settings.TOKEN_VALIDATION_CACHE_TTL,
+        negative_ttl=settings.TOKEN_VALIDATION_NEGATIVE_CACHE_TTL,
+    ):
+        self.redis_client = redis_client
+        self.async_redis_client = async_redis_client
+        self.local_cache = LocalLRUCache(max_size=local_cache_size)
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+
+    @staticmethod
+    def cache_key(token, payload):
+        """
+        Builds the cache key from the ``jti`` claim, falling back to a token digest.
+
+        Args:
+            token (str): The raw JWT token.
+            payload (dict): The decoded (signature-verified) token payload.
+
+        Returns:
+            str: The cache key.
+        """
+        jti = payload.get("jti")
+        if jti:
+            return f"jti:{jti}"
+        return f"sha256:{sha256(token.encode('utf-8')).hexdigest()}"
+
+    def ttl_for(self, payload, is_valid):
+        """
+        Computes the entry TTL, capped by the token's expiration time.
+
+        Args:
+            payload (dict): The decoded token payload.
+            is_valid (bool): The validation result being cached.
+
+        Returns:
+            int: TTL in seconds, 0 means the result must not be cached.
+        """
+        ttl = self.ttl if is_valid else self.negative_ttl
+        exp = payload.get("exp")
+        if exp is not None:
+            ttl = min(ttl, int(exp - time()))
+        return max(ttl, 0)
+
+    def _remember(self, key, payload, cached, remaining_ttl):
+        """Converts a Redis hit into a result and copies it into the local tier."""
+        if cached is None:
+            return None
+
+        is_valid = cached == b"1"
+        self.local_cache.set(key, is_valid, min(remaining_ttl, self.ttl_for(payload, is_valid)))
+        return is_valid
+
+    def get(self, token, payload):
+        """
+        Looks up a cached validation result.
+
+        Args:
+            token (str): The raw JWT token.
+            payload (dict): The decoded token payload.
+
+        Returns:
+            bool or None: The cached result, None on a miss in both tiers.
+        """
+        key = self.cache_key(token, payload)
+        is_valid = self.local_cache.get(key)
+        if is_valid is not None:
+            return is_valid
+
+        try:
+            with metrics.timer("redis_token_cache_get"):
+                cached, remaining_ttl = self.redis_client.get_token_validation(cache_key=key)
+        except RedisError:
+            # TODO: Logging
+            return None
+        return self._remember(key, payload, cached, remaining_ttl)
+
+    async def aget(self, token, payload):
+        """Async variant of ``get`` using the asyncio Redis client."""
+        key = self.cache_key(token, payload)
+        is_valid = self.local_cache.get(key)
+        if is_valid is not None:
+            return is_valid
+
+        try:
+            with metrics.timer("redis_token_cache_get"):
+                cached, remaining_ttl = await self.async_redis_client.get_token_validation(cache_key=key)
+        except RedisError:
+            # TODO: Logging
+            return None
+        return self._remember(key, payload, cached, remaining_ttl)
+
+    def set(self, token, payload, is_valid):
+        """
+        Stores a validation result in both tiers.
+
+        Args:
+            token (str): The raw JWT token.
+            payload (dict): The decoded token payload.
+            is_valid (bool): The validation result.
+        """
+        ttl = self.ttl_for(payload, is_valid)
+        if ttl <= 0:
+            return
+
+        key = self.cache_key(token, payload)
+        self.local_cache.set(key, is_valid, ttl)
+
+        try:
+            with metrics.timer("redis_token_cache_set"):
+                self.redis_client.set_token_validation(cache_key=key, is_valid=is_valid, ttl=ttl)
+        except RedisError:
+            # TODO: Logging
+            pass
+
+    async def aset(self, token, payload, is_valid):
+        """Async variant of ``set`` using the asyncio Redis client."""
+        ttl = self.ttl_for(payload, is_valid)
+        if ttl <= 0:
+            return
+
+        key = self.cache_key(token, payload)
+        self.local_cache.set(key, is_valid, ttl)
+
+        try:
+            with metrics.timer("redis_token_cache_set"):
+                await self.async_redis_client.set_token_validation(cache_key=key, is_valid=is_valid, ttl=ttl)
+        except RedisError:
+            # TODO: Logging
+            pass
+
+
+token_validation_cache = TokenValidationCache()